@@ -12,7 +12,9 @@ logging.basicConfig(level=logging.DEBUG)
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
+# Session routée: les vues @replica_read lisent sur le réplica (bind 'replica')
+from backend.db_routing import RoutingSession
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 mail = Mail()
 
@@ -44,19 +46,16 @@ else:
 app.config['SECRET_KEY'] = app.secret_key
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///econsular.db")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-    "pool_timeout": 20,
-    "pool_size": 10,
-    "max_overflow": 20,
-    "connect_args": {
-        "client_encoding": "utf8",
-        "connect_timeout": 10,
-        "sslmode": "prefer"
-    } if os.environ.get("DATABASE_URL") else {}
-}
+# Profil de moteur selon la base: WAL et busy_timeout pour SQLite,
+# délais d'exécution et pool de connexions pour PostgreSQL
+from backend.config import database_uri, replica_database_uri, engine_options, configure_engine
+app.config["SQLALCHEMY_DATABASE_URI"] = database_uri()
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
+
+# Réplica en lecture optionnel (tableaux de bord, suivi, API publiques)
+replica_uri = replica_database_uri()
+if replica_uri:
+    app.config["SQLALCHEMY_BINDS"] = {"replica": {"url": replica_uri, **engine_options(replica_uri, replica=True)}}
 
 # Configure file uploads
 app.config['UPLOAD_FOLDER'] = 'uploads'
@@ -89,6 +88,12 @@ login_manager.login_message_category = 'info'
 # Initialize extensions
 db.init_app(app)
 mail.init_app(app)
+with app.app_context():
+    for engine in db.engines.values():
+        configure_engine(engine)
+
+from backend.db_routing import init_replica_routing
+init_replica_routing(app)
 
 # Create upload directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -256,7 +261,7 @@ def create_demo_users_and_data():
     Only use in development/testing environments.
     In production, set strong passwords using environment variables.
     """
-    from werkzeug.security import generate_password_hash
+    from backend.services.password_service import password_service
     from backend.models import User, UniteConsulaire
     
     # Créer d'abord les superviseurs (nécessaires pour created_by des unités)
@@ -288,7 +293,7 @@ def create_demo_users_and_data():
             user = User()
             user.username = user_data['username']
             user.email = user_data['email']
-            user.password_hash = generate_password_hash(user_data['password'])
+            user.password_hash = password_service.hash_password(user_data['password'])
             user.role = user_data['role']
             user.first_name = user_data['first_name']
             user.last_name = user_data['last_name']
@@ -415,7 +420,7 @@ def create_demo_users_and_data():
             user = User()
             user.username = user_data['username']
             user.email = user_data['email']
-            user.password_hash = generate_password_hash(user_data['password'])
+            user.password_hash = password_service.hash_password(user_data['password'])
             user.role = user_data['role']
             user.first_name = user_data['first_name']
             user.last_name = user_data['last_name']
@@ -542,28 +547,24 @@ with app.app_context():
     from backend.routes.routes_crud import crud_bp
     app.register_blueprint(crud_bp)
     
-    # Always create database schema and default services
-    db.create_all()
-    create_default_services()
-    
-    # Only create demo data in development or when explicitly requested
-    # NEVER create demo users with weak passwords in production
-    create_demo = os.environ.get('CREATE_DEMO_DATA', '').lower() in ['true', '1', 'yes']
-    is_production = os.environ.get('FLASK_ENV') == 'production'
-    
-    if create_demo or not is_production:
-        if is_production:
-            logging.warning("=" * 80)
-            logging.warning("WARNING: Creating demo data in production environment!")
-            logging.warning("Demo users have weak passwords. Change them immediately!")
-            logging.warning("=" * 80)
-        
-        create_demo_users_and_data()
-        configure_demo_services()
-        create_demo_applications()
-        logging.info("Demo data creation completed")
-    else:
-        logging.info("Skipping demo data creation (production mode)")
+    # Nombre de requêtes SQL et temps base par requête HTTP (Server-Timing en debug,
+    # journal des requêtes lentes, agrégat par endpoint pour le superviseur)
+    from backend.utils.query_profiler import query_profiler
+    query_profiler.init_app(app, db.engine)
+    
+    # Nettoyage des entrées (SANITIZE_REQUESTS)
+    from backend.utils.middleware import init_input_security
+    init_input_security(app)
+    
+    # Métriques Prometheus (/metrics), agrégées entre workers via METRICS_DIR
+    from backend.utils.metrics import init_app as init_metrics
+    init_metrics(app, db.engine)
+    
+    # Schéma et données initiales appliqués une seule fois, sous verrou
+    # (python backend/scripts/bootstrap.py run); les processus suivants
+    # ne lisent que la ligne de version
+    from backend.services.bootstrap_service import bootstrap_service
+    bootstrap_service.ensure_bootstrapped()
 
 @login_manager.user_loader
 def load_user(user_id):
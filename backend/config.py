@@ -1,8 +1,24 @@
 import os
+import logging
+
+def database_uri():
+    """URL de la base (DATABASE_URL), SQLite local par défaut"""
+    uri = os.environ.get('DATABASE_URL', 'sqlite:///econsular.db')
+    # Les hébergeurs fournissent souvent postgres://, refusé par SQLAlchemy 2
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def replica_database_uri():
+    """URL du réplica en lecture (REPLICA_DATABASE_URL), None si aucun"""
+    uri = os.environ.get('REPLICA_DATABASE_URL')
+    if uri and uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri or None
 
 class Config:
     # Database
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///econsular.db')
+    SQLALCHEMY_DATABASE_URI = database_uri()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # Security
@@ -41,3 +57,95 @@ class Config:
         'passeport': 100.0,
         'autres_documents': 20.0
     }
+
+# =============================
+# PROFILS DE MOTEUR SQLALCHEMY
+# =============================
+
+def _sqlite_pragmas():
+    """PRAGMA appliqués à chaque connexion SQLite"""
+    return [
+        'journal_mode=WAL',  # Lecteurs non bloqués par l'écrivain
+        'synchronous=NORMAL',  # Sûr en WAL, un fsync par checkpoint et non par commit
+        f"busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000))}",
+        f"mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+        f"cache_size=-{int(os.environ.get('SQLITE_CACHE_SIZE_KB', 20000))}",
+        'temp_store=MEMORY',
+    ]
+
+def _sqlite_options(uri):
+    from sqlalchemy.pool import QueuePool, StaticPool
+
+    if uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri:
+        # Base en mémoire: une seule connexion partagée, sinon chaque connexion a sa propre base
+        return {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+
+    busy_timeout_ms = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000))
+    return {
+        # Connexions réutilisées entre threads: un seul écrivain à la fois de toute façon,
+        # quelques connexions suffisent à servir les lectures concurrentes
+        'poolclass': QueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': 20,
+        'connect_args': {'check_same_thread': False, 'timeout': busy_timeout_ms / 1000},
+    }
+
+def _postgresql_options(uri, replica=False):
+    # Limites appliquées côté serveur à chaque session (0 = désactivé)
+    statement_timeout = int(os.environ.get('PG_STATEMENT_TIMEOUT_MS', 30000))
+    idle_timeout = int(os.environ.get('PG_IDLE_IN_TRANSACTION_TIMEOUT_MS', 60000))
+    connect_args = {
+        # Réplica: échec rapide, les lectures repassent sur le primaire
+        'connect_timeout': 3 if replica else 10,
+        'options': f'-c statement_timeout={statement_timeout} '
+                   f'-c idle_in_transaction_session_timeout={idle_timeout}',
+    }
+    if uri.startswith('postgresql+psycopg:'):
+        # psycopg 3: instructions préparées côté serveur après N exécutions
+        connect_args['prepare_threshold'] = int(os.environ.get('PG_PREPARE_THRESHOLD', 5))
+    else:
+        connect_args.update({'client_encoding': 'utf8', 'sslmode': os.environ.get('PG_SSLMODE', 'prefer')})
+
+    return {
+        'pool_recycle': 300,
+        'pool_pre_ping': True,
+        'pool_timeout': 20,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        # Cache des requêtes compilées par SQLAlchemy (défaut: 500 entrées)
+        'query_cache_size': int(os.environ.get('SQLALCHEMY_QUERY_CACHE_SIZE', 1200)),
+        'connect_args': connect_args,
+    }
+
+def engine_options(uri, replica=False):
+    """Options create_engine adaptées au moteur de base de données"""
+    if uri.startswith('sqlite'):
+        return _sqlite_options(uri)
+    if uri.startswith('postgresql'):
+        return _postgresql_options(uri, replica)
+    return {'pool_recycle': 300, 'pool_pre_ping': True, 'pool_timeout': 20}
+
+def configure_engine(engine):
+    """Réglages par connexion qui ne passent pas par create_engine (PRAGMA SQLite)"""
+    from sqlalchemy import event
+
+    if engine.dialect.name != 'sqlite':
+        return engine
+    pragmas = _sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                try:
+                    cursor.execute(f'PRAGMA {pragma}')
+                except Exception as e:
+                    # Passage en WAL impossible si une autre connexion tient un verrou:
+                    # le mode est persistant, une connexion suivante l'appliquera
+                    logging.warning(f'PRAGMA {pragma} non appliqué: {e}')
+        finally:
+            cursor.close()
+
+    return engine
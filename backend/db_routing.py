@@ -0,0 +1,156 @@
+# Routage des lectures vers un réplica (bind SQLAlchemy 'replica')
+# Les vues annotées @replica_read envoient leurs SELECT au réplica; les écritures,
+# les lectures qui suivent une écriture et les utilisateurs venant d'écrire restent
+# sur le primaire. Réplica indisponible ou en retard: retour automatique au primaire.
+import os
+import time
+import logging
+import threading
+from functools import wraps
+from flask import current_app, g, has_request_context, request, session as http_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+REPLICA_BIND = 'replica'
+
+# Retard de réplication PostgreSQL en secondes (0 si tout le WAL reçu est rejoué, NULL sur un primaire)
+REPLICATION_LAG_SQL = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+class ReplicaMonitor:
+    """État du réplica: vérifié au plus toutes les REPLICA_CHECK_SECONDS"""
+
+    def __init__(self):
+        self.check_interval = float(os.environ.get('REPLICA_CHECK_SECONDS', 5))
+        self.max_lag = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 10))
+        self.retry_after = float(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._down_until = 0.0
+        self.healthy = True
+        self.lag = None
+        self.error = None
+
+    def available(self, engine):
+        now = time.monotonic()
+        if now < self._down_until:
+            return False
+        # Un seul thread vérifie; les autres utilisent le dernier état connu
+        if now - self._checked_at >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self.check(engine)
+            finally:
+                self._lock.release()
+        return self.healthy
+
+    def check(self, engine):
+        self._checked_at = time.monotonic()
+        try:
+            with engine.connect() as connection:
+                if engine.dialect.name == 'postgresql':
+                    lag = connection.execute(REPLICATION_LAG_SQL).scalar()
+                else:
+                    connection.execute(text('SELECT 1'))
+                    lag = 0
+        except Exception as e:
+            self.mark_down(e)
+            return False
+
+        self.lag = float(lag or 0)
+        self.error = None
+        if self.lag > self.max_lag:
+            if self.healthy:
+                logging.warning(f'Réplica en retard de {self.lag:.1f} s: lectures sur le primaire')
+            self.healthy = False
+        else:
+            self.healthy = True
+        return self.healthy
+
+    def mark_down(self, error):
+        if self.healthy:
+            logging.warning(f'Réplica indisponible ({error}): lectures sur le primaire '
+                            f'pendant {self.retry_after:.0f} s')
+        self.healthy = False
+        self.error = str(error)
+        self._down_until = time.monotonic() + self.retry_after
+
+    def status(self):
+        return {
+            'healthy': self.healthy and time.monotonic() >= self._down_until,
+            'lag_seconds': self.lag,
+            'max_lag_seconds': self.max_lag,
+            'error': self.error
+        }
+
+# Instance globale du moniteur de réplica
+replica_monitor = ReplicaMonitor()
+
+class RoutingSession(Session):
+    """Session Flask-SQLAlchemy qui envoie les SELECT des vues @replica_read au réplica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and clause is not None:
+            if getattr(clause, 'is_dml', False):
+                self._mark_write()
+            elif self._reads_from_replica(clause):
+                engine = self._db.engines.get(REPLICA_BIND)
+                if engine is not None and replica_monitor.available(engine):
+                    g.db_replica_used = True
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        return (getattr(clause, 'is_select', False)
+                and not self._flushing
+                and not self.info.get('db_wrote')
+                and has_request_context()
+                and g.get('db_replica', False))
+
+    def _mark_write(self):
+        # Lire ensuite sur le primaire: dans cette session, et pour cet utilisateur (cookie)
+        self.info['db_wrote'] = True
+        if has_request_context():
+            g.db_wrote = True
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _flushed(session, flush_context):
+    session._mark_write()
+
+def _recent_write():
+    return http_session.get('db_primary_until', 0) > time.time()
+
+def replica_read(view):
+    """Vue en lecture seule: SELECT des requêtes GET/HEAD servis par le réplica"""
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        if (REPLICA_BIND not in current_app.config.get('SQLALCHEMY_BINDS', {})
+                or request.method not in ('GET', 'HEAD') or _recent_write()):
+            return view(*args, **kwargs)
+
+        g.db_replica = True
+        try:
+            return view(*args, **kwargs)
+        except OperationalError as e:
+            if not g.get('db_replica_used'):
+                raise
+            # Réplica tombé pendant la requête: même vue rejouée sur le primaire
+            replica_monitor.mark_down(e)
+            current_app.extensions['sqlalchemy'].session.rollback()
+            g.db_replica = False
+            return view(*args, **kwargs)
+        finally:
+            g.db_replica = False
+    return decorated_function
+
+def init_replica_routing(app):
+    """Lecture de ses propres écritures: primaire pendant REPLICA_STICKY_SECONDS après une écriture"""
+    sticky_seconds = float(os.environ.get('REPLICA_STICKY_SECONDS', 15))
+
+    @app.after_request
+    def remember_write(response):
+        if g.get('db_wrote'):
+            http_session['db_primary_until'] = time.time() + sticky_seconds
+        return response
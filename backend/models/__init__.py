@@ -1,9 +1,13 @@
 from .models import (
     User, Application, Document, StatusHistory, AuditLog,
-    Notification, UniteConsulaire, Service, UniteConsulaire_Service
+    Notification, UniteConsulaire, Service, UniteConsulaire_Service,
+    TrackingSnapshot, KeyRotationJob, SchemaVersion, AgentCompetence,
+    SlaUnitStats, NotificationCounter, ApplicationDailyStats, ApplicationDailyDuration
 )
 
 __all__ = [
     'User', 'Application', 'Document', 'StatusHistory', 'AuditLog',
-    'Notification', 'UniteConsulaire', 'Service', 'UniteConsulaire_Service'
+    'Notification', 'UniteConsulaire', 'Service', 'UniteConsulaire_Service',
+    'TrackingSnapshot', 'KeyRotationJob', 'SchemaVersion', 'AgentCompetence',
+    'SlaUnitStats', 'NotificationCounter', 'ApplicationDailyStats', 'ApplicationDailyDuration'
 ]
@@ -0,0 +1,180 @@
+# Chiffrement au niveau des champs (AES-256-GCM, identifiant de clé dans le chiffré)
+# Format compact: e1:<kid>:<base64url(nonce || chiffré || tag)> sans double encodage.
+# Module autonome (sans l'application Flask) pour être utilisable dans un pool de processus.
+import os
+import re
+import base64
+import threading
+from datetime import date
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from sqlalchemy.types import TypeDecorator, String
+
+PREFIX = 'e1:'
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+class FieldDecryptionError(Exception):
+    """Chiffré illisible (clé inconnue ou données altérées)"""
+
+def b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def encrypted_length(plaintext_length, kid_length=8):
+    """Longueur maximale du chiffré pour une valeur de plaintext_length caractères UTF-8"""
+    raw = NONCE_SIZE + plaintext_length * 4 + TAG_SIZE
+    return len(PREFIX) + kid_length + 1 + (raw * 4 + 2) // 3
+
+def is_encrypted(value):
+    return isinstance(value, str) and value.startswith(PREFIX)
+
+def key_id(value):
+    """Identifiant de la clé d'un chiffré (None pour une valeur en clair)"""
+    if not is_encrypted(value):
+        return None
+    return value[len(PREFIX):].split(':', 1)[0]
+
+class Keyring:
+    """Jeu de clés indexé par identifiant; une clé active pour chiffrer"""
+
+    def __init__(self, keys, active_kid):
+        self.keys = {kid: AESGCM(key) for kid, key in keys.items()}
+        self.active_kid = active_kid if active_kid in keys else None
+
+    @property
+    def enabled(self):
+        return self.active_kid is not None
+
+    def encrypt(self, plaintext, context=''):
+        if plaintext is None or not self.enabled:
+            return plaintext
+        nonce = os.urandom(NONCE_SIZE)
+        sealed = self.keys[self.active_kid].encrypt(nonce, plaintext.encode('utf-8'), context.encode('utf-8'))
+        return f'{PREFIX}{self.active_kid}:{b64encode(nonce + sealed)}'
+
+    def decrypt(self, value, context=''):
+        """Déchiffrer; les valeurs en clair (antérieures au chiffrement) sont retournées telles quelles"""
+        if not is_encrypted(value):
+            return value
+        try:
+            kid, payload = value[len(PREFIX):].split(':', 1)
+            raw = b64decode(payload)
+            plaintext = self.keys[kid].decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], context.encode('utf-8'))
+        except KeyError:
+            raise FieldDecryptionError(f'Clé de chiffrement inconnue: {value[len(PREFIX):].split(":", 1)[0]}')
+        except Exception as e:
+            raise FieldDecryptionError(f'Chiffré invalide: {e}')
+        return plaintext.decode('utf-8')
+
+    def reencrypt(self, value, context=''):
+        """Rechiffrer avec la clé active; None si la valeur est déjà à jour"""
+        if value is None or key_id(value) == self.active_kid:
+            return None
+        return self.encrypt(self.decrypt(value, context), context)
+
+def kid_order(kid):
+    """Ordre des identifiants de clé: suffixe numérique comparé comme un nombre (k9 < k10)"""
+    match = re.match(r'(.*?)(\d+)$', kid)
+    return (match.group(1), int(match.group(2))) if match else (kid, -1)
+
+def load_keyring(environ=None):
+    """Construire le jeu de clés depuis l'environnement
+
+    FIELD_ENCRYPTION_KEYS="kid1:<clé base64 32 octets>,kid2:<...>" et
+    FIELD_ENCRYPTION_ACTIVE_KID=kid2. Une clé 'k0' est toujours dérivée
+    (HKDF-SHA256) d'ENCRYPTION_KEY quand elle est définie: les chiffrés e1:k0:
+    écrits avant la première rotation restent lisibles. Sans clé active explicite,
+    la plus récente selon kid_order; sans aucune clé le chiffrement est désactivé.
+    """
+    environ = os.environ if environ is None else environ
+    keys = {}
+    for entry in environ.get('FIELD_ENCRYPTION_KEYS', '').split(','):
+        if ':' in entry:
+            kid, key = entry.strip().split(':', 1)
+            keys[kid] = b64decode(key.strip())
+
+    if environ.get('ENCRYPTION_KEY') and 'k0' not in keys:
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+        keys['k0'] = HKDF(algorithm=hashes.SHA256(), length=32, salt=b'e-consulaire-rdc-fields',
+                          info=b'field-encryption').derive(environ['ENCRYPTION_KEY'].encode('utf-8'))
+
+    active_kid = environ.get('FIELD_ENCRYPTION_ACTIVE_KID') or (max(keys, key=kid_order) if keys else None)
+    return Keyring(keys, active_kid)
+
+def generate_key_entry(kid):
+    """Nouvelle entrée 'kid:clé' pour FIELD_ENCRYPTION_KEYS"""
+    return f'{kid}:{b64encode(AESGCM.generate_key(bit_length=256))}'
+
+_keyring = None
+_keyring_lock = threading.Lock()
+
+def get_keyring():
+    global _keyring
+    if _keyring is None:
+        with _keyring_lock:
+            if _keyring is None:
+                _keyring = load_keyring()
+    return _keyring
+
+def set_keyring(keyring):
+    global _keyring
+    _keyring = keyring
+
+class EncryptedString(TypeDecorator):
+    """Colonne texte chiffrée de façon transparente (context lie le chiffré à la colonne)"""
+    impl = String
+    cache_ok = True
+
+    def __init__(self, length, context):
+        self.plain_length = length
+        self.context = context
+        super().__init__(encrypted_length(length))
+
+    def process_bind_param(self, value, dialect):
+        return get_keyring().encrypt(value, self.context)
+
+    def process_result_value(self, value, dialect):
+        return get_keyring().decrypt(value, self.context)
+
+class EncryptedDate(TypeDecorator):
+    """Date chiffrée (stockée en ISO 8601 chiffré)"""
+    impl = String
+    cache_ok = True
+
+    def __init__(self, context):
+        self.context = context
+        super().__init__(encrypted_length(10))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, str):
+            value = value.isoformat()
+        return get_keyring().encrypt(value, self.context)
+
+    def process_result_value(self, value, dialect):
+        value = get_keyring().decrypt(value, self.context)
+        if value is None or isinstance(value, date):
+            return value
+        return date.fromisoformat(value[:10])
+
+def rotate_rows(rows, contexts):
+    """Rechiffrer un lot [(id, {colonne: valeur brute})] avec la clé active
+
+    Retourne [(id, {colonne: nouvelle valeur}, {colonne: ancienne valeur})]
+    pour les seules lignes à modifier. Exécuté dans les processus du pool.
+    """
+    keyring = get_keyring()
+    changes = []
+    for row_id, values in rows:
+        updated = {}
+        for column, value in values.items():
+            new_value = keyring.reencrypt(value, contexts[column])
+            if new_value is not None:
+                updated[column] = new_value
+        if updated:
+            changes.append((row_id, updated, {column: values[column] for column in updated}))
+    return changes
@@ -2,6 +2,7 @@ from datetime import datetime
 from app import db
 from flask_login import UserMixin
 from sqlalchemy import func
+from .encryption import EncryptedString, EncryptedDate
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -19,16 +20,16 @@ class User(UserMixin, db.Model):
     last_login = db.Column(db.DateTime)
     photo_url = db.Column(db.String(500))
     genre = db.Column(db.String(10))
-    date_naissance = db.Column(db.Date)
-    lieu_naissance = db.Column(db.String(100))
+    date_naissance = db.Column(EncryptedDate('user.date_naissance'))
+    lieu_naissance = db.Column(EncryptedString(100, 'user.lieu_naissance'))
     etat_civil = db.Column(db.String(20))
     nationalite = db.Column(db.String(50), default='Congolaise')
     profession = db.Column(db.String(100))
-    adresse_rue = db.Column(db.String(200))
-    adresse_ville = db.Column(db.String(100))
+    adresse_rue = db.Column(EncryptedString(200, 'user.adresse_rue'))
+    adresse_ville = db.Column(EncryptedString(100, 'user.adresse_ville'))
     adresse_pays = db.Column(db.String(100))
-    code_postal = db.Column(db.String(20))
-    numero_passeport = db.Column(db.String(50))
+    code_postal = db.Column(EncryptedString(20, 'user.code_postal'))
+    numero_passeport = db.Column(EncryptedString(50, 'user.numero_passeport'))
     passeport_date_emission = db.Column(db.Date)
     passeport_date_expiration = db.Column(db.Date)
     unite_consulaire_id = db.Column(db.Integer, db.ForeignKey('unite_consulaire.id'), nullable=True)
@@ -66,11 +67,23 @@ class Application(db.Model):
     appointment_date = db.Column(db.DateTime)
     payment_amount = db.Column(db.Float, default=0.0)
     payment_status = db.Column(db.String(20), default='pending')
+    # Échéance de traitement (SLA), suspendue pendant documents_requis
+    due_at = db.Column(db.DateTime)
+    sla_paused_at = db.Column(db.DateTime)
+    sla_met = db.Column(db.Boolean)  # Décision rendue avant l'échéance (None: pas encore décidée)
+    escalated_at = db.Column(db.DateTime)
     documents = db.relationship('Document', backref='application', lazy=True, cascade='all, delete-orphan')
     status_history = db.relationship('StatusHistory', backref='application', lazy=True, cascade='all, delete-orphan')
     processor = db.relationship('User', foreign_keys=[processed_by], backref='processed_applications')
     unite_consulaire = db.relationship('UniteConsulaire', foreign_keys=[unite_consulaire_id], backref='applications')
     
+    __table_args__ = (
+        # File d'attente d'une unité: demandes soumises, plus anciennes d'abord
+        db.Index('ix_application_queue', 'unite_consulaire_id', 'status', 'created_at'),
+        # Demandes en retard ou à risque: statut ouvert et échéance dépassée/proche
+        db.Index('ix_application_sla', 'status', 'due_at'),
+    )
+    
     def __init__(self, **kwargs):
         super(Application, self).__init__(**kwargs)
         if not self.reference_number:
@@ -143,6 +156,23 @@ class StatusHistory(db.Model):
             'cloture': 'Dossier Clôturé'
         }
 
+class TrackingSnapshot(db.Model):
+    """Vue dénormalisée du suivi public d'une demande (une ligne par référence)"""
+    __tablename__ = 'tracking_snapshot'
+
+    reference_number = db.Column(db.String(20), primary_key=True)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False, unique=True)
+    status = db.Column(db.String(20), nullable=False)
+    status_display = db.Column(db.String(100))
+    service_display = db.Column(db.String(200))
+    unite_nom = db.Column(db.String(200))
+    unite_email = db.Column(db.String(120))
+    unite_telephone = db.Column(db.String(20))
+    history = db.Column(db.Text)
+    submitted_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    etag = db.Column(db.String(64), nullable=False)
+
 class AuditLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
@@ -154,6 +184,43 @@ class AuditLog(db.Model):
     user_agent = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', foreign_keys=[user_id], backref='audit_logs')
+    __table_args__ = (
+        db.Index('ix_audit_log_created_at', 'created_at'),
+        db.Index('ix_audit_log_action_created_at', 'action', 'created_at'),
+    )
+
+class KeyRotationJob(db.Model):
+    """Rechiffrement des champs sensibles par lots (reprise possible après interruption)"""
+    __tablename__ = 'key_rotation_job'
+
+    id = db.Column(db.Integer, primary_key=True)
+    target_kid = db.Column(db.String(16), nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, running, completed, failed
+    last_id = db.Column(db.Integer, default=0)
+    rows_total = db.Column(db.Integer, default=0)
+    rows_scanned = db.Column(db.Integer, default=0)
+    rows_rotated = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    started_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def get_progress(self):
+        if not self.rows_total:
+            return 100 if self.status == 'completed' else 0
+        return min(100, round(self.rows_scanned * 100 / self.rows_total))
+
+class SchemaVersion(db.Model):
+    """Ligne unique marquant la version du schéma et des données initiales appliquées"""
+    __tablename__ = 'schema_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    schema_version = db.Column(db.Integer, nullable=False, default=0)
+    seed_version = db.Column(db.Integer, nullable=False, default=0)
+    demo_data = db.Column(db.Boolean, default=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    applied_by = db.Column(db.String(100))  # hôte:pid du processus d'amorçage
 
 class Notification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -161,9 +228,20 @@ class Notification(db.Model):
     title = db.Column(db.String(200), nullable=False)
     message = db.Column(db.Text, nullable=False)
     type = db.Column(db.String(20), default='info')
-    is_read = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    reference_id = db.Column(db.Integer, index=True)  # Demande concernée, le cas échéant
+    # Ancienne valeur chargée avant modification: compteurs de non-lues (notification_counter)
+    is_read = db.column_property(db.Column(db.Boolean, default=False), active_history=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     user = db.relationship('User', foreign_keys=[user_id], backref='notifications')
+    __table_args__ = (db.Index('ix_notification_user_unread', 'user_id', 'is_read'),)
+
+class NotificationCounter(db.Model):
+    """Nombre de notifications non lues d'un utilisateur, tenu à jour dans la transaction
+    qui les crée, les lit ou les supprime (badges sans COUNT)"""
+    __tablename__ = 'notification_counter'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
 
 class UniteConsulaire(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -223,6 +301,61 @@ class Service(db.Model):
     def __repr__(self):
         return f'<Service {self.nom}>'
 
+class SlaUnitStats(db.Model):
+    """Compteurs SLA d'une unité, tenus à jour à chaque décision et par le balayage périodique"""
+    __tablename__ = 'sla_unit_stats'
+
+    unite_consulaire_id = db.Column(db.Integer, db.ForeignKey('unite_consulaire.id'), primary_key=True)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    completed_on_time = db.Column(db.Integer, nullable=False, default=0)
+    escalated = db.Column(db.Integer, nullable=False, default=0)
+    open_overdue = db.Column(db.Integer, nullable=False, default=0)
+    open_at_risk = db.Column(db.Integer, nullable=False, default=0)
+    swept_at = db.Column(db.DateTime)
+    unite_consulaire = db.relationship('UniteConsulaire')
+
+    def get_compliance(self):
+        if not self.completed:
+            return None
+        return round(self.completed_on_time * 100 / self.completed, 1)
+
+class ApplicationDailyStats(db.Model):
+    """Faits journaliers des rapports: demandes entrées dans un statut, par unité et service
+    (unité sans clé étrangère: les faits survivent à la suppression d'une unité)"""
+    __tablename__ = 'application_daily_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    unite_consulaire_id = db.Column(db.Integer, primary_key=True)
+    service_type = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    transitions = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)  # Somme des payment_amount
+    processing_count = db.Column(db.Integer, nullable=False, default=0)  # Décisions avec durée
+    processing_seconds = db.Column(db.Float, nullable=False, default=0.0)  # Soumission -> décision
+
+class ApplicationDailyDuration(db.Model):
+    """Histogramme journalier des durées de traitement (médianes par période)"""
+    __tablename__ = 'application_daily_duration'
+
+    day = db.Column(db.Date, primary_key=True)
+    unite_consulaire_id = db.Column(db.Integer, primary_key=True)
+    service_type = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)  # Classe de reporting_service.DURATION_BUCKETS_HOURS
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class AgentCompetence(db.Model):
+    """Service qu'un agent traite en priorité (attribution automatique des demandes)"""
+    __tablename__ = 'agent_competence'
+
+    id = db.Column(db.Integer, primary_key=True)
+    agent_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('service.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    agent = db.relationship('User', foreign_keys=[agent_id], backref='competences')
+    service = db.relationship('Service')
+    __table_args__ = (db.UniqueConstraint('agent_id', 'service_id', name='uq_agent_competence'),)
+
 class UniteConsulaire_Service(db.Model):
     __tablename__ = 'unite_service'
     
@@ -1,18 +1,25 @@
 import os
 import json
 from datetime import datetime
-from flask import render_template, redirect, url_for, flash, request, send_file, abort, jsonify
+from flask import render_template, redirect, url_for, flash, request, send_file, abort, jsonify, make_response
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
 from app import app, db, mail
 from backend.models import User, Application, Document, StatusHistory, AuditLog, Notification, UniteConsulaire, Service, UniteConsulaire_Service
-from backend.services import NotificationService, email_service
+from backend.services import (NotificationService, email_service, tracking_service, password_service,
+                              assignment_service)
+from backend.services.password_service import PasswordVerificationBusy
 from sqlalchemy import func
 from backend.forms import (LoginForm, RegisterForm, ConsularCardForm, CareAttestationForm, 
                    LegalizationsForm, PassportForm, OtherDocumentsForm, ApplicationStatusForm,
                    EmergencyPassForm, CivilStatusForm, PowerAttorneyForm)
 from backend.utils import generate_pdf_document, send_notification_email, log_audit, get_user_consular_unit
+from backend.db_routing import replica_read
+
+@app.errorhandler(PasswordVerificationBusy)
+def password_verification_busy(error):
+    flash('Service de connexion momentanément surchargé. Veuillez réessayer.', 'error')
+    return redirect(request.url)
 
 # Redirect root to user login by default
 @app.route('/')
@@ -40,7 +47,7 @@ def user_login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and check_password_hash(user.password_hash, form.password.data):
+        if user and password_service.verify_and_update(user, form.password.data):
             if user.active and user.role == 'usager':
                 login_user(user, remember=form.remember_me.data)
                 user.last_login = datetime.utcnow()
@@ -70,7 +77,7 @@ def admin_login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and check_password_hash(user.password_hash, form.password.data):
+        if user and password_service.verify_and_update(user, form.password.data):
             if user.active and user.role in ['admin', 'agent', 'superviseur']:
                 login_user(user, remember=form.remember_me.data)
                 user.last_login = datetime.utcnow()
@@ -103,7 +110,7 @@ def consulate_login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and check_password_hash(user.password_hash, form.password.data):
+        if user and password_service.verify_and_update(user, form.password.data):
             if user.active and user.role == 'agent':
                 login_user(user, remember=form.remember_me.data)
                 user.last_login = datetime.utcnow()
@@ -162,7 +169,7 @@ def register():
         user.country = form.country.data
         user.city = form.city.data
         user.unite_consulaire_id = form.unite_consulaire_id.data
-        user.password_hash = generate_password_hash(form.password.data)
+        user.password_hash = password_service.hash_password(form.password.data)
         user.language = form.language.data
         user.role = 'usager'  # Default role for new users
         
@@ -192,26 +199,47 @@ from backend.routes import routes_agent
 
 # Route publique pour le suivi de demande
 @app.route('/track', methods=['GET', 'POST'])
+@replica_read
 def track_application():
     """Suivi de demande par numéro de référence (accessible sans connexion)"""
-    application = None
-    status_history = None
-    
     if request.method == 'POST':
         reference_number = request.form.get('reference_number', '').strip()
-        if reference_number:
-            # Rechercher l'application par numéro de référence
-            application = Application.query.filter_by(reference_number=reference_number).first()
-            
-            if application:
-                # Récupérer l'historique des statuts
-                status_history = StatusHistory.query.filter_by(
-                    application_id=application.id
-                ).order_by(StatusHistory.timestamp.desc()).all()
-    
-    return render_template('public/track_application.html', 
-                         application=application,
-                         status_history=status_history)
+    else:
+        reference_number = request.args.get('reference', '').strip()
+    
+    # Instantané dénormalisé: au plus une lecture par clé primaire, jamais la table user
+    tracking = tracking_service.get_snapshot(reference_number) if reference_number else None
+    
+    response = make_response(render_template('public/track_application.html',
+                                             tracking=tracking,
+                                             reference_number=reference_number))
+    if tracking and request.method == 'GET':
+        viewer = current_user.get_id() if current_user.is_authenticated else 'anon'
+        response.set_etag(f"{tracking['etag']}-{viewer}", weak=True)
+        response.cache_control.private = True
+        response.cache_control.max_age = tracking_service.cache_ttl
+        return response.make_conditional(request)
+    return response
+
+@app.route('/api/track/<reference_number>')
+@replica_read
+def api_track_application(reference_number):
+    """API publique de suivi (JSON) avec ETag et cache court"""
+    tracking = tracking_service.get_snapshot(reference_number.strip())
+    if not tracking:
+        return jsonify({'error': 'Demande non trouvée'}), 404
+    
+    data = dict(tracking)
+    data['submitted_at'] = tracking['submitted_at'].isoformat() if tracking['submitted_at'] else None
+    data['updated_at'] = tracking['updated_at'].isoformat() if tracking['updated_at'] else None
+    data['history'] = [dict(entry, timestamp=entry['timestamp'].isoformat()) for entry in tracking['history']]
+    etag = data.pop('etag')
+    
+    response = jsonify(data)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = tracking_service.cache_ttl
+    return response.make_conditional(request)
 
 @app.route('/logout')
 @login_required
@@ -223,6 +251,7 @@ def logout():
 
 @app.route('/user-dashboard')
 @login_required
+@replica_read
 def user_dashboard():
     if current_user.role != 'usager':
         if current_user.role in ['admin', 'agent', 'superviseur']:
@@ -241,6 +270,7 @@ def user_dashboard():
 
 @app.route('/admin-dashboard')
 @login_required
+@replica_read
 def admin_dashboard_legacy():
     if not current_user.is_admin():
         abort(403)
@@ -294,6 +324,7 @@ def admin_config_page():
 
 @app.route('/consulate-dashboard')
 @login_required  
+@replica_read
 def consulate_dashboard():
     if current_user.role != 'agent':
         abort(403)
@@ -317,6 +348,7 @@ def consulate_dashboard():
                          recent_applications=recent_applications)
 
 @app.route('/api/countries-cities')
+@replica_read
 def get_countries_cities():
     """API endpoint to get countries and cities with active consular units"""
     try:
@@ -458,6 +490,7 @@ def consular_card():
         db.session.add(status_history)
         
         db.session.commit()
+        assignment_service.notify_submission(application)
         
         # Déclencher les notifications pour les agents de l'unité consulaire
         NotificationService.notify_new_application(application)
@@ -540,6 +573,7 @@ def care_attestation():
         db.session.add(status_history)
         
         db.session.commit()
+        assignment_service.notify_submission(application)
         
         log_audit(current_user.id, 'create_application', 'application', application.id, 'Care attestation application submitted')
         
@@ -604,6 +638,7 @@ def legalizations():
         db.session.add(status_history)
         
         db.session.commit()
+        assignment_service.notify_submission(application)
         
         log_audit(current_user.id, 'create_application', 'application', application.id, 'Legalizations application submitted')
         
@@ -674,6 +709,7 @@ def passport():
         db.session.add(status_history)
         
         db.session.commit()
+        assignment_service.notify_submission(application)
         
         log_audit(current_user.id, 'create_application', 'application', application.id, 'Passport application submitted')
         
@@ -733,6 +769,7 @@ def other_documents():
         db.session.add(status_history)
         
         db.session.commit()
+        assignment_service.notify_submission(application)
         
         log_audit(current_user.id, 'create_application', 'application', application.id, 'Other documents application submitted')
         
@@ -821,6 +858,7 @@ def emergency_pass():
         db.session.add(status_history)
         
         db.session.commit()
+        assignment_service.notify_submission(application)
         
         flash(f'Votre demande d\'urgence a été soumise. Référence: {application.reference_number}', 'success')
         return redirect(url_for('view_application', id=application.id))
@@ -907,6 +945,7 @@ def civil_status():
         db.session.add(status_history)
         
         db.session.commit()
+        assignment_service.notify_submission(application)
         
         flash(f'Votre demande d\'état civil a été soumise. Référence: {application.reference_number}', 'success')
         return redirect(url_for('view_application', id=application.id))
@@ -996,6 +1035,7 @@ def power_attorney():
         db.session.add(status_history)
         
         db.session.commit()
+        assignment_service.notify_submission(application)
         
         flash(f'Votre demande de procuration a été soumise. Référence: {application.reference_number}', 'success')
         return redirect(url_for('view_application', id=application.id))
@@ -1186,6 +1226,7 @@ def unit_services(unit_id):
 
 @app.route('/admin/hierarchy')
 @login_required
+@replica_read
 def system_hierarchy():
     """Vue d'ensemble de la hiérarchie du système"""
     if not current_user.is_admin():
@@ -1218,6 +1259,7 @@ def system_hierarchy():
 
 @app.route('/agent/my-unit')
 @login_required
+@replica_read
 def agent_unit_dashboard():
     """Interface pour les agents pour gérer leur unité"""
     if current_user.role != 'agent':
@@ -1237,6 +1279,7 @@ def agent_unit_dashboard():
                          recent_applications=recent_applications)
 
 @app.route('/api/units-by-location')
+@replica_read
 def api_units_by_location():
     """API pour récupérer les unités consulaires par localisation (pour les formulaires)"""
     country = request.args.get('country', '')
@@ -1261,6 +1304,7 @@ def api_units_by_location():
     } for unit in units])
 
 @app.route('/api/unit-services/<int:unit_id>')
+@replica_read
 def api_unit_services(unit_id):
     """API pour récupérer les services disponibles pour une unité"""
     unit = UniteConsulaire.query.get_or_404(unit_id)
@@ -1276,6 +1320,7 @@ def api_unit_services(unit_id):
 # API Routes pour l'administration
 @app.route('/api/admin/users', methods=['GET', 'POST'])
 @login_required
+@replica_read
 def api_admin_users():
     """API pour gérer les utilisateurs"""
     if not current_user.is_admin():
@@ -1325,7 +1370,7 @@ def api_admin_users():
             user.role = role
             user.active = True
             user.profile_complete = True
-            user.password_hash = generate_password_hash('motdepasse123')  # Mot de passe temporaire
+            user.password_hash = password_service.hash_password('motdepasse123')  # Mot de passe temporaire
             
             if role == 'agent' and unit_id:
                 user.unite_consulaire_id = int(unit_id)
@@ -1343,6 +1388,7 @@ def api_admin_users():
 
 @app.route('/api/admin/units', methods=['GET', 'POST'])
 @login_required
+@replica_read
 def api_admin_units():
     """API pour gérer les unités consulaires"""
     if not current_user.is_admin():
@@ -1445,6 +1491,7 @@ def api_admin_units():
 
 @app.route('/api/admin/units/<int:unit_id>', methods=['GET', 'PUT', 'DELETE'])
 @login_required
+@replica_read
 def api_admin_unit_detail(unit_id):
     """API pour gérer une unité consulaire spécifique"""
     if not current_user.is_admin():
@@ -1600,6 +1647,7 @@ def api_assign_user_unit(user_id):
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/system-overview')
+@replica_read
 def system_overview():
     """Vue publique du système e-consulaire hiérarchique (sans données sensibles)"""
     
@@ -1628,6 +1676,26 @@ def system_overview():
     
     return render_template('public/system_overview.html', stats=stats, units=units_data)
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Métriques au format Prometheus (jeton METRICS_TOKEN, obligatoire en production)"""
+    import hmac
+    from backend.utils.metrics import metrics
+    
+    if metrics.token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied, metrics.token):
+            abort(404)
+    elif os.environ.get('FLASK_ENV') == 'production':
+        # Derrière le proxy inverse local, tout client apparaît en 127.0.0.1
+        abort(404)
+    elif request.remote_addr not in ('127.0.0.1', '::1') or 'X-Forwarded-For' in request.headers:
+        abort(404)
+    
+    response = make_response(metrics.exposition())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
 # Logout route already exists elsewhere
 
 # Auth blueprint already registered in app.py
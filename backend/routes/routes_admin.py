@@ -5,7 +5,11 @@ from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from functools import wraps
 from app import app, db
-from backend.models import User, UniteConsulaire, Service, UniteConsulaire_Service, Application, AuditLog
+from backend.models import (User, UniteConsulaire, Service, UniteConsulaire_Service, Application,
+                            AgentCompetence)
+from backend.services import sla_service
+from backend.utils import log_audit
+from backend.db_routing import replica_read
 import json
 from datetime import datetime
 
@@ -37,6 +41,7 @@ def admin_unit_access_required(f):
 @login_required
 @admin_required
 @admin_unit_access_required
+@replica_read
 def admin_unit_dashboard():
     """Tableau de bord de l'admin pour son unité consulaire"""
     unit = current_user.unite_consulaire
@@ -165,13 +170,14 @@ def admin_configure_service(service_id):
         action_msg = f'Service {service.nom} configuré'
     
     db.session.commit()
+    sla_service.invalidate_delays(unit.id)
     
     # Audit log
-    AuditLog.log_action(
+    log_audit(
         user_id=current_user.id,
         action='configure_service',
-        table_name='unite_service',
-        record_id=service_id,
+        resource='unite_service',
+        resource_id=service_id,
         details=f'{action_msg} - Tarif: {tarif_personnalise} {devise}'
     )
     
@@ -203,11 +209,11 @@ def admin_toggle_service(service_id):
     flash(f'Service {config.service.nom} {status}.', 'success')
     
     # Audit log
-    AuditLog.log_action(
+    log_audit(
         user_id=current_user.id,
         action='toggle_service',
-        table_name='unite_service',
-        record_id=config.id,
+        resource='unite_service',
+        resource_id=config.id,
         details=f'Service {config.service.nom} {status}'
     )
     
@@ -235,10 +241,49 @@ def admin_unit_personnel():
     admins = [u for u in personnel if u.role == 'admin']
     agents = [u for u in personnel if u.role == 'agent']
     
+    # Compétences utilisées par l'attribution automatique des demandes
+    services = Service.query.filter_by(actif=True).order_by(Service.nom).all()
+    competences = {}
+    for competence in AgentCompetence.query.filter(AgentCompetence.agent_id.in_([a.id for a in agents])).all():
+        competences.setdefault(competence.agent_id, set()).add(competence.service_id)
+    
     return render_template('admin/unit_personnel.html', 
                          unit=unit,
                          admins=admins,
-                         agents=agents)
+                         agents=agents,
+                         services=services,
+                         competences=competences)
+
+@app.route('/admin/my-unit/personnel/<int:agent_id>/competences', methods=['POST'])
+@login_required
+@admin_required
+@admin_unit_access_required
+def admin_agent_competences(agent_id):
+    """Définir les services traités en priorité par un agent de mon unité"""
+    agent = User.query.get_or_404(agent_id)
+    if agent.unite_consulaire_id != current_user.unite_consulaire_id or agent.role != 'agent':
+        flash('Cet agent n\'appartient pas à votre unité.', 'error')
+        return redirect(url_for('admin_unit_personnel'))
+    
+    service_ids = {s.id for s in Service.query.filter(
+        Service.id.in_(request.form.getlist('service_ids', type=int))
+    ).all()}
+    AgentCompetence.query.filter_by(agent_id=agent.id).delete()
+    for service_id in service_ids:
+        db.session.add(AgentCompetence(agent_id=agent.id, service_id=service_id))
+    db.session.commit()
+    
+    # Audit log
+    log_audit(
+        user_id=current_user.id,
+        action='update_agent_competences',
+        resource='user',
+        resource_id=agent.id,
+        details=f'{len(service_ids)} compétence(s) pour {agent.get_full_name()}'
+    )
+    
+    flash(f'Compétences de {agent.get_full_name()} mises à jour.', 'success')
+    return redirect(url_for('admin_unit_personnel'))
 
 # ===============================
 # INFORMATIONS DE L'UNITÉ
@@ -268,11 +313,11 @@ def admin_unit_info():
         db.session.commit()
         
         # Audit log
-        AuditLog.log_action(
+        log_audit(
             user_id=current_user.id,
             action='update_unit_info',
-            table_name='unite_consulaire',
-            record_id=unit.id,
+            resource='unite_consulaire',
+            resource_id=unit.id,
             details=f'Informations de l\'unité {unit.nom} mises à jour'
         )
         
@@ -5,7 +5,11 @@ from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from functools import wraps
 from app import app, db
-from backend.models import User, UniteConsulaire, Application, StatusHistory, Notification, AuditLog
+from backend.models import User, UniteConsulaire, Application, StatusHistory, Notification
+from backend.services import NotificationService, claim_service, event_service, notification_counter_service
+from backend.utils import log_audit
+from backend.db_routing import replica_read
+import json
 from datetime import datetime
 
 def agent_required(f):
@@ -35,6 +39,7 @@ def agent_unit_access_required(f):
 @app.route('/agent/dashboard')
 @login_required
 @agent_required
+@replica_read
 def agent_dashboard():
     """Tableau de bord de l'agent"""
     if not current_user.unite_consulaire_id:
@@ -61,16 +66,10 @@ def agent_dashboard():
     ).filter(Application.status.in_(['validee', 'rejetee']))\
      .order_by(Application.updated_at.desc()).limit(5).all()
     
-    # Notifications non lues
-    unread_notifications = Notification.query.filter_by(
-        user_id=current_user.id,
-        lu=False
-    ).order_by(Notification.created_at.desc()).all()
-    
     stats = {
         'pending_count': len(pending_applications),
         'processing_count': len(processing_applications),
-        'notifications_count': len(unread_notifications),
+        'notifications_count': notification_counter_service.unread(current_user.id),
         'unit_name': unit.nom
     }
     
@@ -78,8 +77,7 @@ def agent_dashboard():
                          stats=stats,
                          pending_applications=pending_applications,
                          processing_applications=processing_applications,
-                         recently_processed=recently_processed,
-                         unread_notifications=unread_notifications)
+                         recently_processed=recently_processed)
 
 # =============================
 # GESTION DES DEMANDES
@@ -89,6 +87,7 @@ def agent_dashboard():
 @login_required
 @agent_required
 @agent_unit_access_required
+@replica_read
 def agent_pending_applications():
     """Liste des demandes en attente de traitement"""
     unit = current_user.unite_consulaire
@@ -115,46 +114,41 @@ def agent_take_application(app_id):
         flash('Cette demande n\'appartient pas à votre unité.', 'error')
         return redirect(url_for('agent_pending_applications'))
     
-    # Vérifier que l'application n'est pas déjà prise
-    if application.status != 'soumise':
+    # UPDATE conditionnel: un seul agent peut réussir, même en cas de clics simultanés
+    application = claim_service.claim(app_id, current_user)
+    if application is None:
         flash('Cette demande est déjà en cours de traitement.', 'error')
         return redirect(url_for('agent_pending_applications'))
     
-    # Mettre à jour le statut
-    application.status = 'en_traitement'
-    application.processed_by = current_user.id
-    application.updated_at = datetime.utcnow()
-    
-    # Ajouter l'historique
-    status_history = StatusHistory(
-        application_id=application.id,
-        old_status='soumise',
-        new_status='en_traitement',
-        changed_by=current_user.id,
-        comment=f'Demande prise en charge par {current_user.get_full_name()}'
-    )
-    db.session.add(status_history)
-    
-    # Marquer la notification comme lue si elle existe
-    notification = Notification.query.filter_by(
+    # Audit log
+    log_audit(
         user_id=current_user.id,
-        type_notification='nouvelle_demande',
-        reference_id=application.id,
-        lu=False
-    ).first()
-    if notification:
-        notification.lu = True
-        notification.lu_at = datetime.utcnow()
+        action='take_application',
+        resource='application',
+        resource_id=application.id,
+        details=f'Demande {application.reference_number} prise en charge'
+    )
     
-    db.session.commit()
+    flash(f'Demande {application.reference_number} prise en charge.', 'success')
+    return redirect(url_for('agent_process_application', app_id=application.id))
+
+@app.route('/agent/applications/next', methods=['POST'])
+@login_required
+@agent_required
+@agent_unit_access_required
+def agent_take_next_application():
+    """Prendre en charge la plus ancienne demande en attente de l'unité"""
+    application = claim_service.claim_next(current_user)
+    if application is None:
+        flash('Aucune demande en attente dans votre unité.', 'info')
+        return redirect(url_for('agent_pending_applications'))
     
-    # Audit log
-    AuditLog.log_action(
+    log_audit(
         user_id=current_user.id,
         action='take_application',
-        table_name='application',
-        record_id=application.id,
-        details=f'Demande {application.reference_number} prise en charge'
+        resource='application',
+        resource_id=application.id,
+        details=f'Demande {application.reference_number} prise en charge (file d\'attente)'
     )
     
     flash(f'Demande {application.reference_number} prise en charge.', 'success')
@@ -222,30 +216,19 @@ def agent_process_application(app_id):
         )
         db.session.add(status_history)
         
-        # Créer une notification pour l'utilisateur
-        notification = Notification(
-            user_id=application.user_id,
-            type_notification='demande_traitee',
-            title=f'Demande {application.reference_number}',
-            message=f'Statut mis à jour: {application.get_status_display()}',
-            reference_id=application.id
-        )
-        db.session.add(notification)
-        
         db.session.commit()
         
         # Envoyer les notifications (interface + email)
-        from notification_service import NotificationService
         NotificationService.notify_application_status_change(
             application, old_status, application.status, comment
         )
         
         # Audit log
-        AuditLog.log_action(
+        log_audit(
             user_id=current_user.id,
             action=audit_action,
-            table_name='application',
-            record_id=application.id,
+            resource='application',
+            resource_id=application.id,
             details=f'Demande {application.reference_number} {application.status}'
         )
         
@@ -309,8 +292,7 @@ def agent_mark_notification_read(notif_id):
         user_id=current_user.id
     ).first_or_404()
     
-    notification.lu = True
-    notification.lu_at = datetime.utcnow()
+    notification.is_read = True
     db.session.commit()
     
     return jsonify({'success': True})
@@ -320,13 +302,12 @@ def agent_mark_notification_read(notif_id):
 @agent_required
 def agent_mark_all_notifications_read():
     """Marquer toutes les notifications comme lues"""
-    Notification.query.filter_by(
+    read = Notification.query.filter_by(
         user_id=current_user.id,
-        lu=False
-    ).update({
-        'lu': True,
-        'lu_at': datetime.utcnow()
-    })
+        is_read=False
+    ).update({'is_read': True})
+    notification_counter_service.adjust(current_user.id, -read)
+    event_service.emit('notifications', current_user.id)
     
     db.session.commit()
     
@@ -342,12 +323,7 @@ def agent_mark_all_notifications_read():
 @agent_required
 def api_agent_notifications_count():
     """API pour obtenir le nombre de notifications non lues"""
-    count = Notification.query.filter_by(
-        user_id=current_user.id,
-        lu=False
-    ).count()
-    
-    return jsonify({'count': count})
+    return jsonify({'count': notification_counter_service.unread(current_user.id)})
 
 @app.route('/api/agent/pending-applications/count')
 @login_required
@@ -360,4 +336,24 @@ def api_agent_pending_count():
         status='soumise'
     ).count()
     
-    return jsonify({'count': count})
\ No newline at end of file
+    return jsonify({'count': count})
+
+@app.route('/api/agent/events')
+@login_required
+@agent_required
+def api_agent_events():
+    """Flux SSE des compteurs (notifications non lues, demandes en attente de l'unité);
+    503 si le serveur ne peut pas garder la connexion: le navigateur revient aux API ci-dessus"""
+    if not event_service.streaming_available(request.environ):
+        return jsonify({'error': 'Flux temps réel indisponible'}), 503
+    
+    channels = [('notifications', current_user.id)]
+    initial = [('notifications', {'count': notification_counter_service.unread(current_user.id)})]
+    if current_user.unite_consulaire_id:
+        channels.append(('queue', current_user.unite_consulaire_id))
+        initial.append(('queue', {'count': Application.query.filter_by(
+            unite_consulaire_id=current_user.unite_consulaire_id,
+            status='soumise'
+        ).count()}))
+    
+    return event_service.stream(channels, initial)
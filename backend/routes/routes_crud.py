@@ -3,7 +3,7 @@ Routes CRUD pour la gestion complète des entités
 """
 from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 from flask_login import login_required, current_user
-from werkzeug.security import generate_password_hash
+from backend.services.password_service import password_service
 from app import db
 from backend.models import User, UniteConsulaire, Service, UniteConsulaire_Service
 from backend.routes.routes_superviseur import superviseur_required
@@ -58,7 +58,7 @@ def update_user(user_id):
         # Nouveau mot de passe si fourni
         new_password = request.form.get('new_password')
         if new_password:
-            user.password_hash = generate_password_hash(new_password)
+            user.password_hash = password_service.hash_password(new_password)
         
         db.session.commit()
         flash('Utilisateur mis à jour avec succès!', 'success')
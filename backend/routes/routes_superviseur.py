@@ -1,12 +1,19 @@
 # Routes spécialisées pour les SUPERVISEURS SYSTEME
 # Permissions: Gérer utilisateurs, activer/désactiver services et unités consulaires
 
-from flask import render_template, redirect, url_for, flash, request, jsonify
+from flask import render_template, redirect, url_for, flash, request, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from functools import wraps
 from app import app, db
-from backend.models import User, UniteConsulaire, Service, UniteConsulaire_Service, AuditLog
-from werkzeug.security import generate_password_hash
+from backend.models import User, UniteConsulaire, Service, UniteConsulaire_Service, AuditLog, SlaUnitStats
+from backend.utils import log_audit, sanitize_exempt
+from backend.db_routing import replica_read
+from backend.services.audit_archive_service import action_prefix_filter
+from backend.services.status_service import status_service
+from backend.services.notification_retention_service import notification_retention_service
+from backend.services.reporting_service import reporting_service
+from backend.services.export_service import export_service
+from backend.services.password_service import password_service
 import json
 from datetime import datetime
 
@@ -79,7 +86,7 @@ def superviseur_ajouter_utilisateur():
             last_name=last_name,
             role=role,
             phone=phone,
-            password_hash=generate_password_hash(password),
+            password_hash=password_service.hash_password(password),
             active=True,
             profile_complete=True,
             unite_consulaire_id=int(unite_consulaire_id) if unite_consulaire_id and unite_consulaire_id != '' else None
@@ -89,11 +96,11 @@ def superviseur_ajouter_utilisateur():
         db.session.commit()
         
         # Audit log
-        AuditLog.log_action(
+        log_audit(
             user_id=current_user.id,
             action='create_user',
-            table_name='user',
-            record_id=new_user.id,
+            resource='user',
+            resource_id=new_user.id,
             details=f'Utilisateur {role} créé: {email}'
         )
         
@@ -125,11 +132,11 @@ def superviseur_activer_utilisateur(user_id):
     db.session.commit()
     
     # Audit log
-    AuditLog.log_action(
+    log_audit(
         user_id=current_user.id,
         action=action + '_user',
-        table_name='user',
-        record_id=user_id,
+        resource='user',
+        resource_id=user_id,
         details=message
     )
     
@@ -177,11 +184,11 @@ def superviseur_activer_unite(unite_id):
     db.session.commit()
     
     # Audit log
-    AuditLog.log_action(
+    log_audit(
         user_id=current_user.id,
         action=action + '_unite',
-        table_name='unite_consulaire',
-        record_id=unite_id,
+        resource='unite_consulaire',
+        resource_id=unite_id,
         details=message
     )
     
@@ -232,11 +239,11 @@ def superviseur_activer_service(service_id):
     db.session.commit()
     
     # Audit log
-    AuditLog.log_action(
+    log_audit(
         user_id=current_user.id,
         action=action + '_service_global',
-        table_name='service',
-        record_id=service_id,
+        resource='service',
+        resource_id=service_id,
         details=message
     )
     
@@ -250,6 +257,7 @@ def superviseur_activer_service(service_id):
 @app.route('/superviseur/dashboard')
 @login_required
 @superviseur_required
+@replica_read
 def superviseur_dashboard():
     """Tableau de bord du superviseur système"""
     
@@ -271,12 +279,120 @@ def superviseur_dashboard():
     # Dernières actions (audit logs)
     recent_actions = AuditLog.query.order_by(AuditLog.created_at.desc()).limit(10).all()
     
+    # Respect des délais par unité: compteurs tenus à jour par le suivi SLA
+    sla_stats = SlaUnitStats.query.join(UniteConsulaire)\
+        .order_by(SlaUnitStats.open_overdue.desc(), UniteConsulaire.nom).all()
+    
+    # Filtres du formulaire d'export
+    unites = UniteConsulaire.query.order_by(UniteConsulaire.nom).all()
+    services = Service.query.order_by(Service.nom).all()
+    
     return render_template('superviseur/dashboard.html', 
                          stats=stats, 
                          roles_stats=roles_stats,
-                         recent_actions=recent_actions)
+                         recent_actions=recent_actions,
+                         sla_stats=sla_stats,
+                         unites=unites,
+                         services=services)
+
+@app.route('/superviseur/reports')
+@login_required
+@superviseur_required
+@replica_read
+def superviseur_reports():
+    """API des tendances mensuelles ou annuelles, lues dans les faits journaliers
+    
+    Paramètres: granularity (month, year), start et end (AAAA-MM-JJ, fin exclue),
+    unit, service, status.
+    """
+    import time
+    from datetime import date
+    
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in ('month', 'year'):
+        return json.dumps({'success': False, 'error': 'Granularité invalide (month ou year)'})
+    try:
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return json.dumps({'success': False, 'error': 'Date invalide (AAAA-MM-JJ)'})
+    if start is None:
+        # Par défaut: les 12 derniers mois, ou les 5 dernières années
+        today = date.today()
+        if granularity == 'month':
+            index = today.year * 12 + today.month - 1 - 11
+            start = date(index // 12, index % 12 + 1, 1)
+        else:
+            start = date(today.year - 4, 1, 1)
+    
+    started = time.perf_counter()
+    series = reporting_service.trends(
+        granularity=granularity,
+        start=start,
+        end=end,
+        unit_id=request.args.get('unit', type=int),
+        service_type=request.args.get('service'),
+        status=request.args.get('status')
+    )
+    return json.dumps({
+        'success': True,
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat() if end else None,
+        'series': series,
+        'query_ms': round((time.perf_counter() - started) * 1000, 1)
+    })
+
+@app.route('/superviseur/export/<kind>')
+@login_required
+@superviseur_required
+def superviseur_export(kind):
+    """Export en continu des demandes ou des utilisateurs (CSV ou XLSX)
+    
+    Paramètres: format (csv, xlsx), unit, service, status (demandes), role et
+    active (utilisateurs), start et end (création, AAAA-MM-JJ, fin exclue),
+    after_id pour reprendre un export interrompu après le dernier id reçu.
+    """
+    from datetime import date
+    
+    if kind not in export_service.KINDS:
+        return json.dumps({'success': False, 'error': 'Export inconnu (applications ou users)'})
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export_service.MIMETYPES:
+        return json.dumps({'success': False, 'error': 'Format invalide (csv ou xlsx)'})
+    try:
+        filters = {
+            'unit_id': request.args.get('unit', type=int),
+            'service_type': request.args.get('service'),
+            'status': request.args.get('status'),
+            'role': request.args.get('role'),
+            'active': {'1': True, '0': False}.get(request.args.get('active')),
+            'start': date.fromisoformat(request.args['start']) if request.args.get('start') else None,
+            'end': date.fromisoformat(request.args['end']) if request.args.get('end') else None,
+            'after_id': request.args.get('after_id', type=int),
+        }
+    except ValueError:
+        return json.dumps({'success': False, 'error': 'Date invalide (AAAA-MM-JJ)'})
+    
+    chunks = export_service.export(kind, fmt, filters)
+    log_audit(
+        user_id=current_user.id,
+        action='export_' + kind,
+        resource='export',
+        resource_id=None,
+        details=f"Export {fmt}: " + ', '.join(f'{key}={value}' for key, value in filters.items() if value is not None)
+    )
+    filename = export_service.filename(kind, fmt, filters)
+    # Le curseur d'export a sa propre connexion: celle de la requête est rendue au pool
+    db.session.close()
+    return Response(stream_with_context(chunks), mimetype=export_service.MIMETYPES[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+    })
 
 @app.route('/superviseur/email-config', methods=['GET', 'POST'])
+@sanitize_exempt('from_email', 'from_name')  # En-têtes d'email, pas du HTML
 @login_required
 @superviseur_required
 def superviseur_email_config():
@@ -373,28 +489,28 @@ def superviseur_email_config():
 @superviseur_required
 def superviseur_security_dashboard():
     """Tableau de bord sécurité, sauvegardes et mises à jour"""
-    from backup_service import backup_service
-    from update_service import update_service
-    from security_service import security_service
+    # Statut collecté en arrière-plan (aucun appel Git ni parcours disque ici)
+    system_status = status_service.get_status()
     
     # Statut de sécurité
     security_status = {
-        'encryption_status': 'Actif' if security_service.fernet else 'Inactif'
+        'encryption_status': system_status['security']['encryption_status']
     }
     
     # Statistiques des sauvegardes
-    recent_backups = backup_service.list_backups()[:5]
+    recent_backups = [dict(b, date=datetime.fromisoformat(b['date']))
+                      for b in system_status['backups']['latest']]
     backup_stats = {
-        'total_backups': len(recent_backups),
-        'total_size_mb': sum(b['size_mb'] for b in recent_backups)
+        'total_backups': system_status['backups']['count'],
+        'total_size_mb': system_status['backups']['total_size_mb']
     }
     
     # Statut des mises à jour
-    update_status = update_service.check_for_updates()
+    update_status = system_status['updates']
     
     # Événements de sécurité récents
     security_events_query = AuditLog.query.filter(
-        AuditLog.action.like('security_%')
+        action_prefix_filter(AuditLog.action, 'security_')
     ).order_by(AuditLog.created_at.desc()).limit(10)
     
     security_events = {
@@ -402,12 +518,18 @@ def superviseur_security_dashboard():
         'recent_count': security_events_query.count()
     }
     
+    # Dernières exécutions de la rétention des notifications
+    retention_runs = notification_retention_service.last_runs(5)
+    
     return render_template('superviseur/security_dashboard.html',
+                         retention_runs=retention_runs,
                          security_status=security_status,
                          backup_stats=backup_stats,
                          recent_backups=recent_backups,
                          update_status=update_status,
-                         security_events=security_events)
+                         security_events=security_events,
+                         status_refreshed_at=system_status['refreshed_at'],
+                         status_refreshing=system_status['refreshing'])
 
 # API Routes pour les actions de sécurité
 
@@ -416,7 +538,7 @@ def superviseur_security_dashboard():
 @superviseur_required
 def api_create_backup():
     """API pour créer une sauvegarde"""
-    from backup_service import backup_service
+    from backend.services.backup_service import backup_service
     import json
     
     data = request.get_json() or {}
@@ -424,6 +546,7 @@ def api_create_backup():
     include_files = backup_type == 'full'
     
     result = backup_service.create_full_backup(include_files=include_files)
+    status_service.refresh_backups()
     
     return json.dumps({
         'success': result['success'],
@@ -436,7 +559,7 @@ def api_create_backup():
 @superviseur_required
 def api_restore_backup():
     """API pour restaurer une sauvegarde"""
-    from backup_service import backup_service
+    from backend.services.backup_service import backup_service
     import json
     
     data = request.get_json() or {}
@@ -446,6 +569,7 @@ def api_restore_backup():
         return json.dumps({'success': False, 'error': 'Nom de fichier requis'})
     
     result = backup_service.restore_backup(filename)
+    status_service.refresh_backups()
     
     return json.dumps({
         'success': result['success'],
@@ -457,16 +581,15 @@ def api_restore_backup():
 @login_required
 @superviseur_required
 def api_check_updates():
-    """API pour vérifier les mises à jour"""
-    from update_service import update_service
+    """API pour vérifier les mises à jour (vérification lancée en arrière-plan)"""
     import json
     
-    result = update_service.check_for_updates()
+    started = status_service.refresh_async()
     
     return json.dumps({
         'success': True,
-        'message': f'{result["commits_behind"]} mise(s) à jour disponible(s)' if result['updates_available'] else 'Système à jour',
-        'data': result
+        'message': 'Vérification des mises à jour lancée' if started else 'Vérification déjà en cours',
+        'data': status_service.get_status()['updates']
     })
 
 @app.route('/superviseur/api/updates/install', methods=['POST'])
@@ -474,10 +597,11 @@ def api_check_updates():
 @superviseur_required
 def api_install_updates():
     """API pour installer les mises à jour"""
-    from update_service import update_service
+    from backend.services.update_service import update_service
     import json
     
     result = update_service.perform_update(create_backup=True)
+    status_service.refresh_async()
     
     return json.dumps({
         'success': result['success'],
@@ -496,11 +620,11 @@ def api_security_scan():
     # Simuler un scan de sécurité
     # Dans une vraie implémentation, ceci ferait un scan complet
     
-    AuditLog.log_action(
+    log_audit(
         user_id=current_user.id,
         action='security_scan_initiated',
-        table_name='system',
-        record_id=None,
+        resource='system',
+        resource_id=None,
         details='Scan de sécurité manuel lancé'
     )
     
@@ -513,23 +637,25 @@ def api_security_scan():
 @login_required
 @superviseur_required
 def api_rotate_keys():
-    """API pour effectuer la rotation des clés de chiffrement"""
+    """API pour lancer la rotation des clés de chiffrement (rechiffrement en arrière-plan)"""
     import json
-    from security_service import security_service
+    from backend.services.security_service import security_service
+    from backend.services.key_rotation_service import key_rotation_service
     
     try:
-        # Dans une vraie implémentation, ceci re-chiffrerait toutes les données
-        # avec de nouvelles clés
+        job = key_rotation_service.start(user_id=current_user.id)
         
         security_service.log_security_event(
             'key_rotation',
             current_user.id,
-            'Rotation des clés de chiffrement effectuée'
+            f'Rotation des clés lancée vers {job.target_kid} (tâche {job.id})',
+            sync=True
         )
         
         return json.dumps({
             'success': True,
-            'message': 'Rotation des clés effectuée avec succès'
+            'message': f'Rotation des clés lancée ({job.rows_total} utilisateurs à traiter)',
+            'job_id': job.id
         })
         
     except Exception as e:
@@ -538,25 +664,133 @@ def api_rotate_keys():
             'error': f'Erreur lors de la rotation: {str(e)}'
         })
 
+@app.route('/superviseur/api/security/rotate-keys/<int:job_id>', methods=['GET'])
+@login_required
+@superviseur_required
+def api_rotate_keys_progress(job_id):
+    """API pour suivre l'avancement d'une rotation des clés"""
+    import json
+    from backend.models import KeyRotationJob
+    
+    job = KeyRotationJob.query.get_or_404(job_id)
+    
+    return json.dumps({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'target_kid': job.target_kid,
+        'progress': job.get_progress(),
+        'rows_total': job.rows_total,
+        'rows_scanned': job.rows_scanned,
+        'rows_rotated': job.rows_rotated,
+        'last_id': job.last_id,
+        'error': job.error
+    })
+
+@app.route('/superviseur/api/security/patterns', methods=['GET', 'POST'])
+@sanitize_exempt()  # Les motifs sont des fragments d'attaque à conserver tels quels
+@login_required
+@superviseur_required
+def api_suspicious_patterns():
+    """API pour consulter ou remplacer les motifs de détection des requêtes suspectes"""
+    import json
+    from backend.utils.threat_detector import suspicious_request_detector
+    
+    if request.method == 'GET':
+        return json.dumps({'success': True, 'patterns': suspicious_request_detector.patterns})
+    
+    data = request.get_json() or {}
+    patterns = data.get('patterns')
+    if not isinstance(patterns, list) or not all(isinstance(p, str) and p.strip() for p in patterns):
+        return json.dumps({'success': False, 'error': 'Liste de motifs invalide'})
+    
+    patterns = suspicious_request_detector.set_patterns([p.strip() for p in patterns])
+    
+    log_audit(
+        user_id=current_user.id,
+        action='security_patterns_updated',
+        resource='system',
+        resource_id=None,
+        details=f'{len(patterns)} motif(s) de détection configuré(s)'
+    )
+    
+    return json.dumps({
+        'success': True,
+        'message': f'{len(patterns)} motif(s) de détection configuré(s)',
+        'patterns': patterns
+    })
+
 @app.route('/superviseur/api/status', methods=['GET'])
 @login_required
 @superviseur_required
 def api_system_status():
-    """API pour récupérer le statut système"""
-    from backup_service import backup_service
-    from update_service import update_service
-    from security_service import security_service
+    """API pour récupérer le statut système (dernier statut collecté)"""
     import json
     
-    status = {
-        'timestamp': datetime.now().isoformat(),
-        'security': {
-            'encryption_active': security_service.fernet is not None
-        },
-        'backups': {
-            'count': len(backup_service.list_backups())
-        },
-        'updates': update_service.check_for_updates()
-    }
+    from backend.db_routing import replica_monitor
+    
+    status = status_service.get_status()
+    if 'replica' in app.config.get('SQLALCHEMY_BINDS', {}):
+        status['replica'] = replica_monitor.status()
+    status['timestamp'] = datetime.now().isoformat()
+    
+    return json.dumps(status)
+
+@app.route('/superviseur/api/status/refresh', methods=['POST'])
+@login_required
+@superviseur_required
+def api_refresh_system_status():
+    """API pour rafraîchir le statut système en arrière-plan"""
+    import json
     
-    return json.dumps(status)
\ No newline at end of file
+    started = status_service.refresh_async()
+    
+    return json.dumps({
+        'success': True,
+        'message': 'Actualisation du statut lancée' if started else 'Actualisation déjà en cours',
+        'refreshing': True
+    })
+
+@app.route('/superviseur/api/maintenance/notifications', methods=['GET', 'POST'])
+@login_required
+@superviseur_required
+def api_notification_retention():
+    """API de la rétention des notifications: dernières exécutions, ou lancement en arrière-plan"""
+    import json
+    
+    if request.method == 'POST':
+        started = notification_retention_service.run_async(current_user.id)
+        return json.dumps({
+            'success': True,
+            'message': 'Rétention des notifications lancée' if started else 'Rétention déjà en cours'
+        })
+    
+    return json.dumps({
+        'success': True,
+        'running': notification_retention_service.is_running(),
+        'runs': notification_retention_service.last_runs()
+    })
+
+@app.route('/superviseur/api/performance/sql', methods=['GET', 'DELETE'])
+@login_required
+@superviseur_required
+def api_sql_performance():
+    """API listant les endpoints les plus coûteux en base (temps SQL, nombre de requêtes)"""
+    import json
+    from backend.utils.query_profiler import query_profiler
+    
+    if request.method == 'DELETE':
+        query_profiler.reset()
+        return json.dumps({'success': True, 'message': 'Statistiques SQL remises à zéro'})
+    
+    sort = request.args.get('sort', 'db_ms')
+    if sort not in ('db_ms', 'avg_db_ms', 'max_db_ms', 'avg_queries', 'requests'):
+        return json.dumps({'success': False, 'error': 'Critère de tri invalide'})
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    
+    return json.dumps({
+        'success': True,
+        'slow_query_ms': query_profiler.slow_ms,
+        'endpoints': query_profiler.report(limit=limit, sort=sort),
+        'timestamp': datetime.now().isoformat()
+    }, ensure_ascii=False)
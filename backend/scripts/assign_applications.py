@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+"""
+Attribution automatique des demandes soumises aux agents des unités
+Un tour d'attribution (toutes les unités, ou celles indiquées), par exemple depuis
+cron lorsque le planificateur des workers est désactivé (AUTO_ASSIGNMENT non défini).
+
+Usage:
+    python backend/scripts/assign_applications.py [--unit ID ...]
+"""
+import os
+import sys
+import argparse
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import app
+from backend.services.assignment_service import assignment_service
+
+def main():
+    parser = argparse.ArgumentParser(description='Attribution automatique des demandes soumises')
+    parser.add_argument('--unit', type=int, action='append', help='unité consulaire (répétable)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        summary = assignment_service.run_round(args.unit)
+    print(f"✅ {summary['assigned']} demande(s) attribuée(s) dans {summary['units']} unité(s), "
+          f"{summary['waiting']} en attente ({summary['duration_ms']} ms)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Maintenance du journal d'audit pour e-Consulaire RDC
+Bascule mensuelle vers les tables de période, archivage des périodes expirées
+et consultation des archives.
+
+Usage:
+    python backend/scripts/audit_maintenance.py run
+    python backend/scripts/audit_maintenance.py status
+    python backend/scripts/audit_maintenance.py query [prefixe_action] [AAAA-MM-JJ] [AAAA-MM-JJ]
+"""
+import os
+import sys
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from datetime import datetime
+from app import app
+from backend.services.audit_archive_service import audit_archive_service
+
+def run_maintenance():
+    result = audit_archive_service.run_maintenance()
+    if not result['success']:
+        print(f"❌ Erreur: {result.get('error')}")
+        return 1
+    for table, count in result['moved'].items():
+        print(f"  → {count} lignes déplacées vers {table}")
+    for path in result['archived']:
+        print(f"  → Archive créée: {path}")
+    print("✅ Maintenance du journal d'audit terminée")
+    return 0
+
+def show_status():
+    print("📋 Tables de période:")
+    for period in audit_archive_service.list_partitions():
+        print(f"  → {audit_archive_service.partition_name(period)}")
+    print("🗄️  Archives:")
+    for archive in audit_archive_service.list_archives():
+        print(f"  → {archive['filename']} ({archive['size_mb']} MB)")
+    return 0
+
+def query_logs(args):
+    action_prefix = args[0] if len(args) > 0 else None
+    start = datetime.fromisoformat(args[1]) if len(args) > 1 else None
+    end = datetime.fromisoformat(args[2]) if len(args) > 2 else None
+    rows = audit_archive_service.query(start=start, end=end, action_prefix=action_prefix,
+                                       limit=100, include_archives=True)
+    for row in rows:
+        print(f"{row['created_at']}  {row['action']:<30} user={row['user_id']}  {row['details'] or ''}")
+    print(f"{len(rows)} événement(s)")
+    return 0
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'run'
+    with app.app_context():
+        if command == 'run':
+            sys.exit(run_maintenance())
+        elif command == 'status':
+            sys.exit(show_status())
+        elif command == 'query':
+            sys.exit(query_logs(sys.argv[2:]))
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+"""
+Simulation de l'attribution des demandes aux agents (10 000 demandes/jour par défaut)
+Compare, sur les mêmes arrivées, la prise en charge manuelle (un agent libre prend
+les plus anciennes demandes de son unité, plusieurs à la fois) à l'attribution
+automatique (UnitBalancer: échéance, charge, compétences). Simulation minute par
+minute, en mémoire; mesure aussi le coût d'une attribution selon la taille de l'unité
+et, avec --database, un tour réel d'assignment_service sur une unité jetable.
+
+Usage:
+    python backend/scripts/bench_assignment.py [--per-day 10000] [--days 3] [--units 20]
+    python backend/scripts/bench_assignment.py --database [--applications 500]
+"""
+import os
+import sys
+import time
+import heapq
+import random
+import argparse
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+# Add parent directory to path to import app
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from backend.services.assignment_service import UnitBalancer
+
+# Délai de traitement (jours) et durée moyenne relative de chaque service par défaut
+SERVICES = {
+    'carte_consulaire': (5, 1.0), 'attestation_prise_charge': (3, 0.6), 'legalisations': (7, 0.5),
+    'passeport': (14, 1.8), 'autres_documents': (5, 0.8), 'etat_civil': (10, 1.2), 'procuration': (5, 0.7),
+}
+# Facteur de durée: agent compétent, généraliste, agent hors de ses compétences
+SPEED = {'skilled': 0.8, 'generalist': 1.0, 'mismatch': 1.6}
+# Répartition horaire des soumissions (heures ouvrées chargées)
+HOURLY = [1, 1, 1, 1, 1, 2, 4, 8, 10, 10, 9, 8, 7, 8, 9, 9, 8, 6, 4, 3, 2, 2, 1, 1]
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+def build_world(args):
+    """Unités (tailles inégales), agents avec compétences et arrivées sur la période"""
+    rng = random.Random(args.seed)
+    codes = list(SERVICES)
+    units, agent_id = [], 0
+    for u in range(args.units):
+        agents = {}
+        for _ in range(rng.randint(args.min_agents, args.max_agents)):
+            agent_id += 1
+            skills = set(rng.sample(codes, rng.randint(1, 2))) if rng.random() < args.specialists else set()
+            agents[agent_id] = skills
+        units.append(agents)
+
+    # Charge proportionnelle à la taille de l'unité, bruitée: certaines unités débordent
+    weights = [len(agents) * rng.uniform(0.6, 1.4) for agents in units]
+    arrivals = []
+    for day in range(args.days):
+        for _ in range(args.per_day):
+            hour = rng.choices(range(24), HOURLY)[0]
+            minute = day * 1440 + hour * 60 + rng.randrange(60)
+            unit = rng.choices(range(args.units), weights)[0]
+            arrivals.append((minute, unit, rng.choice(codes), rng.uniform(0.5, 1.5)))
+    arrivals.sort()
+
+    # Durée de base calibrée pour l'occupation visée des agents
+    total_agents = sum(len(agents) for agents in units)
+    mean_factor = sum(f for _, f in SERVICES.values()) / len(SERVICES)
+    base_minutes = args.utilization * total_agents * 1440 / args.per_day / mean_factor
+    return units, arrivals, base_minutes
+
+def simulate(policy, units, arrivals, base_minutes, args):
+    """Retourne les métriques d'une politique sur les arrivées données"""
+    horizon = args.days * 1440
+    apps = []                     # [minute, unité, service, aléa, échéance, fin]
+    waiting = [[] for _ in units]  # demandes soumises par unité (ordre d'arrivée)
+    state = {a: {'queue': [], 'current': None, 'until': 0, 'skills': skills, 'unit': u}
+             for u, agents in enumerate(units) for a, skills in agents.items()}
+    imbalance, policy_seconds, assignments = [], 0.0, 0
+    next_arrival = 0
+    touched = set()
+
+    def load(agent_id):
+        return len(state[agent_id]['queue']) + (state[agent_id]['current'] is not None)
+
+    def take(agent_id, index):
+        agent = state[agent_id]
+        heapq.heappush(agent['queue'], (apps[index][4] if policy == 'auto' else apps[index][0], index))
+
+    minute = 0
+    while minute < horizon or any(waiting) or any(s['queue'] or s['current'] is not None for s in state.values()):
+        while next_arrival < len(arrivals) and arrivals[next_arrival][0] == minute:
+            arrived, unit, code, noise = arrivals[next_arrival]
+            apps.append([arrived, unit, code, noise, arrived + SERVICES[code][0] * 1440, None])
+            waiting[unit].append(len(apps) - 1)
+            touched.add(unit)
+            next_arrival += 1
+
+        start = time.perf_counter()
+        if policy == 'auto':
+            # Tour sur soumission, tour complet à chaque intervalle
+            for unit in (range(len(units)) if minute % args.interval == 0 else touched):
+                if not waiting[unit]:
+                    continue
+                balancer = UnitBalancer({a: load(a) for a in units[unit]}, units[unit], args.max_load,
+                                        args.skill_penalty)
+                queue = [(apps[i][4], i) for i in waiting[unit]]
+                heapq.heapify(queue)
+                deferred = []
+                while queue and not balancer.saturated():
+                    due, index = heapq.heappop(queue)
+                    agent_id = balancer.acquire(apps[index][2])
+                    if agent_id is None:
+                        deferred.append(index)
+                        continue
+                    take(agent_id, index)
+                    assignments += 1
+                waiting[unit] = sorted(deferred + [i for _, i in queue])
+        else:
+            for unit in range(len(units)):
+                for agent_id in units[unit]:
+                    if waiting[unit] and load(agent_id) == 0:
+                        for index in waiting[unit][:args.hoard]:
+                            take(agent_id, index)
+                            assignments += 1
+                        del waiting[unit][:args.hoard]
+        touched = set()
+        policy_seconds += time.perf_counter() - start
+
+        for agent_id, agent in state.items():
+            if agent['current'] is not None and agent['until'] <= minute:
+                apps[agent['current']][5] = minute
+                agent['current'] = None
+            if agent['current'] is None and agent['queue']:
+                _, index = heapq.heappop(agent['queue'])
+                code, noise = apps[index][2], apps[index][3]
+                fit = 'generalist' if not agent['skills'] else 'skilled' if code in agent['skills'] else 'mismatch'
+                agent['current'] = index
+                agent['until'] = minute + max(1, round(base_minutes * SERVICES[code][1] * SPEED[fit] * noise))
+
+        if minute % 60 == 0:
+            for agents in units:
+                loads = [load(a) for a in agents]
+                imbalance.append(max(loads) - min(loads))
+        minute += 1
+
+    turnaround = [(a[5] - a[0]) / 60 for a in apps]
+    # Marge restante avant l'échéance à la fin du traitement (négative: en retard)
+    slack = [(a[4] - a[5]) / 60 for a in apps]
+    return {
+        'policy': policy, 'applications': len(apps),
+        'p50_h': percentile(turnaround, 50), 'p95_h': percentile(turnaround, 95),
+        'slack_p1_h': percentile(slack, 1),
+        'late_pct': sum(1 for m in slack if m < 0) * 100 / len(apps),
+        'imbalance': sum(imbalance) / len(imbalance),
+        'cost_us': policy_seconds / max(1, assignments) * 1e6,
+        'drain_h': (minute - horizon) / 60
+    }
+
+def bench_scaling(sizes, operations=20000):
+    """Coût d'acquire()/release() selon le nombre d'agents de l'unité"""
+    rng = random.Random(0)
+    codes = list(SERVICES)
+    results = []
+    for size in sizes:
+        skills = {a: set(rng.sample(codes, 2)) if a % 3 == 0 else set() for a in range(size)}
+        balancer = UnitBalancer({a: rng.randrange(3) for a in range(size)}, skills, max_load=10 ** 9)
+        picks = [rng.choice(codes) for _ in range(operations)]
+        start = time.perf_counter()
+        for code in picks:
+            balancer.release(balancer.acquire(code))
+        results.append((size, (time.perf_counter() - start) / operations * 1e6))
+    return results
+
+# ---- Tour réel sur la base ----
+
+def bench_database(applications, agents):
+    from sqlalchemy import delete, func, insert, select
+    from backend.models import (User, UniteConsulaire, Application, StatusHistory, Notification,
+                                NotificationCounter)
+    from backend.services.assignment_service import assignment_service
+
+    run_id = datetime.utcnow().strftime('%H%M%S')
+    usager = User(username=f'assign{run_id}u', email=f'usager.{run_id}@assign.test', password_hash='!',
+                  first_name='Demandeur', last_name='Test', role='usager')
+    db.session.add(usager)
+    db.session.flush()
+    unit = UniteConsulaire(nom=f'Unité test attribution {run_id}', type='consulat', ville='Test', pays='Test',
+                           email_principal=f'unite.{run_id}@assign.test', telephone_principal='+000',
+                           created_by=usager.id)
+    db.session.add(unit)
+    db.session.flush()
+    agent_rows = [User(username=f'assign{run_id}a{i}', email=f'agent.{i}.{run_id}@assign.test', password_hash='!',
+                       first_name='Agent', last_name=str(i), role='agent', unite_consulaire_id=unit.id)
+                  for i in range(agents)]
+    db.session.add_all(agent_rows)
+    db.session.flush()
+    codes = list(SERVICES)
+    start = datetime.utcnow() - timedelta(days=2)
+    db.session.execute(insert(Application), [{
+        'user_id': usager.id, 'unite_consulaire_id': unit.id, 'service_type': codes[i % len(codes)],
+        'reference_number': f'ASG{run_id}{i:06d}', 'status': 'soumise', 'form_data': '{}',
+        'created_at': start + timedelta(seconds=i * 30), 'updated_at': start
+    } for i in range(applications)])
+    db.session.commit()
+    unit_id, usager_id, agent_ids = unit.id, usager.id, [a.id for a in agent_rows]
+
+    saved = assignment_service.max_load, assignment_service.batch_size
+    assignment_service.max_load, assignment_service.batch_size = applications, applications
+    try:
+        t0 = time.perf_counter()
+        summary = assignment_service.run_round([unit_id])
+        elapsed = time.perf_counter() - t0
+        loads = dict(db.session.execute(select(Application.processed_by, func.count()).where(
+            Application.unite_consulaire_id == unit_id).group_by(Application.processed_by)).all())
+        db.session.commit()
+        return summary, elapsed, [loads.get(a, 0) for a in agent_ids]
+    finally:
+        assignment_service.max_load, assignment_service.batch_size = saved
+        application_ids = select(Application.id).where(Application.unite_consulaire_id == unit_id)
+        db.session.execute(delete(StatusHistory).where(StatusHistory.application_id.in_(application_ids)))
+        db.session.execute(delete(Notification).where(Notification.user_id.in_(agent_ids + [usager_id])))
+        db.session.execute(delete(NotificationCounter).where(NotificationCounter.user_id.in_(agent_ids + [usager_id])))
+        db.session.execute(delete(Application).where(Application.unite_consulaire_id == unit_id))
+        db.session.execute(delete(User).where(User.id.in_(agent_ids)))
+        db.session.execute(delete(UniteConsulaire).where(UniteConsulaire.id == unit_id))
+        db.session.execute(delete(User).where(User.id == usager_id))
+        db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation de l'attribution des demandes aux agents")
+    parser.add_argument('--per-day', type=int, default=10000, help='demandes soumises par jour')
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--units', type=int, default=20)
+    parser.add_argument('--min-agents', type=int, default=3)
+    parser.add_argument('--max-agents', type=int, default=15)
+    parser.add_argument('--specialists', type=float, default=0.4, help='part des agents avec compétences')
+    parser.add_argument('--utilization', type=float, default=0.85, help='occupation visée des agents')
+    parser.add_argument('--max-load', type=int, default=5, help='AUTO_ASSIGNMENT_MAX_LOAD')
+    parser.add_argument('--skill-penalty', type=int, default=2, help='AUTO_ASSIGNMENT_SKILL_PENALTY')
+    parser.add_argument('--interval', type=int, default=1, help='minutes entre deux tours complets')
+    parser.add_argument('--hoard', type=int, default=3, help='demandes prises à la fois en manuel')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', action='store_true', help='tour réel sur une unité jetable')
+    parser.add_argument('--applications', type=int, default=500)
+    parser.add_argument('--agents', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.database:
+        with app.app_context():
+            print(f"🏁 Tour d'attribution réel: {args.applications} demandes, {args.agents} agents "
+                  f"({db.engine.dialect.name})")
+            summary, elapsed, loads = bench_database(args.applications, args.agents)
+        ok = summary['assigned'] == args.applications and max(loads) - min(loads) <= 1
+        print(f"{'✅' if ok else '❌'} {summary['assigned']} demandes attribuées en {elapsed:.2f} s "
+              f"({summary['assigned'] / elapsed:.0f}/s), charge par agent {min(loads)}-{max(loads)}")
+        return 0 if ok else 1
+
+    units, arrivals, base_minutes = build_world(args)
+    total_agents = sum(len(agents) for agents in units)
+    print(f"🏁 {args.per_day} demandes/jour sur {args.days} jours, {args.units} unités, {total_agents} agents, "
+          f"durée de base {base_minutes:.0f} min, occupation visée {args.utilization:.0%}")
+    print(f"  {'politique':<10} {'demandes':>9} {'p50':>8} {'p95':>8} {'marge p1':>9} {'retard':>7} "
+          f"{'écart charge':>13} {'coût/attrib.':>13} {'vidage':>8}")
+    results = {}
+    for policy in ('manuel', 'auto'):
+        r = simulate(policy, units, arrivals, base_minutes, args)
+        results[policy] = r
+        print(f"  {policy:<10} {r['applications']:>9} {r['p50_h']:>7.1f}h {r['p95_h']:>7.1f}h {r['slack_p1_h']:>8.1f}h "
+              f"{r['late_pct']:>6.1f}% {r['imbalance']:>13.1f} {r['cost_us']:>11.1f}µs {r['drain_h']:>7.1f}h")
+
+    print("  Coût acquire+release selon la taille de l'unité:")
+    for size, cost_us in bench_scaling([10, 100, 1000, 10000]):
+        print(f"    {size:>6} agents: {cost_us:.2f} µs")
+
+    auto, manual = results['auto'], results['manuel']
+    ok = auto['late_pct'] <= manual['late_pct'] and auto['slack_p1_h'] >= manual['slack_p1_h']
+    print(f"{'✅' if ok else '❌'} Attribution automatique: médiane {manual['p50_h']:.1f}h → {auto['p50_h']:.1f}h, "
+          f"marge p1 {manual['slack_p1_h']:.1f}h → {auto['slack_p1_h']:.1f}h, "
+          f"retards {manual['late_pct']:.1f}% → {auto['late_pct']:.1f}%")
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""
+Test de concurrence de la prise en charge des demandes par les agents
+Une unité jetable, N agents (threads, une session chacun) et M demandes soumises:
+1. course: tous les agents prennent la même demande au même instant (une seule réussite)
+2. file d'attente: tous les agents appellent « demande suivante » jusqu'à épuisement
+Aucune demande ne doit être prise deux fois. Les données créées sont supprimées à la fin.
+
+Usage:
+    python backend/scripts/bench_claims.py [--agents 50] [--applications 1000] [--races 20]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+# Add parent directory to path to import app
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from sqlalchemy import delete, func, insert, select
+from backend.models import (User, UniteConsulaire, Application, StatusHistory, Notification,
+                            NotificationCounter, TrackingSnapshot)
+from backend.services.claim_service import claim_service
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+def setup(run_id, agents, applications):
+    """Unité, demandeur, agents et demandes soumises propres à ce test"""
+    usager = User(username=f'claim{run_id}u', email=f'usager.{run_id}@claims.test', password_hash='!',
+                  first_name='Demandeur', last_name='Test', role='usager')
+    db.session.add(usager)
+    db.session.flush()
+    unit = UniteConsulaire(nom=f'Unité test prise en charge {run_id}', type='consulat', ville='Test',
+                           pays='Test', email_principal=f'unite.{run_id}@claims.test',
+                           telephone_principal='+000', created_by=usager.id)
+    db.session.add(unit)
+    db.session.flush()
+    agent_rows = [User(username=f'claim{run_id}a{i}', email=f'agent.{i}.{run_id}@claims.test',
+                       password_hash='!', first_name='Agent', last_name=str(i), role='agent',
+                       unite_consulaire_id=unit.id) for i in range(agents)]
+    db.session.add_all(agent_rows)
+    db.session.flush()
+
+    start = datetime.utcnow() - timedelta(days=1)
+    db.session.execute(insert(Application), [{
+        'user_id': usager.id, 'unite_consulaire_id': unit.id, 'service_type': 'passeport',
+        'reference_number': f'CLM{run_id}{i:06d}', 'status': 'soumise', 'form_data': '{}',
+        'created_at': start + timedelta(seconds=i), 'updated_at': start + timedelta(seconds=i)
+    } for i in range(applications)])
+    db.session.commit()
+    return unit.id, usager.id, [agent.id for agent in agent_rows]
+
+def cleanup(unit_id, usager_id, agent_ids):
+    application_ids = select(Application.id).where(Application.unite_consulaire_id == unit_id)
+    db.session.execute(delete(StatusHistory).where(StatusHistory.application_id.in_(application_ids)))
+    db.session.execute(delete(TrackingSnapshot).where(TrackingSnapshot.application_id.in_(application_ids)))
+    db.session.execute(delete(Notification).where(Notification.user_id.in_(agent_ids + [usager_id])))
+    db.session.execute(delete(NotificationCounter).where(NotificationCounter.user_id.in_(agent_ids + [usager_id])))
+    db.session.execute(delete(Application).where(Application.unite_consulaire_id == unit_id))
+    db.session.execute(delete(User).where(User.id.in_(agent_ids)))
+    db.session.execute(delete(UniteConsulaire).where(UniteConsulaire.id == unit_id))
+    db.session.execute(delete(User).where(User.id == usager_id))
+    db.session.commit()
+
+def run_agents(agent_ids, work):
+    """Un thread par agent, démarrage simultané; work(agent, résultats) dans son propre contexte"""
+    barrier = threading.Barrier(len(agent_ids))
+    results = {'claims': [], 'latencies': [], 'errors': {}}
+    lock = threading.Lock()
+
+    def agent_thread(agent_id):
+        with app.app_context():
+            # Agent détaché et connexion rendue au pool avant le départ simultané
+            agent = db.session.get(User, agent_id)
+            db.session.expunge(agent)
+            db.session.commit()
+            barrier.wait()
+            local = {'claims': [], 'latencies': [], 'errors': {}}
+            work(agent, local)
+            db.session.remove()
+        with lock:
+            results['claims'] += local['claims']
+            results['latencies'] += local['latencies']
+            for reason, count in local['errors'].items():
+                results['errors'][reason] = results['errors'].get(reason, 0) + count
+
+    threads = [threading.Thread(target=agent_thread, args=(agent_id,)) for agent_id in agent_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def timed_claim(local, claim):
+    start = time.perf_counter()
+    try:
+        application = claim()
+    except Exception as e:
+        db.session.rollback()
+        local['errors'][type(e).__name__] = local['errors'].get(type(e).__name__, 0) + 1
+        return False
+    local['latencies'].append((time.perf_counter() - start) * 1000)
+    if application is None:
+        return None
+    local['claims'].append(application.id)
+    return True
+
+def race(agent_ids, application_id):
+    """Tous les agents sur la même demande: nombre de réussites"""
+    def work(agent, local):
+        timed_claim(local, lambda: claim_service.claim(application_id, agent))
+    return run_agents(agent_ids, work)
+
+def drain_queue(agent_ids):
+    """Chaque agent prend la demande suivante jusqu'à ce que la file soit vide"""
+    def work(agent, local):
+        # None: file vide; False: erreur, nouvel essai (10 au plus)
+        while True:
+            outcome = timed_claim(local, lambda: claim_service.claim_next(agent))
+            if outcome is None or sum(local['errors'].values()) >= 10:
+                break
+    return run_agents(agent_ids, work)
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrence de la prise en charge des demandes')
+    parser.add_argument('--agents', type=int, default=50)
+    parser.add_argument('--applications', type=int, default=1000)
+    parser.add_argument('--races', type=int, default=20, help='demandes disputées par tous les agents')
+    parser.add_argument('--keep', action='store_true', help='conserver les données créées')
+    args = parser.parse_args()
+
+    run_id = datetime.utcnow().strftime('%H%M%S')
+    with app.app_context():
+        print(f"🏁 {args.agents} agents, {args.applications} demandes ({db.engine.dialect.name})")
+        unit_id, usager_id, agent_ids = setup(run_id, args.agents, args.applications)
+        queue_ids = db.session.execute(select(Application.id).where(Application.unite_consulaire_id == unit_id)
+                                       .order_by(Application.id)).scalars().all()
+        ok = True
+        try:
+            # 1. Course sur une même demande
+            double = 0
+            for application_id in queue_ids[:args.races]:
+                result = race(agent_ids, application_id)
+                winners = len(result['claims'])
+                if winners != 1 or result['errors']:
+                    double += 1
+                    print(f"  ❌ Demande {application_id}: {winners} prise(s) en charge, erreurs {result['errors']}")
+            print(f"{'✅' if not double else '❌'} Course: {args.races} demandes disputées par "
+                  f"{args.agents} agents, {double} anomalie(s)")
+            ok = ok and not double
+
+            # 2. File d'attente
+            start = time.perf_counter()
+            result = drain_queue(agent_ids)
+            elapsed = time.perf_counter() - start
+            claimed = result['claims']
+            duplicates = len(claimed) - len(set(claimed))
+            expected = len(queue_ids) - args.races
+            print(f"{'✅' if not duplicates and len(claimed) == expected else '❌'} File d'attente: "
+                  f"{len(claimed)}/{expected} demandes prises en {elapsed:.1f} s "
+                  f"({len(claimed) / elapsed:.0f}/s), doublons: {duplicates}, "
+                  f"p50 {percentile(result['latencies'], 50):.1f} ms, p95 {percentile(result['latencies'], 95):.1f} ms, "
+                  f"erreurs: {result['errors'] or 'aucune'}")
+            ok = ok and not duplicates and len(claimed) == expected and not result['errors']
+
+            # 3. Contrôle en base: une seule prise en charge par demande
+            histories = db.session.execute(
+                select(StatusHistory.application_id, func.count())
+                .where(StatusHistory.application_id.in_(queue_ids), StatusHistory.new_status == 'en_traitement')
+                .group_by(StatusHistory.application_id)
+            ).all()
+            db.session.commit()
+            multiple = [application_id for application_id, count in histories if count != 1]
+            unclaimed = db.session.scalar(select(func.count()).select_from(Application).where(
+                Application.unite_consulaire_id == unit_id, Application.processed_by.is_(None)))
+            print(f"{'✅' if not multiple and not unclaimed and len(histories) == len(queue_ids) else '❌'} "
+                  f"Historique: {len(histories)} demandes prises une fois, {len(multiple)} plusieurs fois, "
+                  f"{unclaimed} sans agent")
+            ok = ok and not multiple and not unclaimed and len(histories) == len(queue_ids)
+        finally:
+            if not args.keep:
+                cleanup(unit_id, usager_id, agent_ids)
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
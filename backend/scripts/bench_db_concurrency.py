@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+"""
+Banc d'essai de concurrence base de données pour e-Consulaire RDC
+Compare l'ancien réglage du moteur (options PostgreSQL appliquées à SQLite, journal
+rollback) aux profils de backend/config.py: plusieurs processus, chacun avec plusieurs
+threads, soumettent des demandes et lisent des tableaux de bord en parallèle.
+
+Usage:
+    python backend/scripts/bench_db_concurrency.py [--workers 4] [--threads 4] [--seconds 10]
+    python backend/scripts/bench_db_concurrency.py --database-url postgresql://.../bench_scratch
+
+Les tables bench_* sont créées puis supprimées dans la base indiquée (base jetable
+uniquement); par défaut, un fichier SQLite temporaire par profil.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+# Add parent directory to path to import app
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import (create_engine, text, MetaData, Table, Column, Integer, String,
+                        Text, DateTime, Index)
+from backend.config import engine_options, configure_engine
+
+PROFILES = ('legacy', 'tuned')
+UNITS = 20
+
+metadata = MetaData()
+bench_application = Table(
+    'bench_application', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, nullable=False),
+    Column('unite_consulaire_id', Integer, nullable=False),
+    Column('service_type', String(50), nullable=False),
+    Column('reference_number', String(40), unique=True, nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('form_data', Text),
+    Column('created_at', DateTime, nullable=False),
+    Column('updated_at', DateTime, nullable=False),
+    Index('ix_bench_application_unit_status', 'unite_consulaire_id', 'status', 'created_at'),
+)
+bench_status_history = Table(
+    'bench_status_history', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('application_id', Integer, nullable=False, index=True),
+    Column('old_status', String(20)),
+    Column('new_status', String(20), nullable=False),
+    Column('created_at', DateTime, nullable=False),
+)
+
+def legacy_options(url):
+    """Options appliquées à toutes les bases avant les profils par moteur"""
+    return {
+        'pool_recycle': 300,
+        'pool_pre_ping': True,
+        'pool_timeout': 20,
+        'pool_size': 10,
+        'max_overflow': 20,
+        'connect_args': {
+            'client_encoding': 'utf8',
+            'connect_timeout': 10,
+            'sslmode': 'prefer'
+        } if url.startswith('postgresql') else {}
+    }
+
+def make_engine(profile, url):
+    if profile == 'legacy':
+        return create_engine(url, **legacy_options(url))
+    return configure_engine(create_engine(url, **engine_options(url)))
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+# ---- Processus de charge ----
+
+def run_worker(profile, url, seconds, threads, write_ratio, seed):
+    engine = make_engine(profile, url)
+    deadline = time.monotonic() + seconds
+    lock = threading.Lock()
+    results = {'write': [], 'read': [], 'errors': {}}
+
+    def submit(conn, rng, index):
+        now = datetime.utcnow()
+        unit = rng.randrange(UNITS)
+        application_id = conn.execute(bench_application.insert().values(
+            user_id=rng.randrange(1, 10000), unite_consulaire_id=unit, service_type='carte_consulaire',
+            reference_number=f'B{seed}-{threading.get_ident()}-{index}', status='soumise',
+            form_data=json.dumps({'motif': 'x' * rng.randrange(50, 500)}), created_at=now, updated_at=now
+        )).inserted_primary_key[0]
+        conn.execute(bench_status_history.insert().values(
+            application_id=application_id, old_status=None, new_status='soumise', created_at=now))
+        # Changement de statut d'une demande existante de la même unité
+        conn.execute(text(
+            "UPDATE bench_application SET status = 'en_traitement', updated_at = :now "
+            "WHERE id = (SELECT id FROM bench_application WHERE unite_consulaire_id = :unit "
+            "AND status = 'soumise' ORDER BY created_at LIMIT 1)"
+        ), {'now': now, 'unit': unit})
+
+    def dashboard(conn, rng):
+        unit = rng.randrange(UNITS)
+        conn.execute(text("SELECT status, count(*) FROM bench_application "
+                          "WHERE unite_consulaire_id = :unit GROUP BY status"), {'unit': unit}).all()
+        conn.execute(text("SELECT id, reference_number, status FROM bench_application "
+                          "WHERE unite_consulaire_id = :unit AND status = 'soumise' "
+                          "ORDER BY created_at DESC LIMIT 20"), {'unit': unit}).all()
+
+    def loop(thread_index):
+        rng = random.Random(f'{seed}:{thread_index}')
+        local = {'write': [], 'read': [], 'errors': {}}
+        index = 0
+        while time.monotonic() < deadline:
+            index += 1
+            kind = 'write' if rng.random() < write_ratio else 'read'
+            start = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    submit(conn, rng, index) if kind == 'write' else dashboard(conn, rng)
+                local[kind].append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                reason = 'database is locked' if 'locked' in str(e) else type(e).__name__
+                local['errors'][reason] = local['errors'].get(reason, 0) + 1
+        with lock:
+            results['write'] += local['write']
+            results['read'] += local['read']
+            for reason, count in local['errors'].items():
+                results['errors'][reason] = results['errors'].get(reason, 0) + count
+
+    workers = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    engine.dispose()
+    print(json.dumps(results))
+
+# ---- Orchestration ----
+
+def prepare(profile, url, rows):
+    """Tables bench_* vides puis pré-remplies; journal rollback pour l'ancien réglage"""
+    engine = make_engine(profile, url)
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite' and profile == 'legacy':
+            # Le mode WAL est persistant dans le fichier: revenir au journal par défaut
+            conn.exec_driver_sql('PRAGMA journal_mode=DELETE')
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    rng = random.Random(profile)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(bench_application.insert(), [
+            {'user_id': rng.randrange(1, 10000), 'unite_consulaire_id': rng.randrange(UNITS),
+             'service_type': 'passeport', 'reference_number': f'SEED-{i}',
+             'status': rng.choice(['soumise', 'en_traitement', 'validee']),
+             'form_data': '{}', 'created_at': now, 'updated_at': now}
+            for i in range(rows)
+        ])
+    journal = None
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as conn:
+            journal = conn.exec_driver_sql('PRAGMA journal_mode').scalar()
+    engine.dispose()
+    return journal
+
+def cleanup(url):
+    engine = create_engine(url)
+    metadata.drop_all(engine)
+    engine.dispose()
+
+def run_profile(profile, url, args):
+    journal = prepare(profile, url, args.rows)
+    processes = [subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--worker', profile, url, str(args.seconds),
+         str(args.threads), str(args.write_ratio), str(index)],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True) for index in range(args.workers)]
+
+    writes, reads, errors = [], [], {}
+    for process in processes:
+        output, _ = process.communicate()
+        result = json.loads(output.strip().splitlines()[-1])
+        writes += result['write']
+        reads += result['read']
+        for reason, count in result['errors'].items():
+            errors[reason] = errors.get(reason, 0) + count
+    return {
+        'profile': profile, 'journal': journal,
+        'ops_per_s': (len(writes) + len(reads)) / args.seconds,
+        'writes_per_s': len(writes) / args.seconds,
+        'write_p50': percentile(writes, 50), 'write_p95': percentile(writes, 95),
+        'write_p99': percentile(writes, 99), 'read_p95': percentile(reads, 95),
+        'errors': errors
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrence base de données: ancien réglage contre profils')
+    parser.add_argument('--database-url', help='base jetable (défaut: fichier SQLite temporaire par profil)')
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    parser.add_argument('--workers', type=int, default=4, help='processus (workers gunicorn simulés)')
+    parser.add_argument('--threads', type=int, default=4, help='threads par processus')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.3, help='part des soumissions')
+    parser.add_argument('--rows', type=int, default=20000, help='demandes pré-existantes')
+    args = parser.parse_args()
+
+    print(f"🏁 {args.workers} processus x {args.threads} threads, {args.seconds:.0f} s, "
+          f"{args.write_ratio:.0%} d'écritures")
+    print(f"  {'profil':<8} {'journal':<8} {'ops/s':>8} {'écr./s':>8} {'écr. p50':>9} {'p95':>8} "
+          f"{'p99':>8} {'lect. p95':>10}  erreurs")
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in args.profiles.split(','):
+            url = args.database_url or f"sqlite:///{os.path.join(directory, f'bench_{profile}.db')}"
+            r = run_profile(profile, url, args)
+            results.append(r)
+            errors = ', '.join(f'{reason}: {count}' for reason, count in r['errors'].items()) or 'aucune'
+            print(f"  {r['profile']:<8} {r['journal'] or '-':<8} {r['ops_per_s']:>8.0f} {r['writes_per_s']:>8.0f} "
+                  f"{r['write_p50']:>7.1f}ms {r['write_p95']:>6.1f}ms {r['write_p99']:>6.1f}ms "
+                  f"{r['read_p95']:>8.1f}ms  {errors}")
+            if args.database_url:
+                cleanup(url)
+
+    tuned = next((r for r in results if r['profile'] == 'tuned'), None)
+    if tuned and tuned['errors']:
+        print("❌ Erreurs avec le profil du moteur")
+        return 1
+    print("✅ Terminé")
+    return 0
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        profile, url, seconds, threads, write_ratio, seed = sys.argv[2:8]
+        run_worker(profile, url, float(seconds), int(threads), float(write_ratio), int(seed))
+        sys.exit(0)
+    sys.exit(main())
@@ -0,0 +1,469 @@
+#!/usr/bin/env python
+"""
+Banc d'essai HTTP des routes critiques d'e-Consulaire RDC
+Mesure, par route: débit, latences p50/p95/p99, requêtes SQL par requête HTTP
+et mémoire résidente maximale; résultats enregistrés en JSON et comparés à une
+référence pour signaler les régressions.
+
+Deux modes:
+  - inprocess: client de test Flask dans ce processus (coût serveur seul)
+  - gunicorn:  serveur gunicorn local instrumenté, clients HTTP concurrents
+
+Nécessite un jeu de données généré:
+    python backend/scripts/generate_load_data.py --units 50 --users 5000 --applications 50000
+
+Usage:
+    python backend/scripts/bench_http.py [--mode inprocess|gunicorn] [--requests 200] [--save]
+    python backend/scripts/bench_http.py --mode gunicorn --workers 4 --concurrency 8
+    python backend/scripts/bench_http.py --scenarios track,countries_cities --baseline ref.json
+"""
+import os
+import io
+import re
+import sys
+import json
+import time
+import socket
+import argparse
+import resource
+import threading
+import subprocess
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+# Add parent directory to path to import app
+sys.path.insert(0, ROOT)
+
+CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+QUERY_HEADER = 'X-Bench-Queries'
+
+JPEG_BYTES = b'\xff\xd8\xff\xe0' + b'\x00' * 2048 + b'\xff\xd9'
+PDF_BYTES = b'%PDF-1.4\n% e-Consulaire RDC - banc d\'essai\n' + b'0' * 4096 + b'\n%%EOF\n'
+
+def instrument(flask_app, engine):
+    """Compter les requêtes SQL de chaque requête HTTP (en-tête X-Bench-Queries)"""
+    from flask import g, has_request_context
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.bench_queries = g.get('bench_queries', 0) + 1
+
+    @flask_app.after_request
+    def add_query_count(response):
+        response.headers[QUERY_HEADER] = str(g.get('bench_queries', 0))
+        return response
+
+    return flask_app
+
+def wsgi_app():
+    """Application instrumentée pour gunicorn: gunicorn 'bench_http:wsgi_app()'"""
+    from app import app, db
+    with app.app_context():
+        instrument(app, db.engine)
+    return app
+
+def rss_mb(pid='self', peak=False):
+    """Mémoire résidente (ou maximale) d'un processus Linux, en Mo"""
+    key = 'VmHWM:' if peak else 'VmRSS:'
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith(key):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid == 'self':
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+    return 0.0
+
+def percentile(values, q):
+    """Percentile par rang le plus proche (values triées)"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+class InProcessClient:
+    """Client de test Flask (cookies de session conservés)"""
+
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def request(self, method, path, data=None, files=None):
+        payload = dict(data or {})
+        for field, (filename, content, mime_type) in (files or {}).items():
+            payload[field] = (io.BytesIO(content), filename, mime_type)
+        response = self.client.open(path, method=method, data=payload or None)
+        body = response.get_data()
+        response.close()
+        return response.status_code, response.headers, body
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class HttpClient:
+    """Client HTTP minimal (bibliothèque standard): cookies, formulaires, multipart"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+
+    def request(self, method, path, data=None, files=None):
+        headers = {}
+        body = None
+        if files:
+            boundary = f'bench{time.perf_counter_ns()}'
+            body = self._multipart(boundary, data or {}, files)
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def _multipart(self, boundary, data, files):
+        parts = []
+        for name, value in data.items():
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+                         .encode('utf-8'))
+        for name, (filename, content, mime_type) in files.items():
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                         f'Content-Type: {mime_type}\r\n\r\n'.encode('utf-8') + content + b'\r\n')
+        parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+        return b''.join(parts)
+
+class BenchSession:
+    """Client et jeton CSRF d'un utilisateur (anonyme, citoyen ou agent)"""
+
+    def __init__(self, client):
+        self.client = client
+        self.csrf_token = None
+
+    def fetch_csrf(self, path='/login'):
+        status, _, body = self.client.request('GET', path)
+        match = CSRF_PATTERN.search(body.decode('utf-8', 'replace'))
+        if not match:
+            raise RuntimeError(f'Jeton CSRF introuvable sur {path} (HTTP {status})')
+        self.csrf_token = match.group(1)
+
+    def form(self, **fields):
+        return dict(fields, csrf_token=self.csrf_token)
+
+    def login(self, path, email, password):
+        self.fetch_csrf(path)
+        status, headers, _ = self.client.request('POST', path, data=self.form(email=email, password=password))
+        if status != 302:
+            raise RuntimeError(f'Connexion refusée pour {email} sur {path} (HTTP {status})')
+
+class Dataset:
+    """Comptes et objets du jeu de données généré utilisés par les scénarios"""
+
+    def __init__(self, password):
+        from sqlalchemy import func
+        from app import db
+        from backend.models import User, Application, Document
+
+        self.password = password
+        row = db.session.query(User.email, User.unite_consulaire_id, Document.id)\
+            .join(Application, Application.user_id == User.id)\
+            .join(Document, Document.application_id == Application.id)\
+            .filter(User.email.like('usager.%@loadtest.cd'), User.active == True)\
+            .order_by(User.id).first()
+        if row is None:
+            raise RuntimeError('Aucun jeu de données: python backend/scripts/generate_load_data.py')
+        self.citizen_email, unit_id, self.document_id = row
+
+        self.agent_email = db.session.query(User.email)\
+            .filter(User.role == 'agent', User.active == True, User.unite_consulaire_id == unit_id)\
+            .order_by(User.id).limit(1).scalar()
+        self.status_targets = [application_id for (application_id,) in db.session.query(Application.id)
+                               .filter(Application.unite_consulaire_id == unit_id,
+                                       Application.status.in_(['soumise', 'en_traitement']))
+                               .order_by(Application.id).limit(50)]
+        self.references = [reference for (reference,) in db.session.query(Application.reference_number)
+                           .order_by(Application.id.desc()).limit(100)]
+        self.pending_count = db.session.query(func.count(Application.id))\
+            .filter(Application.unite_consulaire_id == unit_id, Application.status == 'soumise').scalar()
+        db.session.remove()
+        if not self.agent_email or not self.status_targets:
+            raise RuntimeError(f'Unité {unit_id} sans agent actif ou sans demande à traiter')
+
+class Scenario:
+    def __init__(self, name, role, build, expect=(200,), fresh_session=False):
+        self.name = name
+        self.role = role
+        self.build = build  # (session, dataset, itération) -> (méthode, chemin, données, fichiers)
+        self.expect = expect
+        self.fresh_session = fresh_session
+
+def consular_card_request(session, dataset, i):
+    data = session.form(first_name='Jean', last_name='Mukendi', birth_date='1990-05-15',
+                        birth_place='Kinshasa', nationality='Congolaise', address='12 rue du Banc',
+                        city='Paris', country='France', phone='+33 6 12 34 56 78',
+                        emergency_contact='Marie Mukendi', profession='Ingénieur', employer='')
+    files = {'photo': ('photo.jpg', JPEG_BYTES, 'image/jpeg'),
+             'identity_document': ('passeport.pdf', PDF_BYTES, 'application/pdf'),
+             'proof_of_residence': ('residence.pdf', PDF_BYTES, 'application/pdf')}
+    return 'POST', '/services/consular-card', data, files
+
+def update_status_request(session, dataset, i):
+    application_id = dataset.status_targets[i % len(dataset.status_targets)]
+    status = 'en_traitement' if (i // len(dataset.status_targets)) % 2 == 0 else 'soumise'
+    return 'POST', f'/admin/application/{application_id}/status', \
+        session.form(status=status, comment='Banc d\'essai'), None
+
+SCENARIOS = [
+    Scenario('login', 'anonymous', lambda s, d, i: (
+        'POST', '/login', s.form(email=d.citizen_email, password=d.password), None),
+        expect=(302,), fresh_session=True),
+    Scenario('user_dashboard', 'citizen', lambda s, d, i: ('GET', '/user-dashboard', None, None)),
+    Scenario('agent_dashboard', 'agent', lambda s, d, i: ('GET', '/agent/dashboard', None, None)),
+    Scenario('agent_pending_applications', 'agent',
+             lambda s, d, i: ('GET', '/agent/applications/pending', None, None)),
+    Scenario('consular_card', 'citizen', consular_card_request, expect=(302,)),
+    Scenario('update_application_status', 'agent', update_status_request, expect=(302,)),
+    Scenario('track', 'anonymous', lambda s, d, i: (
+        'GET', f'/track?reference={d.references[i % len(d.references)]}', None, None)),
+    Scenario('countries_cities', 'anonymous', lambda s, d, i: ('GET', '/api/countries-cities', None, None)),
+    Scenario('download_document', 'citizen', lambda s, d, i: (
+        'GET', f'/download/{d.document_id}', None, None)),
+]
+
+class HttpBenchmark:
+    def __init__(self, options):
+        self.options = options
+        self.server = None
+        self.flask_app = None
+
+    # Serveur -------------------------------------------------------------
+
+    def start(self):
+        if self.options.mode == 'inprocess':
+            from app import app, db
+            with app.app_context():
+                instrument(app, db.engine)
+            self.flask_app = app
+            return
+        port = self.options.port or self._free_port()
+        self.base_url = f'http://127.0.0.1:{port}'
+        self.server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(self.options.workers),
+             '--chdir', ROOT, '--pythonpath', os.path.dirname(os.path.abspath(__file__)),
+             '--log-level', 'warning', 'bench_http:wsgi_app()'],
+            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                status, _, _ = HttpClient(self.base_url).request('GET', '/api/countries-cities')
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            if self.server.poll() is not None:
+                raise RuntimeError('gunicorn s\'est arrêté au démarrage')
+            time.sleep(0.2)
+        raise RuntimeError('gunicorn ne répond pas')
+
+    def stop(self):
+        if self.server is not None:
+            self.server.terminate()
+            self.server.wait(timeout=30)
+
+    def _free_port(self):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            return s.getsockname()[1]
+
+    def peak_rss_mb(self):
+        """Mémoire maximale: ce processus (inprocess) ou le plus gros worker gunicorn"""
+        if self.server is None:
+            return rss_mb(peak=True)
+        try:
+            with open(f'/proc/{self.server.pid}/task/{self.server.pid}/children') as f:
+                workers = f.read().split()
+        except OSError:
+            return 0.0
+        return max([rss_mb(pid, peak=True) for pid in workers] or [0.0])
+
+    # Sessions ------------------------------------------------------------
+
+    def client(self):
+        return InProcessClient(self.flask_app) if self.server is None else HttpClient(self.base_url)
+
+    def session(self, role, dataset):
+        session = BenchSession(self.client())
+        if role == 'citizen':
+            session.login('/login', dataset.citizen_email, dataset.password)
+        elif role == 'agent':
+            session.login('/consulate', dataset.agent_email, dataset.password)
+        else:
+            session.fetch_csrf('/login')
+        return session
+
+    # Mesure --------------------------------------------------------------
+
+    def measure(self, scenario, dataset):
+        options = self.options
+        concurrency = max(1, options.concurrency)
+        sessions = [self.session(scenario.role, dataset) for _ in range(concurrency)]
+        latencies, queries, failures = [], [], []
+        lock = threading.Lock()
+
+        def call(session, i, record):
+            if scenario.fresh_session:
+                session = self.session(scenario.role, dataset)
+            method, path, data, files = scenario.build(session, dataset, i)
+            start = time.perf_counter()
+            status, headers, _ = session.client.request(method, path, data, files)
+            elapsed = (time.perf_counter() - start) * 1000
+            if record:
+                with lock:
+                    latencies.append(elapsed)
+                    queries.append(int(headers.get(QUERY_HEADER, 0)))
+                    if status not in scenario.expect:
+                        failures.append(status)
+
+        for i in range(options.warmup):
+            call(sessions[0], i, record=False)
+
+        def worker(index):
+            for i in range(index, options.requests, concurrency):
+                call(sessions[index], options.warmup + i, record=True)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': len(failures),
+            'error_statuses': sorted(set(failures)),
+            'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries_mean': round(sum(queries) / len(queries), 1) if queries else 0.0,
+            'queries_max': max(queries or [0]),
+            'peak_rss_mb': round(self.peak_rss_mb(), 1),
+        }
+
+    def run(self, scenarios):
+        from app import app
+        with app.app_context():
+            dataset = Dataset(self.options.password)
+        print(f"🗂️  Jeu de données: citoyen {dataset.citizen_email}, agent {dataset.agent_email}, "
+              f"{dataset.pending_count} demande(s) en attente dans l'unité")
+
+        self.start()
+        results = {}
+        try:
+            for scenario in scenarios:
+                results[scenario.name] = result = self.measure(scenario, dataset)
+                errors = f"  ❌ {result['errors']} erreur(s) {result['error_statuses']}" if result['errors'] else ''
+                print(f"  → {scenario.name:<28} {result['throughput_rps']:8.1f} req/s  "
+                      f"p50 {result['p50_ms']:7.1f}  p95 {result['p95_ms']:7.1f}  p99 {result['p99_ms']:7.1f} ms  "
+                      f"SQL {result['queries_mean']:5.1f}  RSS {result['peak_rss_mb']:6.1f} MB{errors}")
+        finally:
+            self.stop()
+        return {
+            'mode': self.options.mode,
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'config': {key: getattr(self.options, key) for key in ('requests', 'concurrency', 'workers', 'warmup')},
+            'scenarios': results,
+        }
+
+def compare(report, baseline, tolerance):
+    """Signaler les régressions par rapport à la référence; retourne leur nombre"""
+    regressions = 0
+    print(f"📊 Comparaison avec la référence du {baseline.get('created_at')} (tolérance {tolerance:.0%})")
+    for name, current in report['scenarios'].items():
+        reference = baseline.get('scenarios', {}).get(name)
+        if reference is None:
+            print(f"  → {name:<28} pas de référence")
+            continue
+        problems = []
+        if current['p95_ms'] > reference['p95_ms'] * (1 + tolerance):
+            problems.append(f"p95 {reference['p95_ms']} → {current['p95_ms']} ms")
+        if current['throughput_rps'] < reference['throughput_rps'] * (1 - tolerance):
+            problems.append(f"débit {reference['throughput_rps']} → {current['throughput_rps']} req/s")
+        if current['queries_mean'] > reference['queries_mean'] * 1.1 + 0.5:
+            problems.append(f"SQL {reference['queries_mean']} → {current['queries_mean']}")
+        if current['peak_rss_mb'] > reference['peak_rss_mb'] * (1 + tolerance / 2):
+            problems.append(f"RSS {reference['peak_rss_mb']} → {current['peak_rss_mb']} MB")
+        if current['errors'] > reference.get('errors', 0):
+            problems.append(f"{current['errors']} erreur(s)")
+        if problems:
+            regressions += 1
+            print(f"  ⚠️  {name:<27} {'; '.join(problems)}")
+        else:
+            print(f"  ✅ {name:<27} conforme")
+    return regressions
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Banc d\'essai HTTP des routes critiques')
+    parser.add_argument('--mode', choices=['inprocess', 'gunicorn'], default='inprocess')
+    parser.add_argument('--requests', type=int, default=200, help='requêtes mesurées par scénario')
+    parser.add_argument('--concurrency', type=int, default=None, help='clients simultanés (défaut: 1, 8 avec gunicorn)')
+    parser.add_argument('--workers', type=int, default=4, help='workers gunicorn')
+    parser.add_argument('--warmup', type=int, default=10, help='requêtes d\'échauffement non mesurées')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--scenarios', default='', help='liste séparée par des virgules (défaut: tous)')
+    parser.add_argument('--password', default='loadtest123', help='mot de passe des comptes générés')
+    parser.add_argument('--baseline', default=None, help='fichier de référence (défaut: instance/benchmarks/http_<mode>.json)')
+    parser.add_argument('--save', action='store_true', help='enregistrer les résultats comme nouvelle référence')
+    parser.add_argument('--output', default=None, help='enregistrer les résultats dans ce fichier')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='écart toléré (défaut: 0.2 = 20 %%)')
+    options = parser.parse_args(argv)
+    if options.concurrency is None:
+        options.concurrency = 8 if options.mode == 'gunicorn' else 1
+    return options
+
+def main(argv):
+    options = parse_args(argv)
+    from app import app
+
+    selected = [name.strip() for name in options.scenarios.split(',') if name.strip()]
+    unknown = set(selected) - {scenario.name for scenario in SCENARIOS}
+    if unknown:
+        print(f"❌ Scénarios inconnus: {', '.join(sorted(unknown))}")
+        return 1
+    scenarios = [scenario for scenario in SCENARIOS if not selected or scenario.name in selected]
+    baseline_path = options.baseline or os.path.join(app.instance_path, 'benchmarks', f'http_{options.mode}.json')
+
+    print(f"⏱️  Banc d'essai HTTP ({options.mode}, {options.requests} requêtes par scénario, "
+          f"{options.concurrency} client(s))")
+    report = HttpBenchmark(options).run(scenarios)
+
+    for path in filter(None, [options.output, baseline_path if options.save else None]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Résultats enregistrés: {path}")
+
+    failed = sum(1 for result in report['scenarios'].values() if result['errors'])
+    if not options.save and os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            failed += compare(report, json.load(f), options.tolerance)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Profil d'import et mémoire des workers pour e-Consulaire RDC
+Rapport basé sur python -X importtime (temps propre cumulé par paquet) et mesure
+de la mémoire résidente d'un worker après l'import et après une première requête.
+Les dépendances lourdes (PDF, QR, SendGrid, Git, planificateur) doivent rester
+absentes au démarrage et n'être chargées qu'au premier usage.
+
+Usage:
+    python backend/scripts/bench_imports.py [nombre_de_paquets]
+
+Variables:
+    WORKER_RSS_TARGET_MB  mémoire résidente cible par worker (défaut: 75)
+"""
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+# Add parent directory to path to import app
+sys.path.insert(0, ROOT)
+
+# Modules qui ne doivent pas être chargés au démarrage d'un worker
+LAZY_MODULES = ('reportlab', 'qrcode', 'PIL', 'sendgrid', 'git', 'schedule')
+
+def rss_mb():
+    """Mémoire résidente courante (Linux), à défaut le maximum atteint"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+def run_worker():
+    """Simuler un worker: import de l'application puis première requête"""
+    from app import app
+    imported = {'rss_mb': rss_mb(), 'lazy_loaded': [m for m in LAZY_MODULES if m in sys.modules],
+                'modules': len(sys.modules)}
+    app.test_client().get('/login')
+    print(json.dumps({'import': imported, 'first_request': {'rss_mb': rss_mb(),
+                      'lazy_loaded': [m for m in LAZY_MODULES if m in sys.modules]}}))
+
+def profile_imports():
+    """Temps d'import propre (µs) agrégé par paquet racine, et temps total de 'import app'"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    by_package = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        by_package[package] = by_package.get(package, 0) + int(self_us)
+        if name.strip() == 'app':
+            total_us = int(cumulative_us)
+    return total_us, by_package
+
+def measure_worker():
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker'],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main(top):
+    target_mb = float(os.environ.get('WORKER_RSS_TARGET_MB', 75))
+    # Premier import à part: compilation des .pyc et amorçage éventuel de la base
+    subprocess.run([sys.executable, '-c', 'import app'], cwd=ROOT, capture_output=True, check=True)
+
+    total_us, by_package = profile_imports()
+    print(f"⏱️  import app: {total_us / 1000:.1f} ms (python -X importtime)")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"  → {package:<24} {self_us / 1000:8.1f} ms")
+
+    worker = measure_worker()
+    print(f"📦 Modules chargés à l'import: {worker['import']['modules']}")
+    for stage, label in (('import', 'après import'), ('first_request', 'après première requête')):
+        lazy = ', '.join(worker[stage]['lazy_loaded']) or 'aucune'
+        print(f"  → RSS {label:<24} {worker[stage]['rss_mb']:6.1f} MB   dépendances lourdes chargées: {lazy}")
+
+    rss = worker['first_request']['rss_mb']
+    if rss > target_mb or worker['import']['lazy_loaded']:
+        print(f"❌ Cible non atteinte: {rss:.1f} MB (cible {target_mb:.0f} MB par worker)")
+        return 1
+    print(f"✅ {rss:.1f} MB par worker (cible {target_mb:.0f} MB)")
+    return 0
+
+if __name__ == '__main__':
+    if '--worker' in sys.argv:
+        run_worker()
+        sys.exit(0)
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 15))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Coût du registre de métriques selon la cardinalité des étiquettes
+Pour chaque nombre de séries (combinaisons endpoint/méthode/statut): coût d'une
+observation d'histogramme, publication du fichier worker, exposition /metrics
+fusionnée et mémoire occupée. Vérifie aussi l'agrégation entre processus.
+
+Usage:
+    python backend/scripts/bench_metrics.py [--series 1,100,1000,10000] [--workers 4]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+# Add parent directory to path to import app
+sys.path.insert(0, ROOT)
+
+from app import app  # noqa: F401 - fixe l'ordre d'import (imports circulaires des services)
+from backend.utils.metrics import MetricsRegistry
+
+OBSERVATIONS = 200000
+METHODS = ('GET', 'POST')
+STATUSES = ('200', '302', '404', '500')
+
+def label_sets(series):
+    """series combinaisons distinctes (endpoint, méthode, statut)"""
+    endpoints = max(1, series // (len(METHODS) * len(STATUSES)))
+    combos = [(f'endpoint_{e}', m, s) for e in range(endpoints) for m in METHODS for s in STATUSES]
+    return combos[:series]
+
+def new_registry(directory):
+    registry = MetricsRegistry()
+    registry.directory = directory
+    histogram = registry.histogram('bench_request_duration_seconds', 'Banc d\'essai', ('endpoint', 'method', 'status'))
+    return registry, histogram
+
+def bench(series, observations):
+    rng = random.Random(series)
+    labels = label_sets(series)
+    with tempfile.TemporaryDirectory() as directory:
+        tracemalloc.start()
+        registry, histogram = new_registry(directory)
+        # Toutes les séries existent avant la mesure
+        for endpoint, method, status in labels:
+            histogram.observe(0.01, endpoint=endpoint, method=method, status=status)
+        memory_kb = tracemalloc.get_traced_memory()[0] / 1024
+        tracemalloc.stop()
+
+        picks = [labels[rng.randrange(len(labels))] for _ in range(observations)]
+        values = [rng.expovariate(20) for _ in range(observations)]
+        start = time.perf_counter()
+        for (endpoint, method, status), value in zip(picks, values):
+            histogram.observe(value, endpoint=endpoint, method=method, status=status)
+        observe_us = (time.perf_counter() - start) / observations * 1e6
+
+        start = time.perf_counter()
+        registry.flush()
+        flush_ms = (time.perf_counter() - start) * 1000
+        file_kb = os.path.getsize(registry.worker_file) / 1024
+
+        start = time.perf_counter()
+        text = registry.exposition()
+        exposition_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'series': len(labels), 'observe_us': observe_us, 'memory_kb': memory_kb,
+        'flush_ms': flush_ms, 'file_kb': file_kb, 'exposition_ms': exposition_ms,
+        'exposition_kb': len(text) / 1024
+    }
+
+def run_worker(directory, index, count):
+    """Processus fils: count observations puis publication"""
+    registry, histogram = new_registry(directory)
+    counter = registry.counter('bench_events_total', 'Banc d\'essai', ('worker',))
+    for i in range(count):
+        histogram.observe(0.02, endpoint=f'endpoint_{i % 5}', method='GET', status='200')
+        counter.inc(worker=index % 2)
+    registry.flush()
+
+def check_multiprocess(workers, count):
+    with tempfile.TemporaryDirectory() as directory:
+        processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--worker',
+                                       directory, str(index), str(count)], cwd=ROOT)
+                     for index in range(workers)]
+        for process in processes:
+            process.wait()
+        registry, _ = new_registry(directory)
+        registry.counter('bench_events_total', 'Banc d\'essai', ('worker',))
+        text = registry.exposition()
+        events = sum(float(line.split()[-1]) for line in text.splitlines()
+                     if line.startswith('bench_events_total{'))
+        requests = sum(float(line.split()[-1]) for line in text.splitlines()
+                       if line.startswith('bench_request_duration_seconds_count{'))
+        # Les fichiers des processus terminés sont repliés dans archive.json
+        remaining = [name for name in os.listdir(directory) if name.endswith('.json')]
+        return events, requests, remaining
+
+def main():
+    parser = argparse.ArgumentParser(description='Coût du registre de métriques selon la cardinalité')
+    parser.add_argument('--series', default='1,100,1000,10000', help='nombres de séries à mesurer')
+    parser.add_argument('--observations', type=int, default=OBSERVATIONS)
+    parser.add_argument('--workers', type=int, default=4, help='processus pour le test d\'agrégation')
+    args = parser.parse_args()
+
+    print(f"📊 Histogramme à {len(new_registry(tempfile.gettempdir())[1].buckets) + 1} intervalles, "
+          f"{args.observations} observations par palier")
+    print(f"  {'séries':>8} {'observe':>10} {'mémoire':>10} {'publication':>12} {'fichier':>10} "
+          f"{'exposition':>11} {'taille':>10}")
+    for series in [int(s) for s in args.series.split(',')]:
+        r = bench(series, args.observations)
+        print(f"  {r['series']:>8} {r['observe_us']:>8.2f}µs {r['memory_kb']:>8.0f}Ko {r['flush_ms']:>10.1f}ms "
+              f"{r['file_kb']:>8.0f}Ko {r['exposition_ms']:>9.1f}ms {r['exposition_kb']:>8.0f}Ko")
+
+    count = 5000
+    events, requests, remaining = check_multiprocess(args.workers, count)
+    expected = args.workers * count
+    ok = events == expected and requests == expected
+    print(f"{'✅' if ok else '❌'} Agrégation {args.workers} processus: {events:.0f} événements, "
+          f"{requests:.0f} requêtes (attendu {expected}), fichiers restants: {', '.join(remaining)}")
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        run_worker(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+        sys.exit(0)
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Microbenchmark du nettoyage des données d'entrée pour e-Consulaire RDC
+Compare l'ancien nettoyage (6 re.sub + 4 str.replace par champ) au nouveau moteur
+(motif précompilé) sur des formulaires réalistes, et vérifie que la sortie est identique.
+
+Usage:
+    python backend/scripts/bench_sanitizer.py [iterations]
+"""
+import os
+import re
+import sys
+import random
+import string
+import timeit
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from werkzeug.datastructures import ImmutableMultiDict
+from app import app  # noqa: F401 - fixe l'ordre d'import (imports circulaires des services)
+from backend.utils.sanitizer import sanitize_value, sanitize_multidict
+
+def legacy_sanitize_input(input_data):
+    """Implémentation d'origine de SecurityService.sanitize_input (référence)"""
+    if not input_data:
+        return ""
+    dangerous_tags = ['<script', '<iframe', '<object', '<embed', '<link', '<meta']
+    cleaned = input_data
+    for tag in dangerous_tags:
+        cleaned = re.sub(tag, '&lt;' + tag[1:], cleaned, flags=re.IGNORECASE)
+    cleaned = cleaned.replace('<', '&lt;')
+    cleaned = cleaned.replace('>', '&gt;')
+    cleaned = cleaned.replace('"', '&quot;')
+    cleaned = cleaned.replace("'", '&#x27;')
+    return cleaned
+
+def legacy_sanitize_form(form):
+    return {key: legacy_sanitize_input(value) for key, value in form.items()}
+
+def build_service_form(rng, fields=40):
+    """Formulaire de demande de service type (carte consulaire, passeport...)"""
+    values = [
+        'Kabila', 'Jean-Pierre', "N'Djili", 'Kinshasa', 'Congolaise', 'Ingénieur',
+        '12 avenue de la Paix', 'OP1234567', '1985-04-12', '+243 81 234 5678',
+        'jean.kabila@example.com', "Demande d'attestation pour l'ambassade",
+        'Motif: renouvellement "urgent" suite à perte <voir PV>',
+    ]
+    form = [('csrf_token', ''.join(rng.choices(string.ascii_letters, k=43)))]
+    for i in range(fields - 1):
+        form.append((f'champ_{i}', rng.choice(values)))
+    form.append(('documents', 'passeport.pdf'))
+    form.append(('documents', 'photo.jpg'))
+    return ImmutableMultiDict(form)
+
+def build_hostile_corpus(rng, count=2000):
+    alphabet = string.ascii_letters + string.digits + ' <>"\'/=&;'
+    fragments = ['<script>', '<SCRIPT src=x>', '<iFrame', '<<meta', '<link rel', '</object>',
+                 '<EmBeD', "'; DROP", '"onload="', '<scr<script>ipt>']
+    corpus = ['', 'simple', "l'état", '<', '>>', '<SCRIPT']
+    for _ in range(count):
+        parts = [rng.choice(fragments) if rng.random() < 0.3 else
+                 ''.join(rng.choices(alphabet, k=rng.randint(0, 20))) for _ in range(rng.randint(1, 6))]
+        corpus.append(''.join(parts))
+    return corpus
+
+def check_equivalence(rng):
+    corpus = build_hostile_corpus(rng)
+    mismatches = [value for value in corpus if sanitize_value(value) != legacy_sanitize_input(value)]
+    print(f"🔍 Équivalence sur {len(corpus)} chaînes: "
+          f"{'OK' if not mismatches else f'{len(mismatches)} différence(s)'}")
+    for value in mismatches[:5]:
+        print(f"  → {value!r}: {legacy_sanitize_input(value)!r} != {sanitize_value(value)!r}")
+    return not mismatches
+
+def run_benchmarks(iterations):
+    rng = random.Random(42)
+    ok = check_equivalence(rng)
+
+    form = build_service_form(rng)
+    hostile_form = ImmutableMultiDict([(k, v + '<script>alert("x")</script>') for k, v in form.items(multi=True)])
+    cases = [
+        ('formulaire 40 champs', form),
+        ('formulaire 40 champs hostile', hostile_form),
+    ]
+
+    print(f"\n⏱️  {iterations} itérations par cas")
+    for label, data in cases:
+        legacy = timeit.timeit(lambda: legacy_sanitize_form(data), number=iterations)
+        current = timeit.timeit(lambda: sanitize_multidict(data), number=iterations)
+        print(f"  → {label:<30} ancien: {legacy / iterations * 1e6:8.1f} µs   "
+              f"nouveau: {current / iterations * 1e6:8.1f} µs   (x{legacy / current:.1f})")
+
+    single = "Motif: renouvellement \"urgent\" <voir PV> de l'acte"
+    legacy = timeit.timeit(lambda: legacy_sanitize_input(single), number=iterations * 40)
+    current = timeit.timeit(lambda: sanitize_value(single), number=iterations * 40)
+    print(f"  → {'champ isolé':<30} ancien: {legacy / (iterations * 40) * 1e6:8.2f} µs   "
+          f"nouveau: {current / (iterations * 40) * 1e6:8.2f} µs   (x{legacy / current:.1f})")
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    sys.exit(run_benchmarks(iterations))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Benchmark du démarrage des workers pour e-Consulaire RDC
+Mesure le temps jusqu'à la première requête servie par un worker:
+  - avant: dérivation de la clé de chiffrement à l'import (ENCRYPTION_WARMUP=1)
+  - après: dérivation différée au premier chiffrement
+  - préchargé: clé dérivée dans un maître puis workers forkés (gunicorn --preload)
+
+Usage:
+    python backend/scripts/bench_startup.py [workers]
+"""
+import os
+import sys
+import time
+import json
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+# Add parent directory to path to import app
+sys.path.insert(0, ROOT)
+
+def run_worker():
+    """Simuler un worker: importer l'application puis servir une première requête"""
+    start = time.perf_counter()
+    from app import app
+    imported = time.perf_counter()
+    response = app.test_client().get('/login')
+    served = time.perf_counter()
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'first_request_ms': (served - start) * 1000,
+        'status': response.status_code
+    }))
+
+def spawn_workers(count, env_overrides):
+    env = dict(os.environ, **env_overrides)
+    timings = []
+    for _ in range(count):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker'],
+                                cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+        timings.append(json.loads(output.strip().splitlines()[-1]))
+    return timings
+
+def fork_workers(count):
+    """Maître préchargé: dérivation unique avant fork, comme gunicorn --preload"""
+    os.environ['ENCRYPTION_WARMUP'] = '1'
+    from app import app
+    timings = []
+    for _ in range(count):
+        read_fd, write_fd = os.pipe()
+        start = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            app.test_client().get('/login')
+            os.write(write_fd, str((time.perf_counter() - start) * 1000).encode())
+            os._exit(0)
+        os.close(write_fd)
+        elapsed = float(os.read(read_fd, 64).decode())
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+        timings.append({'import_ms': 0.0, 'first_request_ms': elapsed})
+    return timings
+
+def report(label, timings):
+    first = [t['first_request_ms'] for t in timings]
+    imports = [t['import_ms'] for t in timings]
+    print(f"  → {label:<34} import: {statistics.median(imports):8.1f} ms   "
+          f"première requête: {statistics.median(first):8.1f} ms (médiane de {len(first)})")
+
+def measure_derivation():
+    from backend.services.security_service import SecurityService
+    service = SecurityService()
+    start = time.perf_counter()
+    service.warm_up()
+    return (time.perf_counter() - start) * 1000
+
+def main(workers):
+    print(f"⏱️  Temps jusqu'à la première requête par worker ({workers} workers)")
+    report('avant (dérivation à l\'import)', spawn_workers(workers, {'ENCRYPTION_WARMUP': '1'}))
+    report('après (dérivation différée)', spawn_workers(workers, {'ENCRYPTION_WARMUP': '0'}))
+    if hasattr(os, 'fork'):
+        report('préchargé (dérivée dans le maître)', fork_workers(workers))
+    print(f"🔑 Coût d'une dérivation PBKDF2 (100 000 itérations): {measure_derivation():.1f} ms")
+    return 0
+
+if __name__ == '__main__':
+    if '--worker' in sys.argv:
+        run_worker()
+        sys.exit(0)
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Amorçage de la base de données pour e-Consulaire RDC
+Applique une seule fois, sous verrou, les étapes de schéma et les données initiales,
+puis les reprises de données de ces étapes; à lancer avant le démarrage des workers
+(ou laisser BOOTSTRAP_ON_IMPORT=1, les reprises restant alors à lancer avec backfill).
+
+Usage:
+    python backend/scripts/bootstrap.py run [--demo|--no-demo] [--force]
+    python backend/scripts/bootstrap.py backfill
+    python backend/scripts/bootstrap.py status
+"""
+import os
+import sys
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+# L'import de l'application ne doit pas amorcer la base à la place de la commande
+os.environ['BOOTSTRAP_ON_IMPORT'] = '0'
+
+from app import app
+from backend.services.bootstrap_service import bootstrap_service, SCHEMA_VERSION, SEED_VERSION
+
+def run_bootstrap(args):
+    demo = True if '--demo' in args else False if '--no-demo' in args else None
+    print("🔄 Amorçage de la base de données...")
+    summary = bootstrap_service.bootstrap(demo=demo, force='--force' in args, backfill=True)
+    if summary is None:
+        print("✅ Base déjà à jour")
+        return 0
+    print(f"  → Schéma: version {summary['schema'][0]} → {summary['schema'][1]}")
+    print(f"  → Données initiales: version {summary['seed'][0]} → {summary['seed'][1]}"
+          f"{' (avec démonstration)' if summary['demo_data'] else ''}")
+    print_backfills(summary['backfills'])
+    print(f"✅ Amorçage terminé en {summary['duration_ms']} ms")
+    return 0
+
+def print_backfills(results):
+    for result in results:
+        print(f"  → Reprise: {result['description']} ({result['duration_ms']} ms)")
+
+def run_backfills():
+    print("🔄 Reprises de données...")
+    print_backfills(bootstrap_service.run_backfills())
+    print("✅ Reprises terminées")
+    return 0
+
+def show_status():
+    state = bootstrap_service.current_state()
+    if state is None:
+        print(f"❌ Base non amorcée (attendu: schéma {SCHEMA_VERSION}, données {SEED_VERSION})")
+        return 1
+    print(f"📋 Schéma {state.schema_version}/{SCHEMA_VERSION}, données {state.seed_version}/{SEED_VERSION}, "
+          f"démonstration: {'oui' if state.demo_data else 'non'}")
+    print(f"  → Appliqué le {state.applied_at:%Y-%m-%d %H:%M:%S} par {state.applied_by}")
+    if not bootstrap_service.is_current():
+        print("⚠️  Mise à jour nécessaire: python backend/scripts/bootstrap.py run")
+        return 1
+    print("✅ Base à jour")
+    return 0
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'run'
+    with app.app_context():
+        if command == 'run':
+            sys.exit(run_bootstrap(sys.argv[2:]))
+        elif command == 'backfill':
+            sys.exit(run_backfills())
+        elif command == 'status':
+            sys.exit(show_status())
+        print(__doc__)
+        sys.exit(1)
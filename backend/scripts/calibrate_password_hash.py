@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Calibration du hachage des mots de passe pour e-Consulaire RDC
+Mesure le coût de hachage sur cette machine et choisit les paramètres qui
+atteignent la latence cible. Avec --write, les paramètres sont enregistrés
+(instance/password_hash.json) et les hachages existants seront mis à niveau
+à la prochaine connexion de chaque utilisateur.
+
+Usage:
+    python backend/scripts/calibrate_password_hash.py [cible_ms] [scrypt|pbkdf2] [--write]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import app  # noqa: F401 - fixe l'ordre d'import (imports circulaires des services)
+from backend.services.password_service import password_service
+
+def measure_burst(method, logins=16):
+    """Simuler une rafale de connexions à travers le pool de vérification"""
+    password_hash = generate_password_hash('rafale', method=method)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=logins) as clients:
+        list(clients.map(lambda _: password_service.verify_password(password_hash, 'rafale'), range(logins)))
+    return (time.perf_counter() - start) * 1000
+
+def main(args):
+    write = '--write' in args
+    args = [a for a in args if a != '--write']
+    target_ms = int(args[0]) if len(args) > 0 else password_service.target_ms
+    algorithm = args[1] if len(args) > 1 else 'scrypt'
+
+    print(f"🔄 Calibration {algorithm} (cible: {target_ms} ms par hachage)...")
+    result = password_service.calibrate(target_ms, algorithm)
+    for measurement in result['measurements']:
+        print(f"  → {measurement['method']:<28} {measurement['ms']:8.1f} ms")
+    print(f"✅ Paramètres retenus: {result['method']}")
+
+    burst_ms = measure_burst(result['method'])
+    print(f"⏱️  Rafale de 16 connexions via le pool ({password_service.max_workers} threads): {burst_ms:.0f} ms")
+
+    if write:
+        password_service.save_calibration(result['method'], target_ms)
+        print(f"💾 Enregistré dans {password_service.config_file}")
+    elif result['method'] != password_service.method:
+        print(f"ℹ️  Paramètres actuels: {password_service.method} (relancer avec --write pour appliquer)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -9,7 +9,7 @@ Script utilitaire pour créer les données de test du système e-consulaire hié
 
 from app import app, db
 from models import User, UniteConsulaire, Service, UniteConsulaire_Service
-from werkzeug.security import generate_password_hash
+from backend.services.password_service import password_service
 from datetime import datetime
 import json
 
@@ -24,7 +24,7 @@ def create_test_users():
         super_admin = User(
             username='superadmin',
             email='superadmin@diplomatie.gouv.cd',
-            password_hash=generate_password_hash('admin123'),
+            password_hash=password_service.hash_password('admin123'),
             first_name='Jean',
             last_name='Kabila',
             role='superviseur',
@@ -42,7 +42,7 @@ def create_test_users():
         admin = User(
             username='admin_rdc',
             email='admin@diplomatie.gouv.cd',
-            password_hash=generate_password_hash('admin123'),
+            password_hash=password_service.hash_password('admin123'),
             first_name='Marie',
             last_name='Tshilombo',
             role='admin',
@@ -60,7 +60,7 @@ def create_test_users():
         agent_rabat = User(
             username='agent_rabat',
             email='agent.rabat@diplomatie.gouv.cd',
-            password_hash=generate_password_hash('agent123'),
+            password_hash=password_service.hash_password('agent123'),
             first_name='Paul',
             last_name='Mukendi',
             role='agent',
@@ -78,7 +78,7 @@ def create_test_users():
         agent_paris = User(
             username='agent_paris',
             email='agent.paris@diplomatie.gouv.cd',
-            password_hash=generate_password_hash('agent123'),
+            password_hash=password_service.hash_password('agent123'),
             first_name='Claudine',
             last_name='Mbuyi',
             role='agent',
@@ -96,7 +96,7 @@ def create_test_users():
         usager = User(
             username='usager_test',
             email='usager@test.com',
-            password_hash=generate_password_hash('user123'),
+            password_hash=password_service.hash_password('user123'),
             first_name='Joseph',
             last_name='Kalonji',
             role='usager',
@@ -8,13 +8,13 @@ Script pour créer des utilisateurs de test pour l'application e-Consulaire RDC
 """
 import sys
 import os
-from werkzeug.security import generate_password_hash
 from datetime import datetime
 
 # Ajouter le répertoire racine au path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import app, db
+from backend.services.password_service import password_service
 from backend.models import User
 
 def create_test_users():
@@ -123,7 +123,7 @@ def create_test_users():
                 first_name=user_data['first_name'],
                 last_name=user_data['last_name'],
                 phone=user_data['phone'],
-                password_hash=generate_password_hash(user_data['password']),
+                password_hash=password_service.hash_password(user_data['password']),
                 role=user_data['role'],
                 language=user_data['language'],
                 active=True,
@@ -10,8 +10,8 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash
 from app import app, db
+from backend.services.password_service import password_service
 from backend.models import (
     User, Application, Document, StatusHistory, AuditLog,
     Notification, UniteConsulaire, Service, UniteConsulaire_Service
@@ -177,7 +177,7 @@ def create_demo_users():
         existing = User.query.filter_by(email=user_data['email']).first()
         if not existing:
             user = User(**user_data)
-            user.password_hash = generate_password_hash(password)
+            user.password_hash = password_service.hash_password(password)
             db.session.add(user)
             print(f"    ✓ Created user: {user_data['email']}")
     
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Export des demandes ou des utilisateurs pour e-Consulaire RDC
+Même flux que /superviseur/export/<kind>, écrit dans un fichier. Avec --resume, un
+export CSV interrompu est complété à partir du dernier id écrit.
+
+Usage:
+    python backend/scripts/export_data.py applications --output demandes.csv [--unit ID] [--service CODE] [--status STATUT]
+    python backend/scripts/export_data.py users --output utilisateurs.xlsx --format xlsx [--role ROLE]
+    python backend/scripts/export_data.py applications --output demandes.csv --resume
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import date
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import app
+from backend.services.export_service import export_service
+
+def last_exported_id(path):
+    """Dernier id complet d'un CSV partiel; la ligne inachevée est tronquée"""
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+        end = tail.rfind(b'\n')
+        if end < 0:
+            return None
+        f.truncate(size - len(tail) + end + 1)
+        start = tail.rfind(b'\n', 0, end) + 1
+        first_field = tail[start:end].split(export_service.csv_delimiter.encode(), 1)[0]
+    try:
+        return int(first_field)
+    except ValueError:
+        # Seul l'en-tête a été écrit
+        return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Export des demandes ou des utilisateurs')
+    parser.add_argument('kind', choices=sorted(export_service.KINDS))
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--format', choices=sorted(export_service.MIMETYPES))
+    parser.add_argument('--unit', type=int)
+    parser.add_argument('--service')
+    parser.add_argument('--status')
+    parser.add_argument('--role')
+    parser.add_argument('--start', type=date.fromisoformat)
+    parser.add_argument('--end', type=date.fromisoformat, help='exclue')
+    parser.add_argument('--after-id', type=int)
+    parser.add_argument('--resume', action='store_true', help='compléter un CSV interrompu')
+    args = parser.parse_args()
+
+    fmt = args.format or ('xlsx' if args.output.endswith('.xlsx') else 'csv')
+    after_id = args.after_id
+    mode = 'wb'
+    if args.resume and fmt == 'csv' and os.path.exists(args.output):
+        after_id = last_exported_id(args.output)
+        if after_id is None:
+            print("❌ Fichier sans ligne complète: relancer sans --resume")
+            return 1
+        mode = 'ab'
+        print(f"→ Reprise après l'id {after_id}")
+
+    filters = {
+        'unit_id': args.unit,
+        'service_type': args.service,
+        'status': args.status,
+        'role': args.role,
+        'start': args.start,
+        'end': args.end,
+        'after_id': after_id,
+    }
+    started = time.perf_counter()
+    written = 0
+    with app.app_context(), open(args.output, mode) as f:
+        for chunk in export_service.export(args.kind, fmt, filters):
+            f.write(chunk)
+            written += len(chunk)
+    print(f"✅ {args.output}: {written / 1048576:,.1f} Mo écrits en {time.perf_counter() - started:.1f} s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
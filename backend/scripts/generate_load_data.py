@@ -0,0 +1,538 @@
+#!/usr/bin/env python
+"""
+Générateur de données volumineuses pour les tests de charge d'e-Consulaire RDC
+Crée unités consulaires, utilisateurs, demandes avec historique de statuts,
+documents factices, notifications et journal d'audit.
+
+- insertion par lots: COPY sur PostgreSQL, executemany sinon
+- identifiants attribués à l'avance (clés étrangères calculées sans relecture)
+- un seul hachage de mot de passe, réutilisé pour tous les comptes générés
+- graine fixe: un même jeu de paramètres produit les mêmes données
+
+Usage:
+    python backend/scripts/generate_load_data.py --units 1000 --users 100000 --applications 1000000
+    python backend/scripts/generate_load_data.py --help
+
+À lancer sur une base dédiée (DATABASE_URL): les données s'ajoutent à l'existant.
+Les comptes générés ont des adresses @loadtest.cd et le mot de passe --password.
+"""
+import os
+import sys
+import io
+import csv
+import json
+import time
+import random
+import argparse
+from datetime import datetime, date, timedelta
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from sqlalchemy import func, select, text
+from app import app, db
+from backend.models import (
+    User, UniteConsulaire, Service, UniteConsulaire_Service, Application,
+    StatusHistory, Document, Notification, AuditLog
+)
+from backend.services.password_service import password_service
+from backend.services.notification_counter_service import notification_counter_service
+from backend.services.sla_service import sla_service
+from backend.services.tracking_service import tracking_service
+
+FIRST_NAMES = ['Jean', 'Marie', 'Joseph', 'Grace', 'Patrick', 'Esther', 'Pierre', 'Sarah', 'Emmanuel',
+               'Ruth', 'Fabrice', 'Chantal', 'Didier', 'Nadine', 'Olivier', 'Aline', 'Serge', 'Josué',
+               'Christelle', 'Trésor', 'Benedicte', 'Cédric', 'Divine', 'Glody', 'Merveille', 'Prince']
+LAST_NAMES = ['Mukendi', 'Kabila', 'Tshisekedi', 'Lumumba', 'Ilunga', 'Kasongo', 'Mbuyi', 'Tshombe',
+              'Kalala', 'Ngoy', 'Mwamba', 'Kabongo', 'Nzuzi', 'Mbala', 'Lukusa', 'Kanku', 'Banza',
+              'Mulumba', 'Kapinga', 'Makiese', 'Nsimba', 'Bokolo', 'Matondo', 'Kiala']
+BIRTH_PLACES = ['Kinshasa', 'Lubumbashi', 'Mbuji-Mayi', 'Kisangani', 'Goma', 'Bukavu', 'Kananga',
+                'Matadi', 'Kolwezi', 'Likasi', 'Mbandaka', 'Kikwit']
+# (ville, pays, code pays, fuseau horaire)
+CITIES = [
+    ('Paris', 'France', 'FRA', 'Europe/Paris'), ('Bruxelles', 'Belgique', 'BEL', 'Europe/Brussels'),
+    ('Rabat', 'Maroc', 'MAR', 'Africa/Casablanca'), ('Johannesburg', 'Afrique du Sud', 'ZAF', 'Africa/Johannesburg'),
+    ('Washington', 'États-Unis', 'USA', 'America/New_York'), ('Londres', 'Royaume-Uni', 'GBR', 'Europe/London'),
+    ('Berlin', 'Allemagne', 'DEU', 'Europe/Berlin'), ('Luanda', 'Angola', 'AGO', 'Africa/Luanda'),
+    ('Nairobi', 'Kenya', 'KEN', 'Africa/Nairobi'), ('Pékin', 'Chine', 'CHN', 'Asia/Shanghai'),
+    ('Montréal', 'Canada', 'CAN', 'America/Toronto'), ('Genève', 'Suisse', 'CHE', 'Europe/Zurich'),
+]
+UNIT_TYPES = ['ambassade', 'consulat_general', 'consulat']
+
+# Parcours des statuts (une demande s'arrête à une étape de son parcours)
+STATUS_PATHS = [
+    (['soumise'], 20),
+    (['soumise', 'en_traitement'], 20),
+    (['soumise', 'en_traitement', 'documents_requis'], 8),
+    (['soumise', 'en_traitement', 'rejetee'], 7),
+    (['soumise', 'en_traitement', 'validee'], 15),
+    (['soumise', 'en_traitement', 'validee', 'pret_pour_retrait'], 12),
+    (['soumise', 'en_traitement', 'documents_requis', 'en_traitement', 'validee', 'pret_pour_retrait', 'cloture'], 6),
+    (['soumise', 'en_traitement', 'validee', 'pret_pour_retrait', 'cloture'], 12),
+]
+STATUS_COMMENTS = {
+    'en_traitement': 'Dossier pris en charge',
+    'documents_requis': 'Pièce justificative manquante',
+    'rejetee': 'Dossier incomplet',
+    'validee': 'Dossier validé',
+    'pret_pour_retrait': 'Document disponible au guichet',
+    'cloture': 'Document remis',
+}
+DOCUMENT_TYPES = [('passeport', 'application/pdf'), ('photo', 'image/jpeg'),
+                  ('justificatif_residence', 'application/pdf'), ('acte_naissance', 'application/pdf')]
+AUDIT_ACTIONS = [('login', 'user'), ('logout', 'user'), ('view_application', 'application'),
+                 ('update_application_status', 'application'), ('upload_document', 'document'),
+                 ('download_document', 'document'), ('update_profile', 'user'),
+                 ('security_failed_login', 'user'), ('export_applications', 'application')]
+
+class BulkWriter:
+    """Insertion par lots: COPY (PostgreSQL) ou executemany via SQLAlchemy Core"""
+
+    def __init__(self, connection, batch_size):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.dialect = connection.dialect
+        self.use_copy = self.dialect.name == 'postgresql'
+        self.counts = {}
+
+    def write(self, table, rows):
+        """Écrire un itérable de dicts (mêmes clés) par lots; retourne le nombre de lignes"""
+        batch = []
+        written = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                written += self._flush(table, batch)
+                batch = []
+        if batch:
+            written += self._flush(table, batch)
+        self.counts[table.name] = self.counts.get(table.name, 0) + written
+        return written
+
+    def _flush(self, table, batch):
+        if self.use_copy:
+            self._copy(table, batch)
+        else:
+            self.connection.execute(table.insert(), batch)
+        self.connection.commit()
+        return len(batch)
+
+    def _copy(self, table, batch):
+        columns = list(batch[0].keys())
+        # Les types chiffrés (TypeDecorator) sont appliqués ici, COPY ne passe pas par SQLAlchemy
+        processors = {name: table.c[name].type.process_bind_param for name in columns
+                      if hasattr(table.c[name].type, 'process_bind_param')}
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+        for row in batch:
+            values = []
+            for name in columns:
+                value = row[name]
+                if name in processors:
+                    value = processors[name](value, self.dialect)
+                if isinstance(value, (datetime, date)):
+                    value = value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+                values.append(value)
+            writer.writerow(values)
+        buffer.seek(0)
+
+        preparer = self.dialect.identifier_preparer
+        statement = (f'COPY {preparer.format_table(table)} ({", ".join(preparer.quote(c) for c in columns)}) '
+                     f'FROM STDIN WITH (FORMAT csv)')
+        cursor = self.connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(statement, buffer)
+        finally:
+            cursor.close()
+
+    def reset_sequences(self, tables):
+        """Réaligner les séquences PostgreSQL après insertion d'identifiants explicites"""
+        if not self.use_copy:
+            return
+        for table in tables:
+            self.connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{self.dialect.identifier_preparer.format_table(table)}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {self.dialect.identifier_preparer.format_table(table)}))"
+            ))
+        self.connection.commit()
+
+class LoadDataGenerator:
+    def __init__(self, options):
+        self.options = options
+        self.end = datetime.combine(options.end_date, datetime.min.time())
+        self.start = self.end - timedelta(days=options.days)
+        self.password_hash = None
+        self.path_weights = [weight for _, weight in STATUS_PATHS]
+
+    def rng(self, name):
+        """Générateur pseudo-aléatoire propre à chaque table (volumes indépendants)"""
+        return random.Random(f'{self.options.seed}:{name}')
+
+    def next_ids(self, connection):
+        ids = {}
+        for model in (User, UniteConsulaire, UniteConsulaire_Service, Application,
+                      StatusHistory, Document, Notification, AuditLog):
+            table = model.__table__
+            ids[table.name] = (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+        return ids
+
+    def random_moment(self, rng, after=None):
+        start = after or self.start
+        span = max(1, int((self.end - start).total_seconds()))
+        return start + timedelta(seconds=rng.randrange(span))
+
+    def run(self):
+        options = self.options
+        started = time.perf_counter()
+        # Un seul hachage calibré: le coût est payé une fois, pas par compte
+        self.password_hash = password_service.hash_password(options.password)
+
+        with db.engine.connect() as connection:
+            if connection.dialect.name == 'sqlite':
+                connection.exec_driver_sql('PRAGMA synchronous=OFF')
+                connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+            writer = BulkWriter(connection, options.batch_size)
+            ids = self.next_ids(connection)
+            services = connection.execute(
+                select(Service.id, Service.code, Service.tarif_de_base).where(Service.actif == True)
+                .order_by(Service.id)
+            ).all()
+            if not services:
+                raise RuntimeError('Aucun service actif: amorcer la base (backend/scripts/bootstrap.py run)')
+
+            supervisors = max(1, options.units // 50)
+            agents = options.units * options.agents_per_unit
+            citizens = max(0, options.users - supervisors - agents)
+            layout = {
+                'supervisor_start': ids['user'],
+                'agent_start': ids['user'] + supervisors,
+                'citizen_start': ids['user'] + supervisors + agents,
+                'unit_start': ids['unite_consulaire'],
+                'supervisors': supervisors,
+                'citizens': citizens,
+            }
+
+            steps = [
+                ('superviseurs', lambda: writer.write(User.__table__, self.supervisor_rows(layout))),
+                ('unités consulaires', lambda: writer.write(UniteConsulaire.__table__, self.unit_rows(layout))),
+                ('services des unités', lambda: writer.write(UniteConsulaire_Service.__table__,
+                                                             self.unit_service_rows(layout, ids, services))),
+                ('agents et citoyens', lambda: writer.write(User.__table__, self.member_rows(layout))),
+            ]
+            for label, step in steps:
+                self.report(label, step, started)
+
+            self.report('demandes, historiques et documents',
+                        lambda: self.write_applications(writer, layout, ids, services), started)
+            self.report('notifications',
+                        lambda: writer.write(Notification.__table__, self.notification_rows(layout, ids)), started)
+            self.report('journal d\'audit',
+                        lambda: writer.write(AuditLog.__table__, self.audit_rows(layout, ids)), started)
+
+            writer.reset_sequences([model.__table__ for model in (
+                User, UniteConsulaire, UniteConsulaire_Service, Application,
+                StatusHistory, Document, Notification, AuditLog)])
+            if connection.dialect.name == 'postgresql':
+                connection.exec_driver_sql('ANALYZE')
+                connection.commit()
+        return writer.counts
+
+    def report(self, label, step, started):
+        count = step()
+        print(f"  → {label:<36} {count:>10,} lignes   ({time.perf_counter() - started:7.1f} s)")
+
+    def unit_of_member(self, layout, user_id):
+        """Unité d'un agent ou d'un citoyen (calculée, sans requête)"""
+        if user_id < layout['citizen_start']:
+            index = (user_id - layout['agent_start']) // self.options.agents_per_unit
+        else:
+            index = (user_id - layout['citizen_start']) % self.options.units
+        return layout['unit_start'] + index
+
+    def user_row(self, rng, user_id, role, unit_id, unit_index=None):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created_at = self.random_moment(rng)
+        row = {
+            'id': user_id,
+            'username': f'lt_{role}_{user_id}',
+            'email': f'{role}.{user_id}@loadtest.cd',
+            'password_hash': self.password_hash,
+            'first_name': first_name,
+            'last_name': last_name,
+            'middle_name': None,
+            'phone': f'+243 8{rng.randrange(10)} {rng.randrange(1000000, 9999999)}',
+            'role': role,
+            'active': rng.random() > 0.02,
+            'language': 'fr',
+            'created_at': created_at,
+            'last_login': self.random_moment(rng, created_at) if rng.random() < 0.7 else None,
+            'genre': rng.choice(['M', 'F']),
+            'date_naissance': None,
+            'lieu_naissance': None,
+            'etat_civil': None,
+            'nationalite': 'Congolaise',
+            'profession': None,
+            'adresse_rue': None,
+            'adresse_ville': None,
+            'adresse_pays': None,
+            'code_postal': None,
+            'numero_passeport': None,
+            'unite_consulaire_id': unit_id,
+            'profile_complete': role != 'usager',
+        }
+        if role == 'usager' and rng.random() < 0.8:
+            # Citoyen résidant dans la ville de son unité
+            city, country, _, _ = CITIES[unit_index % len(CITIES)] if unit_index is not None else rng.choice(CITIES)
+            issued = date(2015, 1, 1) + timedelta(days=rng.randrange(3650))
+            row.update({
+                'date_naissance': date(1950, 1, 1) + timedelta(days=rng.randrange(20000)),
+                'lieu_naissance': rng.choice(BIRTH_PLACES),
+                'etat_civil': rng.choice(['celibataire', 'marie', 'divorce', 'veuf']),
+                'profession': rng.choice(['Étudiant', 'Ingénieur', 'Commerçant', 'Enseignant', 'Médecin']),
+                'adresse_rue': f'{rng.randrange(1, 300)} rue {rng.choice(LAST_NAMES)}',
+                'adresse_ville': city,
+                'adresse_pays': country,
+                'code_postal': f'{rng.randrange(10000, 99999)}',
+                'numero_passeport': f'OP{rng.randrange(1000000, 9999999)}',
+                'passeport_date_emission': issued,
+                'passeport_date_expiration': issued + timedelta(days=3652),
+                'profile_complete': True,
+            })
+        else:
+            row.update({'passeport_date_emission': None, 'passeport_date_expiration': None})
+        return row
+
+    def supervisor_rows(self, layout):
+        rng = self.rng('supervisors')
+        for offset in range(layout['supervisors']):
+            yield self.user_row(rng, layout['supervisor_start'] + offset, 'superviseur', None)
+
+    def member_rows(self, layout):
+        rng = self.rng('members')
+        for user_id in range(layout['agent_start'], layout['citizen_start'] + layout['citizens']):
+            role = 'agent' if user_id < layout['citizen_start'] else 'usager'
+            unit_id = self.unit_of_member(layout, user_id)
+            yield self.user_row(rng, user_id, role, unit_id, unit_id - layout['unit_start'])
+
+    def unit_rows(self, layout):
+        rng = self.rng('units')
+        for index in range(self.options.units):
+            city, country, code_pays, timezone = CITIES[index % len(CITIES)]
+            unit_type = UNIT_TYPES[index % len(UNIT_TYPES)]
+            unit_id = layout['unit_start'] + index
+            yield {
+                'id': unit_id,
+                'nom': f'{unit_type.replace("_", " ").title()} RDC {city} {index + 1}',
+                'type': unit_type,
+                'ville': city,
+                'pays': country,
+                'chef_nom': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                'chef_titre': 'Ambassadeur' if unit_type == 'ambassade' else 'Consul',
+                'email_principal': f'unite{unit_id}@loadtest.cd',
+                'telephone_principal': f'+{rng.randrange(1, 999)}-{rng.randrange(100, 999)}-{rng.randrange(100000, 999999)}',
+                'adresse_rue': f'{rng.randrange(1, 200)} avenue {rng.choice(LAST_NAMES)}',
+                'adresse_ville': city,
+                'adresse_complete': f'{city}, {country}',
+                'code_pays': code_pays,
+                'timezone': timezone,
+                'active': True,
+                'created_at': self.start,
+                'created_by': layout['supervisor_start'] + index % layout['supervisors'],
+            }
+
+    def unit_service_rows(self, layout, ids, services):
+        rng = self.rng('unit_services')
+        next_id = ids['unite_service']
+        for index in range(self.options.units):
+            for service_id, _, tarif in services:
+                yield {
+                    'id': next_id,
+                    'unite_consulaire_id': layout['unit_start'] + index,
+                    'service_id': service_id,
+                    'tarif_personnalise': round((tarif or 0) * rng.uniform(0.8, 1.5), 2),
+                    'devise': 'USD',
+                    'actif': rng.random() > 0.05,
+                    'created_at': self.start,
+                    'updated_at': self.start,
+                    'configured_by': layout['supervisor_start'] + index % layout['supervisors'],
+                }
+                next_id += 1
+
+    def write_applications(self, writer, layout, ids, services):
+        """Demandes par tranches, avec leurs historiques et documents dans la même tranche"""
+        options = self.options
+        if not layout['citizens']:
+            return 0
+        rng = self.rng('applications')
+        dummy_files = self.dummy_documents()
+        application_id = ids['application']
+        history_id = ids['status_history']
+        document_id = ids['document']
+        written = 0
+
+        while written < options.applications:
+            size = min(options.batch_size, options.applications - written)
+            applications, history, documents = [], [], []
+            for _ in range(size):
+                citizen = layout['citizen_start'] + rng.randrange(layout['citizens'])
+                unit_id = self.unit_of_member(layout, citizen)
+                service_id, code, tarif = services[rng.randrange(len(services))]
+                path = rng.choices(STATUS_PATHS, weights=self.path_weights)[0][0]
+                created_at = self.random_moment(rng)
+                agent = (layout['agent_start'] + (unit_id - layout['unit_start']) * options.agents_per_unit
+                         + rng.randrange(options.agents_per_unit)) if options.agents_per_unit else None
+
+                moment = created_at
+                previous = None
+                for status in path:
+                    history.append({
+                        'id': history_id,
+                        'application_id': application_id,
+                        'old_status': previous,
+                        'new_status': status,
+                        'changed_by': citizen if status == 'soumise' else agent,
+                        'comment': STATUS_COMMENTS.get(status),
+                        'timestamp': moment,
+                    })
+                    history_id += 1
+                    previous = status
+                    moment = min(self.end, moment + timedelta(hours=rng.randrange(2, 24 * 7)))
+
+                applications.append({
+                    'id': application_id,
+                    'user_id': citizen,
+                    'unite_consulaire_id': unit_id,
+                    'service_type': code,
+                    'reference_number': f'LT{application_id:011d}',
+                    'status': path[-1],
+                    'form_data': json.dumps({'motif': rng.choice(['Voyage', 'Études', 'Travail', 'Résidence']),
+                                             'urgence': rng.random() < 0.1}),
+                    'created_at': created_at,
+                    'updated_at': history[-1]['timestamp'],
+                    'processed_by': agent if len(path) > 1 else None,
+                    'rejection_reason': STATUS_COMMENTS['rejetee'] if path[-1] == 'rejetee' else None,
+                    'appointment_date': None,
+                    'payment_amount': tarif or 0.0,
+                    'payment_status': 'paid' if len(path) > 2 else 'pending',
+                })
+
+                for document_type, mime_type in DOCUMENT_TYPES[:options.documents_per_application]:
+                    path_on_disk, size_bytes = dummy_files[mime_type]
+                    documents.append({
+                        'id': document_id,
+                        'application_id': application_id,
+                        'filename': os.path.basename(path_on_disk),
+                        'original_filename': f'{document_type}{os.path.splitext(path_on_disk)[1]}',
+                        'file_path': path_on_disk,
+                        'file_size': size_bytes,
+                        'mime_type': mime_type,
+                        'document_type': document_type,
+                        'uploaded_at': created_at,
+                    })
+                    document_id += 1
+                application_id += 1
+
+            writer.write(Application.__table__, applications)
+            writer.write(StatusHistory.__table__, history)
+            if documents:
+                writer.write(Document.__table__, documents)
+            written += size
+        return written
+
+    def dummy_documents(self):
+        """Fichiers factices partagés par tous les documents générés (un par type MIME)"""
+        directory = os.path.join(app.config['UPLOAD_FOLDER'], 'loadtest')
+        os.makedirs(directory, exist_ok=True)
+        contents = {
+            'application/pdf': ('document.pdf', b'%PDF-1.4\n% e-Consulaire RDC - document factice\n%%EOF\n'),
+            'image/jpeg': ('photo.jpg', b'\xff\xd8\xff\xe0' + b'\x00' * 1024 + b'\xff\xd9'),
+        }
+        files = {}
+        for mime_type, (filename, data) in contents.items():
+            path = os.path.join(directory, filename)
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(data)
+            files[mime_type] = (path, len(data))
+        return files
+
+    def notification_rows(self, layout, ids):
+        rng = self.rng('notifications')
+        next_id = ids['notification']
+        mean = self.options.notifications_per_user
+        for offset in range(layout['citizens']):
+            user_id = layout['citizen_start'] + offset
+            for _ in range(rng.randrange(2 * mean + 1) if mean else 0):
+                yield {
+                    'id': next_id,
+                    'user_id': user_id,
+                    'title': 'Mise à jour de votre demande',
+                    'message': rng.choice(['Votre demande est en cours de traitement.',
+                                           'Des documents supplémentaires sont requis.',
+                                           'Votre document est prêt pour retrait.']),
+                    'type': rng.choice(['info', 'success', 'warning']),
+                    'is_read': rng.random() < 0.6,
+                    'created_at': self.random_moment(rng),
+                }
+                next_id += 1
+
+    def audit_rows(self, layout, ids):
+        rng = self.rng('audit')
+        total_users = layout['supervisors'] + self.options.units * self.options.agents_per_unit + layout['citizens']
+        for offset in range(self.options.audit_logs):
+            action, resource = rng.choice(AUDIT_ACTIONS)
+            yield {
+                'id': ids['audit_log'] + offset,
+                'user_id': layout['supervisor_start'] + rng.randrange(total_users),
+                'action': action,
+                'resource': resource,
+                'resource_id': rng.randrange(1, max(2, self.options.applications)),
+                'details': None,
+                'ip_address': f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}',
+                'user_agent': 'loadtest',
+                'created_at': self.random_moment(rng),
+            }
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Données volumineuses reproductibles pour les tests de charge')
+    parser.add_argument('--seed', type=int, default=42, help='graine pseudo-aléatoire (défaut: 42)')
+    parser.add_argument('--units', type=int, default=100, help='unités consulaires')
+    parser.add_argument('--users', type=int, default=10000, help='utilisateurs (superviseurs, agents et citoyens)')
+    parser.add_argument('--agents-per-unit', type=int, default=3)
+    parser.add_argument('--applications', type=int, default=50000, help='demandes')
+    parser.add_argument('--documents-per-application', type=int, default=2, choices=range(0, len(DOCUMENT_TYPES) + 1))
+    parser.add_argument('--notifications-per-user', type=int, default=3, help='moyenne par citoyen')
+    parser.add_argument('--audit-logs', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365, help='période couverte jusqu\'à --end-date')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(), help='AAAA-MM-JJ (défaut: aujourd\'hui)')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--password', default='loadtest123', help='mot de passe de tous les comptes générés')
+    options = parser.parse_args(argv)
+    if options.units < 1:
+        parser.error('--units doit être au moins 1')
+    return options
+
+def main(argv):
+    options = parse_args(argv)
+    print(f"🏗️  Génération (graine {options.seed}, jusqu'au {options.end_date}) sur "
+          f"{db.engine.url.render_as_string(hide_password=True)}")
+    started = time.perf_counter()
+    counts = LoadDataGenerator(options).run()
+    total = sum(counts.values())
+    elapsed = time.perf_counter() - started
+    print(f"✅ {total:,} lignes en {elapsed:.1f} s ({total / max(elapsed, 0.001):,.0f} lignes/s)")
+    counters = notification_counter_service.reconcile()
+    print(f"  → compteurs de notifications: {counters['corrected']:,} utilisateur(s)")
+    # Échéances et compteurs SLA: sans eux, retards, tableau SLA et attribution
+    # par échéance tourneraient sur des données vides
+    filled = sla_service.backfill(batch_size=options.batch_size)
+    print(f"  → échéances SLA: {filled:,} demande(s)")
+    print("ℹ️  Faits des rapports: python backend/scripts/reporting_rollups.py backfill")
+    # Instantanés de suivi: /track ne les crée pas à la consultation
+    snapshots = tracking_service.backfill(batch_size=options.batch_size)
+    print(f"  → instantanés de suivi: {snapshots:,} demande(s)")
+    return 0
+
+if __name__ == '__main__':
+    with app.app_context():
+        sys.exit(main(sys.argv[1:]))
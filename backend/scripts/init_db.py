@@ -107,14 +107,14 @@ def create_default_services():
 
 def create_default_admin():
     """Create default admin user"""
-    from werkzeug.security import generate_password_hash
+    from backend.services.password_service import password_service
     
     admin = User.query.filter_by(email='admin@diplomatie.gouv.cd').first()
     if not admin:
         admin_user = User()
         admin_user.username = 'admin'
         admin_user.email = 'admin@diplomatie.gouv.cd'
-        admin_user.password_hash = generate_password_hash('admin123')
+        admin_user.password_hash = password_service.hash_password('admin123')
         admin_user.role = 'superviseur'
         admin_user.active = True
         admin_user.first_name = 'Administrateur'
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+"""
+Compteurs de notifications non lues pour e-Consulaire RDC
+Recompte les notifications non lues et corrige les compteurs divergents (après un import
+en masse ou une modification directe en base), par exemple chaque nuit par cron.
+
+Usage:
+    python backend/scripts/notification_counters.py reconcile [--user ID ...]
+"""
+import os
+import sys
+import time
+import argparse
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import app
+from backend.services.notification_counter_service import notification_counter_service
+
+def main():
+    parser = argparse.ArgumentParser(description='Réconciliation des compteurs de notifications non lues')
+    parser.add_argument('command', choices=['reconcile'])
+    parser.add_argument('--user', type=int, action='append', help='utilisateur (répétable)')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with app.app_context():
+        result = notification_counter_service.reconcile(args.user, batch_size=args.batch_size)
+    print(f"✅ {result['checked']} utilisateur(s) vérifié(s), {result['corrected']} compteur(s) corrigé(s) "
+          f"({time.perf_counter() - started:.1f} s)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
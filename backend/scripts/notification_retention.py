@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+Rétention des notifications pour e-Consulaire RDC
+Suppression (ou archivage) des notifications lues anciennes et regroupement des
+anciennes non lues en récapitulatifs, par lots courts; historique des exécutions.
+
+Usage:
+    python backend/scripts/notification_retention.py run
+    python backend/scripts/notification_retention.py status
+"""
+import os
+import sys
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import app
+from backend.services.notification_retention_service import notification_retention_service
+
+def run_retention():
+    report = notification_retention_service.run()
+    if not report['success']:
+        print(f"❌ Erreur: {report.get('error')}")
+        return 1
+    print(f"  → {report['deleted']} notification(s) lue(s) supprimée(s)")
+    print(f"  → {report['digested']} non lue(s) regroupée(s) en {report['digests']} récapitulatif(s)")
+    print(f"✅ Rétention terminée en {report['duration_s']} s ({report['batches']} lot(s))")
+    return 0
+
+def show_status():
+    service = notification_retention_service
+    print(f"📋 Lues conservées {service.read_retention_days} jours, non lues regroupées après "
+          f"{service.digest_after_days} jours (mode: {service.mode})")
+    for report in service.last_runs():
+        outcome = (f"{report['deleted']} supprimée(s), {report['digested']} regroupée(s)"
+                   if report['success'] else f"échec: {report.get('error')}")
+        print(f"  → {report['started_at'][:19]}  {outcome}  ({report['duration_s']} s)")
+    return 0
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'run'
+    with app.app_context():
+        if command == 'run':
+            sys.exit(run_retention())
+        elif command == 'status':
+            sys.exit(show_status())
+        print(__doc__)
+        sys.exit(1)
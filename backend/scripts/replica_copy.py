@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Copie locale de la base SQLite servant de réplica en lecture (tests, développement)
+La copie est cohérente (API de sauvegarde SQLite, y compris le journal WAL) et peut
+être rafraîchie à intervalle régulier pour simuler un retard de réplication.
+
+Usage:
+    python backend/scripts/replica_copy.py [destination] [--every SECONDES]
+    REPLICA_DATABASE_URL=sqlite:///$PWD/instance/econsular_replica.db python main.py
+
+Pour PostgreSQL, utiliser un réplica en streaming (primary_conninfo) et
+REPLICA_DATABASE_URL=postgresql://...
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+# Add parent directory to path to import app
+sys.path.insert(0, ROOT)
+
+from app import app, db
+
+def copy_database(destination):
+    source = db.engine.url.database
+    start = time.perf_counter()
+    tmp_path = f'{destination}.tmp'
+    with sqlite3.connect(source) as src, sqlite3.connect(tmp_path) as dst:
+        src.backup(dst)
+    os.replace(tmp_path, destination)
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Copie SQLite utilisée comme réplica en lecture')
+    parser.add_argument('destination', nargs='?', default=os.path.join(app.instance_path, 'econsular_replica.db'))
+    parser.add_argument('--every', type=float, help='recopier toutes les N secondes (retard simulé)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            print("❌ La base principale n'est pas SQLite: utiliser un réplica PostgreSQL")
+            return 1
+        while True:
+            duration_ms = copy_database(args.destination)
+            print(f"✅ Réplica {args.destination} copié en {duration_ms:.0f} ms")
+            if not args.every:
+                break
+            time.sleep(args.every)
+
+    print(f"→ REPLICA_DATABASE_URL=sqlite:///{os.path.abspath(args.destination)}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Faits journaliers des rapports pour e-Consulaire RDC
+Reconstruction depuis l'historique des statuts (tous les cœurs par défaut) et
+consultation des tendances.
+
+Usage:
+    python backend/scripts/reporting_rollups.py backfill [--start AAAA-MM-JJ] [--end AAAA-MM-JJ] [--workers N]
+    python backend/scripts/reporting_rollups.py trend [--granularity month|year] [--unit ID] [--service CODE]
+"""
+import os
+import sys
+import argparse
+from datetime import date
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import app
+from backend.services.reporting_service import reporting_service
+
+def run_backfill(args):
+    def progress(chunk_start, chunk_end, changes):
+        print(f"  → {chunk_start} – {chunk_end}: {changes:,} changement(s) de statut agrégé(s)")
+
+    result = reporting_service.backfill(args.start, args.end, args.workers, progress=progress)
+    print(f"✅ {result['changes']:,} changement(s) sur {result['days']} jour(s), {result['rows']:,} ligne(s) "
+          f"de faits en {result['duration_s']} s ({result.get('workers', 0)} processus)")
+    return 0
+
+def show_trend(args):
+    series = reporting_service.trends(args.granularity, args.start, args.end, args.unit, args.service)
+    print(f"  {'période':<8} {'soumises':>9} {'validées':>9} {'rejetées':>9} {'montant soumis':>15} {'médiane (h)':>12}")
+    for entry in series:
+        statuses = entry['statuses']
+        count = lambda status: statuses.get(status, {}).get('count', 0)
+        revenue = statuses.get('soumise', {}).get('revenue', 0)
+        median = entry['processing']['median_hours']
+        print(f"  {entry['period']:<8} {count('soumise'):>9} {count('validee'):>9} {count('rejetee'):>9} "
+              f"{revenue:>15,.2f} {median if median is not None else '-':>12}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Faits journaliers des rapports')
+    parser.add_argument('command', choices=['backfill', 'trend'])
+    parser.add_argument('--start', type=date.fromisoformat)
+    parser.add_argument('--end', type=date.fromisoformat, help='exclue')
+    parser.add_argument('--workers', type=int, help='processus (défaut: ROLLUP_BACKFILL_WORKERS ou nombre de cœurs)')
+    parser.add_argument('--granularity', choices=['month', 'year'], default='month')
+    parser.add_argument('--unit', type=int)
+    parser.add_argument('--service')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == 'backfill':
+            return run_backfill(args)
+        return show_trend(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
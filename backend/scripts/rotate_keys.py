@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Rotation des clés de chiffrement des champs sensibles pour e-Consulaire RDC
+
+Usage:
+    python backend/scripts/rotate_keys.py genkey <kid>   # nouvelle entrée pour FIELD_ENCRYPTION_KEYS
+    python backend/scripts/rotate_keys.py run            # rechiffrer vers FIELD_ENCRYPTION_ACTIVE_KID
+    python backend/scripts/rotate_keys.py resume [id]    # reprendre une tâche interrompue
+    python backend/scripts/rotate_keys.py status
+"""
+import os
+import sys
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import app
+from backend.models import KeyRotationJob
+from backend.models.encryption import generate_key_entry
+
+def print_progress(job):
+    print(f"\r  → {job.get_progress():3d}%  {job.rows_scanned}/{job.rows_total} lignes lues, "
+          f"{job.rows_rotated} rechiffrées (dernier id {job.last_id})", end='', flush=True)
+
+def print_result(job):
+    print()
+    if job.status == 'completed':
+        print(f"✅ Rotation terminée: {job.rows_rotated} lignes rechiffrées vers la clé {job.target_kid}")
+        return 0
+    print(f"❌ Tâche {job.id} {job.status}: {job.error} (reprendre avec: resume {job.id})")
+    return 1
+
+def main(args):
+    command = args[0] if args else 'status'
+    if command == 'genkey':
+        kid = args[1] if len(args) > 1 else 'k1'
+        print(generate_key_entry(kid))
+        return 0
+
+    from backend.services.key_rotation_service import key_rotation_service
+
+    with app.app_context():
+        if command == 'run':
+            job = key_rotation_service.start(background=False)
+            print(f"🔄 Rotation vers la clé {job.target_kid} (tâche {job.id}, "
+                  f"{key_rotation_service.workers} processus, lots de {key_rotation_service.batch_size})")
+            return print_result(key_rotation_service.run(job.id, progress=print_progress))
+        if command == 'resume':
+            job = key_rotation_service.resume(int(args[1]) if len(args) > 1 else None, progress=print_progress)
+            if job is None:
+                print("Aucune tâche à reprendre")
+                return 0
+            return print_result(job)
+        if command == 'status':
+            for job in KeyRotationJob.query.order_by(KeyRotationJob.id.desc()).limit(10):
+                print(f"  → tâche {job.id}: {job.status:<10} {job.get_progress():3d}%  cible {job.target_kid}  "
+                      f"dernier id {job.last_id}  {job.error or ''}")
+            return 0
+    print(__doc__)
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Suivi des délais de traitement (SLA) pour e-Consulaire RDC
+Balayage des dossiers en retard (escalade aux administrateurs d'unité), recalcul des
+échéances et des compteurs, et état par unité. À lancer par cron si SLA_SWEEP_INTERVAL=0.
+
+Usage:
+    python backend/scripts/sla_maintenance.py sweep
+    python backend/scripts/sla_maintenance.py rebuild
+    python backend/scripts/sla_maintenance.py status
+"""
+import os
+import sys
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import app
+from backend.models import SlaUnitStats, UniteConsulaire
+from backend.services.sla_service import sla_service
+
+def run_sweep():
+    result = sla_service.sweep()
+    print(f"✅ {result['escalated']} dossier(s) escaladé(s), {result['units']} unité(s) avec retards ou risques")
+    return 0
+
+def run_rebuild():
+    filled = sla_service.backfill()
+    print(f"✅ Échéances calculées pour {filled} demande(s), compteurs recalculés")
+    return 0
+
+def show_status():
+    rows = SlaUnitStats.query.join(UniteConsulaire).order_by(UniteConsulaire.nom).all()
+    if not rows:
+        print("Aucun compteur SLA (lancer: sla_maintenance.py rebuild)")
+        return 0
+    print(f"  {'unité':<40} {'délais':>7} {'décisions':>10} {'retard':>7} {'risque':>7} {'escaladés':>10}")
+    for row in rows:
+        compliance = row.get_compliance()
+        print(f"  {row.unite_consulaire.nom[:40]:<40} {f'{compliance}%' if compliance is not None else '-':>7} "
+              f"{row.completed:>10} {row.open_overdue:>7} {row.open_at_risk:>7} {row.escalated:>10}")
+    return 0
+
+if __name__ == '__main__':
+    commands = {'sweep': run_sweep, 'rebuild': run_rebuild, 'status': show_status}
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print(__doc__)
+        sys.exit(1)
+    with app.app_context():
+        sys.exit(commands[sys.argv[1]]())
@@ -7,6 +7,9 @@ from app import app
 from backend.services.security_service import security_service
 from backend.services.backup_service import backup_service
 from backend.services.update_service import update_service
+from backend.services.audit_archive_service import audit_archive_service
+from backend.services.notification_retention_service import notification_retention_service
+from backend.services.status_service import status_service
 import schedule
 import threading
 import time
@@ -30,11 +33,21 @@ def initialize_security_system():
         update_service.schedule_automatic_updates(check_frequency_hours=24)
         app.logger.info('✓ Vérifications de mise à jour programmées')
         
-        # 4. Démarrer le scheduler en arrière-plan
+        # 4. Programmer la bascule et l'archivage du journal d'audit
+        audit_archive_service.schedule_maintenance()
+        app.logger.info('✓ Maintenance du journal d\'audit programmée')
+        notification_retention_service.schedule_maintenance()
+        app.logger.info('✓ Rétention des notifications programmée')
+        
+        # 5. Programmer la collecte du statut système (Git, sauvegardes, chiffrement)
+        status_service.schedule_status_refresh()
+        app.logger.info('✓ Collecte du statut système programmée')
+        
+        # 6. Démarrer le scheduler en arrière-plan
         start_scheduler()
         app.logger.info('✓ Scheduler automatique démarré')
         
-        # 5. Créer la première sauvegarde si nécessaire
+        # 7. Créer la première sauvegarde si nécessaire
         backups = backup_service.list_backups()
         if len(backups) == 0:
             app.logger.info('Création de la première sauvegarde système...')
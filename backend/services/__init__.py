@@ -1,5 +1,32 @@
+from .audit_service import audit_service, AuditService
+from .audit_archive_service import audit_archive_service, AuditArchiveService
+from .assignment_service import assignment_service, AssignmentService
+from .bootstrap_service import bootstrap_service, BootstrapService
+from .claim_service import claim_service, ClaimService
 from .email_service import email_service, EmailService
+from .event_service import event_service, EventService
+from .export_service import export_service, ExportService
+from .key_rotation_service import key_rotation_service, KeyRotationService
+from .notification_counter_service import notification_counter_service, NotificationCounterService
+from .notification_retention_service import notification_retention_service, NotificationRetentionService
 from .notification_service import NotificationService
+from .password_service import password_service, PasswordService
+from .reporting_service import reporting_service, ReportingService
 from .security_service import security_service, SecurityService
+from .sla_service import sla_service, SlaService
+from .status_service import status_service, SystemStatusService
+from .tracking_service import tracking_service, TrackingService
 
-__all__ = ['email_service', 'EmailService', 'NotificationService', 'security_service', 'SecurityService']
+__all__ = ['audit_service', 'AuditService', 'audit_archive_service', 'AuditArchiveService',
+           'assignment_service', 'AssignmentService',
+           'bootstrap_service', 'BootstrapService', 'claim_service', 'ClaimService',
+           'email_service', 'EmailService', 'event_service', 'EventService',
+           'export_service', 'ExportService',
+           'key_rotation_service', 'KeyRotationService',
+           'notification_counter_service', 'NotificationCounterService',
+           'notification_retention_service', 'NotificationRetentionService',
+           'NotificationService', 'password_service', 'PasswordService',
+           'reporting_service', 'ReportingService',
+           'security_service', 'SecurityService', 'sla_service', 'SlaService',
+           'status_service', 'SystemStatusService',
+           'tracking_service', 'TrackingService']
@@ -0,0 +1,261 @@
+# Service d'attribution automatique des demandes soumises aux agents de l'unité
+# À chaque tour, les demandes en attente d'une unité sont prises par échéance croissante
+# et confiées à l'agent compétent le moins chargé. L'attribution passe par claim_service:
+# face à une prise en charge manuelle simultanée, un seul des deux l'emporte.
+import os
+import heapq
+import threading
+import time
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou inter-processus
+    fcntl = None
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Set
+from sqlalchemy import func, select
+from app import app, db
+from backend.models import User, Application, Service, AgentCompetence
+from .claim_service import claim_service
+from .notification_service import NotificationService
+from .sla_service import sla_service, DEFAULT_DELAI_DAYS
+
+class UnitBalancer:
+    """Charge des agents d'une unité, un tas binaire par type de service
+
+    Priorité d'un agent pour un service: sa charge, majorée de skill_penalty s'il a
+    déclaré des compétences qui n'incluent pas ce service (un agent sans compétence
+    déclarée traite tout sans pénalité); à égalité, le spécialiste passe en premier.
+    Un agent au maximum sort des tas. Une entrée dont la version ne correspond plus
+    à celle de l'agent est périmée et écartée au retrait: acquire() et release()
+    coûtent O(k log n), k étant le nombre de types de service déjà rencontrés.
+    """
+
+    def __init__(self, loads: Dict[int, int], skills: Dict[int, Set[str]], max_load: int, skill_penalty: int = 2):
+        self.loads = dict(loads)
+        self.skills = skills
+        self.max_load = max_load
+        self.skill_penalty = skill_penalty
+        self.versions = dict.fromkeys(self.loads, 0)
+        self.heaps = {}
+        self.full = sum(1 for load in self.loads.values() if load >= max_load)
+
+    def _heap(self, service_type):
+        heap = self.heaps.get(service_type)
+        if heap is None:
+            heap = [self._entry(a, service_type) for a, load in self.loads.items() if load < self.max_load]
+            heapq.heapify(heap)
+            self.heaps[service_type] = heap
+        return heap
+
+    def _entry(self, agent_id, service_type):
+        skills = self.skills.get(agent_id)
+        if not skills:
+            priority, rank = self.loads[agent_id], 1
+        elif service_type in skills:
+            priority, rank = self.loads[agent_id], 0
+        else:
+            priority, rank = self.loads[agent_id] + self.skill_penalty, 2
+        return (priority, rank, agent_id, self.versions[agent_id])
+
+    def _set_load(self, agent_id, load):
+        self.full += (load >= self.max_load) - (self.loads[agent_id] >= self.max_load)
+        self.loads[agent_id] = load
+        self.versions[agent_id] += 1
+        if load < self.max_load:
+            for service_type, heap in self.heaps.items():
+                heapq.heappush(heap, self._entry(agent_id, service_type))
+
+    def acquire(self, service_type) -> Optional[int]:
+        """Agent prioritaire pour ce service (charge + 1), None si tous sont au maximum"""
+        heap = self._heap(service_type)
+        while heap:
+            _, _, agent_id, version = heapq.heappop(heap)
+            if version == self.versions[agent_id]:
+                self._set_load(agent_id, self.loads[agent_id] + 1)
+                return agent_id
+        return None
+
+    def release(self, agent_id):
+        """Annuler une attribution (demande prise entre-temps par un autre agent)"""
+        self._set_load(agent_id, max(0, self.loads[agent_id] - 1))
+
+    def saturated(self) -> bool:
+        return self.full == len(self.loads)
+
+class AssignmentService:
+    def __init__(self):
+        self.enabled = os.environ.get('AUTO_ASSIGNMENT', '').lower() in ['true', '1', 'yes']
+        self.interval = float(os.environ.get('AUTO_ASSIGNMENT_INTERVAL', 60))
+        # Demandes en traitement au-delà desquelles un agent ne reçoit plus rien
+        self.max_load = int(os.environ.get('AUTO_ASSIGNMENT_MAX_LOAD', 5))
+        self.batch_size = int(os.environ.get('AUTO_ASSIGNMENT_BATCH', 200))
+        # Charge équivalente ajoutée quand un service est hors des compétences de l'agent
+        self.skill_penalty = int(os.environ.get('AUTO_ASSIGNMENT_SKILL_PENALTY', 2))
+        self.lock_file = os.environ.get('AUTO_ASSIGNMENT_LOCK',
+                                        os.path.join(app.instance_path, 'assignment.lock'))
+        self._reset()
+
+    def _reset(self):
+        # Un planificateur par processus (les workers gunicorn sont forkés)
+        self._pid = os.getpid()
+        self._worker = None
+        self._wakeup = threading.Event()
+        self._pending_lock = threading.Lock()
+        self._pending_units = set()
+        self.last_round = None
+
+    def notify_submission(self, application):
+        """Demande soumise: tour d'attribution immédiat pour son unité"""
+        if not self.enabled:
+            return
+        self.ensure_running()
+        with self._pending_lock:
+            self._pending_units.add(application.unite_consulaire_id)
+        self._wakeup.set()
+
+    def ensure_running(self):
+        if not self.enabled:
+            return
+        if self._pid != os.getpid():
+            self._reset()
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._run_scheduler, name='assignment-scheduler', daemon=True)
+        self._worker.start()
+
+    def _run_scheduler(self):
+        pid = os.getpid()
+        last_full_round = time.monotonic()
+        while self._pid == pid:
+            self._wakeup.wait(max(0, self.interval - (time.monotonic() - last_full_round)))
+            self._wakeup.clear()
+            with self._pending_lock:
+                unit_ids, self._pending_units = self._pending_units, set()
+            # Tour complet à chaque intervalle, sinon seulement les unités ayant reçu une demande
+            if time.monotonic() - last_full_round >= self.interval:
+                unit_ids = None
+                last_full_round = time.monotonic()
+            try:
+                with app.app_context():
+                    self.run_round(unit_ids)
+            except Exception as e:
+                app.logger.error(f'Erreur attribution automatique des demandes: {e}')
+
+    @contextmanager
+    def _round_lock(self):
+        # Un seul tour à la fois entre les workers: pas d'équilibrage sur des charges périmées
+        os.makedirs(os.path.dirname(self.lock_file), exist_ok=True)
+        with open(self.lock_file, 'a') as handle:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def run_round(self, unit_ids: Optional[Iterable[int]] = None) -> Dict[str, any]:
+        """Attribuer les demandes en attente des unités indiquées (toutes par défaut)"""
+        start = time.perf_counter()
+        summary = {'units': 0, 'assigned': 0, 'waiting': 0}
+        with self._round_lock():
+            if unit_ids is None:
+                unit_ids = db.session.execute(
+                    select(Application.unite_consulaire_id).where(Application.status == 'soumise').distinct()
+                ).scalars().all()
+                db.session.commit()
+            for unit_id in sorted(unit_ids):
+                result = self.assign_unit(unit_id)
+                summary['units'] += 1
+                summary['assigned'] += result['assigned']
+                summary['waiting'] += result['waiting']
+        summary['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        summary['finished_at'] = datetime.utcnow().isoformat()
+        self.last_round = summary
+        if summary['assigned']:
+            app.logger.info(f"Attribution automatique: {summary['assigned']} demandes, "
+                            f"{summary['waiting']} en attente ({summary['duration_ms']} ms)")
+        return summary
+
+    def assign_unit(self, unit_id: int) -> Dict[str, int]:
+        """Un tour d'attribution pour une unité"""
+        agents = {agent.id: agent for agent in db.session.execute(select(User).where(
+            User.unite_consulaire_id == unit_id,
+            User.role == 'agent',
+            User.active == True
+        )).scalars()}
+        pending = db.session.execute(select(Application.id, Application.service_type, Application.created_at,
+                                            Application.due_at).where(
+            Application.unite_consulaire_id == unit_id,
+            Application.status == 'soumise'
+        )).all()
+        if not agents or not pending:
+            db.session.commit()
+            return {'assigned': 0, 'waiting': len(pending)}
+
+        balancer = UnitBalancer(self._loads(agents), self._skills(agents), self.max_load, self.skill_penalty)
+        delays = sla_service.unit_delays(unit_id)
+        # Les agents détachés restent lisibles après les commits de claim_service
+        for agent in agents.values():
+            db.session.expunge(agent)
+        db.session.commit()
+
+        # Échéance SLA de la demande; calculée ici pour les demandes qui n'en ont pas encore
+        queue = [(due_at or created_at + timedelta(days=delays.get(service_type, DEFAULT_DELAI_DAYS)),
+                  application_id, service_type)
+                 for application_id, service_type, created_at, due_at in pending]
+        heapq.heapify(queue)
+
+        assigned = []
+        while queue and len(assigned) < self.batch_size and not balancer.saturated():
+            due_at, application_id, service_type = heapq.heappop(queue)
+            agent_id = balancer.acquire(service_type)
+            if agent_id is None:
+                continue
+            agent = agents[agent_id]
+            application = claim_service.claim(application_id, agent,
+                                              comment=f'Demande attribuée automatiquement à {agent.get_full_name()}')
+            if application is None:
+                balancer.release(agent_id)
+                continue
+            assigned.append((agent_id, application.id, application.reference_number, due_at))
+
+        # Notifications en fin de tour: un claim refusé annule la transaction en cours
+        for agent_id, application_id, reference_number, due_at in assigned:
+            NotificationService.create_notification(
+                user_id=agent_id,
+                type_notification='demande_attribuee',
+                title=f'Demande attribuée: {reference_number}',
+                message=f'Demande {reference_number} à traiter avant le {due_at.strftime("%d/%m/%Y")}',
+                reference_id=application_id
+            )
+        db.session.commit()
+        return {'assigned': len(assigned), 'waiting': len(pending) - len(assigned)}
+
+    def _loads(self, agents) -> Dict[int, int]:
+        loads = dict.fromkeys(agents, 0)
+        loads.update(db.session.execute(
+            select(Application.processed_by, func.count()).where(
+                Application.processed_by.in_(list(agents)),
+                Application.status == 'en_traitement'
+            ).group_by(Application.processed_by)
+        ).all())
+        return loads
+
+    def _skills(self, agents) -> Dict[int, Set[str]]:
+        skills = {}
+        for agent_id, code in db.session.execute(
+            select(AgentCompetence.agent_id, Service.code)
+            .join(Service, Service.id == AgentCompetence.service_id)
+            .where(AgentCompetence.agent_id.in_(list(agents)))
+        ):
+            skills.setdefault(agent_id, set()).add(code)
+        return skills
+
+# Instance globale du service d'attribution
+assignment_service = AssignmentService()
+
+@app.before_request
+def start_assignment_scheduler():
+    assignment_service.ensure_running()
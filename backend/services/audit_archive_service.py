@@ -0,0 +1,252 @@
+# Service de partitionnement, rétention et archivage du journal d'audit
+# La table audit_log ne garde que les mois récents; les mois plus anciens sont
+# déplacés dans des tables par période (audit_log_YYYYMM), puis archivés en
+# fichiers JSONL compressés au-delà de la durée de rétention.
+import os
+import re
+import json
+import gzip
+import heapq
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import MetaData, Table, Column, Index, select, insert, delete, func, inspect
+from app import app, db
+from backend.models import AuditLog
+from .audit_service import audit_service
+
+PARTITION_PATTERN = re.compile(r'^audit_log_(\d{4})(\d{2})$')
+ARCHIVE_PATTERN = re.compile(r'^audit_log_(\d{4})(\d{2})\.jsonl\.gz$')
+
+def action_prefix_filter(column, prefix):
+    """Filtre par préfixe utilisable par un index (remplace LIKE 'prefix%')"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return db.and_(column >= prefix, column < upper)
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+class AuditArchiveService:
+    def __init__(self):
+        self.hot_months = int(os.environ.get('AUDIT_HOT_MONTHS', 3))
+        self.retention_months = int(os.environ.get('AUDIT_RETENTION_MONTHS', 24))
+        self.archive_dir = os.environ.get('AUDIT_ARCHIVE_DIR', os.path.join('archives', 'audit'))
+        # Lignes déplacées par transaction: verrous et transaction bornés quel que soit le mois
+        self.batch_size = int(os.environ.get('AUDIT_ROLLOVER_BATCH_SIZE', 5000))
+        self.metadata = MetaData()
+
+    def partition_name(self, period):
+        return f'audit_log_{period.year:04d}{period.month:02d}'
+
+    def partition_table(self, period):
+        """Table d'une période (même colonnes qu'audit_log, sans clé étrangère)"""
+        name = self.partition_name(period)
+        if name in self.metadata.tables:
+            return self.metadata.tables[name]
+        columns = [Column(c.name, c.type, primary_key=c.primary_key) for c in AuditLog.__table__.columns]
+        return Table(name, self.metadata, *columns,
+                     Index(f'ix_{name}_created_at', 'created_at'),
+                     Index(f'ix_{name}_action_created_at', 'action', 'created_at'))
+
+    def ensure_indexes(self):
+        """Créer les index de la table chaude sur une base existante"""
+        for index in AuditLog.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+
+    def list_partitions(self) -> List[datetime]:
+        periods = []
+        for name in inspect(db.engine).get_table_names():
+            match = PARTITION_PATTERN.match(name)
+            if match:
+                periods.append(datetime(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(periods)
+
+    def list_archives(self) -> List[Dict[str, any]]:
+        archives = []
+        if not os.path.isdir(self.archive_dir):
+            return archives
+        for filename in os.listdir(self.archive_dir):
+            match = ARCHIVE_PATTERN.match(filename)
+            if match:
+                path = os.path.join(self.archive_dir, filename)
+                archives.append({
+                    'period': datetime(int(match.group(1)), int(match.group(2)), 1),
+                    'filename': filename,
+                    'path': path,
+                    'size_mb': round(os.path.getsize(path) / (1024 * 1024), 2)
+                })
+        return sorted(archives, key=lambda a: a['period'])
+
+    def rollover(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Déplacer les mois sortis de la fenêtre chaude vers leurs tables de période"""
+        cutoff = add_months(month_start(now or datetime.utcnow()), -self.hot_months + 1)
+        hot = AuditLog.__table__
+        moved = {}
+        self.ensure_indexes()
+
+        oldest = db.session.execute(select(func.min(hot.c.created_at)).where(hot.c.created_at < cutoff)).scalar()
+        db.session.commit()
+        if oldest is None:
+            return moved
+
+        columns = [c.name for c in hot.columns]
+        period = month_start(oldest)
+        while period < cutoff:
+            upper = add_months(period, 1)
+            table = self.partition_table(period)
+            window = db.and_(hot.c.created_at >= period, hot.c.created_at < upper)
+            count = 0
+            while True:
+                # Un lot par transaction: copie puis suppression des mêmes id
+                with db.engine.begin() as connection:
+                    ids = connection.execute(
+                        select(hot.c.id).where(window).order_by(hot.c.id).limit(self.batch_size)
+                    ).scalars().all()
+                    if not ids:
+                        break
+                    if not count:
+                        table.create(connection, checkfirst=True)
+                    connection.execute(insert(table).from_select(
+                        columns, select(*[hot.c[name] for name in columns]).where(hot.c.id.in_(ids))
+                    ))
+                    connection.execute(delete(hot).where(hot.c.id.in_(ids)))
+                count += len(ids)
+            if count:
+                moved[table.name] = count
+                app.logger.info(f'Journal d\'audit: {count} lignes déplacées vers {table.name}')
+            period = upper
+        return moved
+
+    def archive_expired(self, now: Optional[datetime] = None) -> List[str]:
+        """Archiver puis supprimer les tables de période au-delà de la rétention"""
+        cutoff = add_months(month_start(now or datetime.utcnow()), -self.retention_months)
+        archived = []
+        for period in self.list_partitions():
+            if period >= cutoff:
+                break
+            archived.append(self._archive_partition(period))
+        return archived
+
+    def _archive_partition(self, period):
+        table = self.partition_table(period)
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f'{table.name}.jsonl.gz')
+        tmp_path = path + '.tmp'
+
+        with db.engine.connect() as connection:
+            rows = connection.execution_options(stream_results=True)\
+                .execute(select(table).order_by(table.c.created_at))
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as archive:
+                for row in rows.mappings():
+                    record = dict(row)
+                    if record['created_at']:
+                        record['created_at'] = record['created_at'].isoformat()
+                    archive.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, path)
+
+        with db.engine.begin() as connection:
+            table.drop(connection)
+        self.metadata.remove(table)
+        app.logger.info(f'Journal d\'audit: {table.name} archivée dans {path}')
+        return path
+
+    def query(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              action_prefix: Optional[str] = None, user_id: Optional[int] = None,
+              limit: int = 100, include_archives: bool = False) -> List[Dict[str, any]]:
+        """Rechercher dans le journal en ne lisant que les périodes concernées
+
+        La table chaude est toujours interrogée; les tables de période et
+        (sur demande) les archives ne le sont que si leur mois recoupe
+        l'intervalle [start, end).
+        """
+        def overlaps(period):
+            upper = add_months(period, 1)
+            return (start is None or upper > start) and (end is None or period < end)
+
+        sources = [self._query_table(AuditLog.__table__, start, end, action_prefix, user_id, limit)]
+        for period in self.list_partitions():
+            if overlaps(period):
+                sources.append(self._query_table(self.partition_table(period), start, end,
+                                                 action_prefix, user_id, limit))
+        if include_archives:
+            for archive in self.list_archives():
+                if overlaps(archive['period']):
+                    sources.append(self._query_archive(archive['path'], start, end,
+                                                       action_prefix, user_id, limit))
+
+        rows = heapq.merge(*sources, key=lambda r: r['created_at'] or datetime.min, reverse=True)
+        return [row for _, row in zip(range(limit), rows)]
+
+    def _query_table(self, table, start, end, action_prefix, user_id, limit):
+        stmt = select(table)
+        if start is not None:
+            stmt = stmt.where(table.c.created_at >= start)
+        if end is not None:
+            stmt = stmt.where(table.c.created_at < end)
+        if action_prefix:
+            stmt = stmt.where(action_prefix_filter(table.c.action, action_prefix))
+        if user_id is not None:
+            stmt = stmt.where(table.c.user_id == user_id)
+        stmt = stmt.order_by(table.c.created_at.desc()).limit(limit)
+        return [dict(row) for row in db.session.execute(stmt).mappings()]
+
+    def _query_archive(self, path, start, end, action_prefix, user_id, limit):
+        matches = []
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                record = json.loads(line)
+                if record['created_at']:
+                    record['created_at'] = datetime.fromisoformat(record['created_at'])
+                created_at = record['created_at']
+                if start is not None and (created_at is None or created_at < start):
+                    continue
+                if end is not None and (created_at is None or created_at >= end):
+                    continue
+                if action_prefix and not (record['action'] or '').startswith(action_prefix):
+                    continue
+                if user_id is not None and record['user_id'] != user_id:
+                    continue
+                matches.append(record)
+        matches.sort(key=lambda r: r['created_at'] or datetime.min, reverse=True)
+        return matches[:limit]
+
+    def run_maintenance(self, now: Optional[datetime] = None) -> Dict[str, any]:
+        """Bascule mensuelle puis archivage des périodes expirées"""
+        result = {'success': False, 'moved': {}, 'archived': []}
+        try:
+            audit_service.flush()
+            result['moved'] = self.rollover(now)
+            result['archived'] = self.archive_expired(now)
+            result['success'] = True
+
+            audit_service.record(
+                user_id=None,
+                action='system_audit_maintenance',
+                resource='system',
+                resource_id=None,
+                details=f'Lignes déplacées: {sum(result["moved"].values())}, '
+                        f'périodes archivées: {len(result["archived"])}',
+                sync=True
+            )
+        except Exception as e:
+            db.session.rollback()
+            result['error'] = str(e)
+            app.logger.error(f'Erreur maintenance journal d\'audit: {e}')
+        return result
+
+    def schedule_maintenance(self):
+        """Programmer la maintenance quotidienne du journal (sans effet hors changement de mois)"""
+        import schedule
+
+        schedule.every().day.at("03:30").do(self._scheduled_maintenance)
+        app.logger.info('Maintenance du journal d\'audit programmée')
+
+    def _scheduled_maintenance(self):
+        with app.app_context():
+            self.run_maintenance()
+
+# Instance globale du service d'archivage du journal d'audit
+audit_archive_service = AuditArchiveService()
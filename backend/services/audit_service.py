@@ -0,0 +1,139 @@
+# Service d'audit: journalisation bufferisée et insertion par lots
+# Les événements sont accumulés dans une file bornée puis écrits en insertions multi-lignes
+import os
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+from flask import has_app_context, has_request_context, request
+from sqlalchemy import insert
+from app import app, db
+from backend.models import AuditLog
+
+class AuditService:
+    def __init__(self):
+        self.batch_size = int(os.environ.get('AUDIT_BATCH_SIZE', 200))
+        self.queue_size = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+        self.flush_interval = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 2.0))
+        self.enqueue_timeout = float(os.environ.get('AUDIT_ENQUEUE_TIMEOUT', 0.05))
+        self._reset()
+
+    def _reset(self):
+        # Une file et un thread par processus (les workers gunicorn sont forkés)
+        self.buffer = queue.Queue(maxsize=self.queue_size)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = os.getpid()
+        self._flusher = None
+        self._last_flush = time.monotonic()
+
+    def record(self, user_id, action, resource=None, resource_id=None, details=None, sync=False):
+        """Enregistrer un événement d'audit
+
+        sync=True écrit immédiatement (événements critiques) et lève l'exception
+        si l'écriture échoue; sinon l'événement est mis en file et écrit par lot
+        au teardown de la requête ou par le thread d'écriture en arrière-plan.
+        """
+        try:
+            event = {
+                'user_id': user_id,
+                'action': action,
+                'resource': resource,
+                'resource_id': resource_id,
+                'details': details,
+                'ip_address': request.remote_addr if has_request_context() else None,
+                'user_agent': request.headers.get('User-Agent') if has_request_context() else None,
+                'created_at': datetime.utcnow()
+            }
+
+            if sync:
+                # Connexion propre: la session de l'appelant (travail en cours) n'est pas validée
+                self._write([event], raise_errors=True)
+                return
+
+            if self._pid != os.getpid():
+                self._reset()
+            self._ensure_flusher()
+
+            try:
+                self.buffer.put(event, timeout=self.enqueue_timeout)
+            except queue.Full:
+                # Contre-pression: le producteur vide lui-même la file
+                self.flush()
+                try:
+                    self.buffer.put_nowait(event)
+                except queue.Full:
+                    self._write([event])
+
+            if self.buffer.qsize() >= self.batch_size:
+                self._wakeup.set()
+        except Exception as e:
+            if sync:
+                raise
+            app.logger.error(f"Error logging audit: {e}")
+
+    def flush(self):
+        """Vider la file par lots de batch_size lignes"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.buffer.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    break
+                self._write(batch)
+                written += len(batch)
+            self._last_flush = time.monotonic()
+        return written
+
+    def flush_if_due(self):
+        """Vider la file si un lot est plein ou si l'intervalle est écoulé"""
+        if self._pid != os.getpid() or self.buffer.empty():
+            return 0
+        if self.buffer.qsize() >= self.batch_size or \
+                time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+        return 0
+
+    def _write(self, events, raise_errors=False):
+        try:
+            if has_app_context():
+                self._insert(events)
+            else:
+                with app.app_context():
+                    self._insert(events)
+        except Exception:
+            app.logger.exception(f'Erreur écriture journal d\'audit ({len(events)} événements)')
+            if raise_errors:
+                raise
+
+    def _insert(self, events):
+        with db.engine.begin() as connection:
+            connection.execute(insert(AuditLog.__table__), events)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._flusher = threading.Thread(target=self._run_flusher, name='audit-flusher', daemon=True)
+        self._flusher.start()
+
+    def _run_flusher(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+# Instance globale du service d'audit
+audit_service = AuditService()
+
+@app.teardown_request
+def flush_audit_buffer(exception=None):
+    audit_service.flush_if_due()
+
+atexit.register(audit_service.flush)
@@ -4,17 +4,18 @@ import shutil
 import subprocess
 import json
 import zipfile
-import schedule
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from app import app, db
-from models import AuditLog
+from backend.models import AuditLog
+from .audit_service import audit_service
 
 class BackupService:
     def __init__(self):
         self.backup_dir = 'backups'
         self.max_backups = 30  # Conserver 30 sauvegardes
+        self._backups_cache = None  # (mtime du répertoire, sauvegardes)
         self.ensure_backup_directory()
         
     def ensure_backup_directory(self):
@@ -69,12 +70,13 @@ class BackupService:
             result['success'] = True
             
             # Logger l'événement
-            AuditLog.log_action(
+            audit_service.record(
                 user_id=None,
                 action='system_backup_created',
-                table_name='system',
-                record_id=None,
-                details=f'Sauvegarde créée: {backup_name} ({result["size_mb"]} MB)'
+                resource='system',
+                resource_id=None,
+                details=f'Sauvegarde créée: {backup_name} ({result["size_mb"]} MB)',
+                sync=True
             )
             
             app.logger.info(f'Sauvegarde créée avec succès: {backup_name}')
@@ -183,7 +185,6 @@ class BackupService:
         
         try:
             # Récupérer les logs d'audit récents (30 derniers jours)
-            from models import AuditLog
             thirty_days_ago = datetime.now() - timedelta(days=30)
             recent_logs = AuditLog.query.filter(
                 AuditLog.created_at >= thirty_days_ago
@@ -196,8 +197,8 @@ class BackupService:
                         'id': log.id,
                         'user_id': log.user_id,
                         'action': log.action,
-                        'table_name': log.table_name,
-                        'record_id': log.record_id,
+                        'resource': log.resource,
+                        'resource_id': log.resource_id,
                         'details': log.details,
                         'ip_address': log.ip_address,
                         'user_agent': log.user_agent,
@@ -234,6 +235,12 @@ class BackupService:
         if not os.path.exists(self.backup_dir):
             return backups
         
+        # Le répertoire n'est relu que si son contenu a changé
+        dir_mtime = os.stat(self.backup_dir).st_mtime_ns
+        if self._backups_cache and self._backups_cache[0] == dir_mtime:
+            now = datetime.now()
+            return [dict(b, age_days=(now - b['date']).days) for b in self._backups_cache[1]]
+        
         for filename in os.listdir(self.backup_dir):
             if filename.startswith('backup_econsulaire_') and filename.endswith('.zip'):
                 backup_path = os.path.join(self.backup_dir, filename)
@@ -254,7 +261,9 @@ class BackupService:
                     'age_days': (datetime.now() - backup_date).days
                 })
         
-        return sorted(backups, key=lambda x: x['date'], reverse=True)
+        backups = sorted(backups, key=lambda x: x['date'], reverse=True)
+        self._backups_cache = (dir_mtime, backups)
+        return [dict(b) for b in backups]
     
     def restore_backup(self, backup_filename: str) -> Dict[str, any]:
         """Restaurer une sauvegarde"""
@@ -294,12 +303,13 @@ class BackupService:
             result['success'] = True
             
             # Logger l'événement
-            AuditLog.log_action(
+            audit_service.record(
                 user_id=None,
                 action='system_backup_restored',
-                table_name='system',
-                record_id=None,
-                details=f'Sauvegarde restaurée: {backup_filename}'
+                resource='system',
+                resource_id=None,
+                details=f'Sauvegarde restaurée: {backup_filename}',
+                sync=True
             )
             
         except Exception as e:
@@ -328,6 +338,8 @@ class BackupService:
     
     def schedule_automatic_backups(self):
         """Programmer les sauvegardes automatiques"""
+        import schedule
+
         # Sauvegarde quotidienne à 2h du matin
         schedule.every().day.at("02:00").do(self._daily_backup)
         
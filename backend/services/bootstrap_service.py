@@ -0,0 +1,291 @@
+# Service d'amorçage de la base (schéma et données initiales)
+# Le travail lourd (création des tables, services par défaut, données de démonstration)
+# n'est fait qu'une fois, sous verrou; chaque processus ne lit ensuite qu'une ligne de version.
+import os
+import time
+import socket
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from app import app, db
+from backend.models import SchemaVersion
+
+# Incrémenter SCHEMA_VERSION en ajoutant une étape à SCHEMA_STEPS,
+# SEED_VERSION quand les données initiales changent.
+SCHEMA_VERSION = 8
+SEED_VERSION = 1
+
+# Clé du verrou consultatif PostgreSQL (pg_advisory_lock)
+ADVISORY_LOCK_KEY = 7240351
+
+def _baseline_schema():
+    """Tables manquantes, index du journal d'audit, colonnes chiffrées élargies"""
+    from backend.services.audit_archive_service import audit_archive_service
+    from backend.services.key_rotation_service import key_rotation_service
+
+    db.create_all()
+    audit_archive_service.ensure_indexes()
+    key_rotation_service.prepare_schema()
+
+def _claim_queue():
+    """Référence de la demande sur les notifications, index de file d'attente des unités"""
+    from backend.models import Application, Notification
+
+    columns = {c['name'] for c in inspect(db.engine).get_columns('notification')}
+    with db.engine.begin() as connection:
+        if 'reference_id' not in columns:
+            connection.exec_driver_sql('ALTER TABLE notification ADD COLUMN reference_id INTEGER')
+        for table in (Notification.__table__, Application.__table__):
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+def _agent_competences():
+    """Compétences des agents par service (attribution automatique)"""
+    from backend.models import AgentCompetence
+
+    AgentCompetence.__table__.create(db.engine, checkfirst=True)
+
+def _sla_tracking():
+    """Échéances des demandes, index des retards, compteurs SLA par unité"""
+    from backend.models import Application, SlaUnitStats
+
+    columns = {c['name'] for c in inspect(db.engine).get_columns('application')}
+    with db.engine.begin() as connection:
+        for name in ('due_at', 'sla_paused_at', 'sla_met', 'escalated_at'):
+            if name not in columns:
+                column_type = Application.__table__.c[name].type.compile(dialect=db.engine.dialect)
+                connection.exec_driver_sql(f'ALTER TABLE application ADD COLUMN {name} {column_type}')
+        for index in Application.__table__.indexes:
+            index.create(connection, checkfirst=True)
+        SlaUnitStats.__table__.create(connection, checkfirst=True)
+
+def _sla_backfill():
+    """Échéances des demandes antérieures au suivi SLA, compteurs par unité"""
+    from backend.services.sla_service import sla_service
+
+    sla_service.backfill()
+
+def _notification_counters():
+    """Compteurs de notifications non lues par utilisateur"""
+    from backend.models import Notification, NotificationCounter
+    from backend.services.notification_counter_service import notification_counter_service
+
+    with db.engine.begin() as connection:
+        for index in Notification.__table__.indexes:
+            index.create(connection, checkfirst=True)
+        NotificationCounter.__table__.create(connection, checkfirst=True)
+    notification_counter_service.reconcile()
+
+def _notification_retention():
+    """Index de date des notifications (rétention par lots)"""
+    from backend.models import Notification
+
+    with db.engine.begin() as connection:
+        for index in Notification.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+def _reporting_rollups():
+    """Faits journaliers des rapports (tables vides, remplies au fil des changements)"""
+    from backend.models import ApplicationDailyStats, ApplicationDailyDuration
+
+    with db.engine.begin() as connection:
+        ApplicationDailyStats.__table__.create(connection, checkfirst=True)
+        ApplicationDailyDuration.__table__.create(connection, checkfirst=True)
+
+def _reporting_backfill():
+    """Faits de l'historique des statuts antérieur, sur tous les cœurs"""
+    from backend.services.reporting_service import reporting_service
+
+    reporting_service.backfill()
+
+def _tracking_snapshots():
+    """Instantanés de suivi public (créés pour chaque nouvelle demande)"""
+    from backend.models import TrackingSnapshot
+
+    TrackingSnapshot.__table__.create(db.engine, checkfirst=True)
+
+def _tracking_backfill():
+    """Instantanés des demandes antérieures au suivi public"""
+    from backend.services.tracking_service import tracking_service
+
+    tracking_service.backfill()
+
+SCHEMA_STEPS = [
+    (1, 'schéma initial', _baseline_schema),
+    (2, "file d'attente des demandes", _claim_queue),
+    (3, 'compétences des agents', _agent_competences),
+    (4, 'échéances de traitement (SLA)', _sla_tracking),
+    (5, 'compteurs de notifications', _notification_counters),
+    (6, 'rétention des notifications', _notification_retention),
+    (7, 'faits journaliers des rapports', _reporting_rollups),
+    (8, 'instantanés de suivi', _tracking_snapshots),
+]
+
+# Reprises de données des étapes: longues sur une base volumineuse, elles ne tournent
+# jamais à l'import dans un worker mais par python backend/scripts/bootstrap.py run
+# (après les étapes, verrou relâché) ou backfill; chacune peut être relancée
+DATA_BACKFILLS = [
+    (4, 'échéances SLA des demandes existantes', _sla_backfill),
+    (7, 'faits journaliers des rapports', _reporting_backfill),
+    (8, 'instantanés de suivi des demandes existantes', _tracking_backfill),
+]
+
+class BootstrapService:
+    def __init__(self):
+        self.auto = os.environ.get('BOOTSTRAP_ON_IMPORT', '1').lower() in ['true', '1', 'yes']
+        self.lock_file = os.environ.get('BOOTSTRAP_LOCK_FILE', os.path.join(app.instance_path, 'bootstrap.lock'))
+
+    def demo_requested(self) -> bool:
+        """Données de démonstration hors production, ou sur demande explicite (CREATE_DEMO_DATA)"""
+        create_demo = os.environ.get('CREATE_DEMO_DATA', '').lower() in ['true', '1', 'yes']
+        return create_demo or os.environ.get('FLASK_ENV') != 'production'
+
+    def current_state(self) -> Optional[SchemaVersion]:
+        """Ligne de version (None si la base n'a jamais été amorcée)"""
+        try:
+            state = db.session.execute(select(SchemaVersion).where(SchemaVersion.id == 1)).scalar_one_or_none()
+            db.session.commit()
+            return state
+        except (OperationalError, ProgrammingError):
+            db.session.rollback()
+            return None
+
+    def is_current(self, demo: Optional[bool] = None) -> bool:
+        demo = self.demo_requested() if demo is None else demo
+        state = self.current_state()
+        return (state is not None
+                and state.schema_version >= SCHEMA_VERSION
+                and state.seed_version >= SEED_VERSION
+                and (state.demo_data or not demo))
+
+    def ensure_bootstrapped(self) -> bool:
+        """Appelé à l'import de l'application: une seule lecture si la base est à jour"""
+        if self.is_current():
+            return False
+        if not self.auto:
+            app.logger.error('Base non amorcée ou obsolète: exécuter python backend/scripts/bootstrap.py run')
+            return False
+        return self.bootstrap() is not None
+
+    @contextmanager
+    def lock(self):
+        """Verrou exclusif entre processus: consultatif sur PostgreSQL, fichier sinon"""
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.connect() as connection:
+                # L'attente du verrou peut dépasser statement_timeout (profil PostgreSQL)
+                connection.execute(text("SELECT set_config('statement_timeout', '0', false)"))
+                connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+                # Verrou de session: la transaction se termine ici, sinon la connexion resterait
+                # « idle in transaction » pendant les étapes et serait coupée par
+                # idle_in_transaction_session_timeout, verrou libéré en cours d'amorçage
+                connection.commit()
+                try:
+                    yield
+                finally:
+                    connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': ADVISORY_LOCK_KEY})
+                    connection.execute(text('RESET statement_timeout'))
+                    connection.commit()
+            return
+
+        os.makedirs(os.path.dirname(self.lock_file) or '.', exist_ok=True)
+        with open(self.lock_file, 'a') as handle:
+            try:
+                import fcntl
+            except ImportError:  # Windows: pas de verrou inter-processus
+                fcntl = None
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def bootstrap(self, demo: Optional[bool] = None, force: bool = False,
+                  backfill: bool = False) -> Optional[Dict[str, any]]:
+        """Appliquer les étapes de schéma et les données initiales manquantes
+
+        Les reprises de données des étapes appliquées suivent, hors verrou, si backfill
+        (commande bootstrap.py run); sinon elles sont seulement signalées.
+        Retourne un résumé, ou None si un autre processus a déjà tout appliqué.
+        """
+        demo = self.demo_requested() if demo is None else demo
+        start = time.perf_counter()
+
+        with self.lock():
+            # Un autre processus a pu terminer pendant l'attente du verrou
+            state = self.current_state()
+            if not force and self.is_current(demo):
+                return None
+
+            from_schema = state.schema_version if state else 0
+            from_seed = state.seed_version if state else 0
+            for version, description, step in SCHEMA_STEPS:
+                if force or version > from_schema:
+                    app.logger.info(f'Schéma: étape {version} ({description})')
+                    step()
+
+            if force or from_seed < SEED_VERSION or (demo and not (state and state.demo_data)):
+                self._seed(demo)
+
+            state = db.session.get(SchemaVersion, 1) or SchemaVersion(id=1)
+            state.schema_version = SCHEMA_VERSION
+            state.seed_version = SEED_VERSION
+            state.demo_data = bool(demo or state.demo_data)
+            state.applied_at = datetime.utcnow()
+            state.applied_by = f'{socket.gethostname()}:{os.getpid()}'
+            db.session.add(state)
+            db.session.commit()
+
+        pending = [version for version, _, _ in DATA_BACKFILLS if force or version > from_schema]
+        summary = {
+            'schema': [from_schema, SCHEMA_VERSION],
+            'seed': [from_seed, SEED_VERSION],
+            'demo_data': state.demo_data,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 1)
+        }
+        app.logger.info(f'Amorçage de la base terminé: {summary}')
+        if backfill:
+            summary['backfills'] = self.run_backfills(pending)
+        elif pending:
+            app.logger.warning('Reprises de données en attente: python backend/scripts/bootstrap.py backfill')
+        return summary
+
+    def run_backfills(self, versions: Optional[List[int]] = None) -> List[Dict[str, any]]:
+        """Reprises de données des étapes (toutes par défaut), sans verrou d'amorçage"""
+        results = []
+        for version, description, backfill in DATA_BACKFILLS:
+            if versions is not None and version not in versions:
+                continue
+            app.logger.info(f'Reprise de données: étape {version} ({description})')
+            started = time.perf_counter()
+            backfill()
+            results.append({'version': version, 'description': description,
+                            'duration_ms': round((time.perf_counter() - started) * 1000, 1)})
+        return results
+
+    def _seed(self, demo: bool):
+        from app import (create_default_services, create_demo_users_and_data,
+                         configure_demo_services, create_demo_applications)
+
+        create_default_services()
+        if not demo:
+            app.logger.info('Données de démonstration non créées (production)')
+            return
+
+        # NEVER create demo users with weak passwords in production
+        if os.environ.get('FLASK_ENV') == 'production':
+            app.logger.warning('=' * 80)
+            app.logger.warning('WARNING: Creating demo data in production environment!')
+            app.logger.warning('Demo users have weak passwords. Change them immediately!')
+            app.logger.warning('=' * 80)
+
+        create_demo_users_and_data()
+        configure_demo_services()
+        create_demo_applications()
+        app.logger.info('Demo data creation completed')
+
+# Instance globale du service d'amorçage
+bootstrap_service = BootstrapService()
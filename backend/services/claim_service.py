@@ -0,0 +1,78 @@
+# Service de prise en charge des demandes par les agents
+# La prise en charge est un UPDATE conditionnel (status = 'soumise'): une seule
+# transaction peut réussir, sans lecture préalable ni verrou applicatif.
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, update
+from app import app, db
+from backend.models import Application, StatusHistory, Notification
+from .event_service import event_service, NOTIFICATIONS
+from .notification_counter_service import notification_counter_service
+
+class ClaimService:
+    def _claim_statement(self, agent, now):
+        return update(Application).where(
+            Application.status == 'soumise',
+            Application.unite_consulaire_id == agent.unite_consulaire_id
+        ).values(
+            status='en_traitement',
+            processed_by=agent.id,
+            updated_at=now
+        ).execution_options(synchronize_session=False)
+
+    def claim(self, application_id: int, agent, comment: Optional[str] = None) -> Optional[Application]:
+        """Prendre en charge une demande précise; None si elle n'est plus disponible"""
+        now = datetime.utcnow()
+        result = db.session.execute(self._claim_statement(agent, now).where(Application.id == application_id))
+        if result.rowcount != 1:
+            db.session.rollback()
+            return None
+        return self._record_claim(application_id, agent, now, comment)
+
+    def claim_next(self, agent) -> Optional[Application]:
+        """Prendre en charge la plus ancienne demande non attribuée de l'unité de l'agent
+
+        PostgreSQL: les lignes verrouillées par un autre agent sont sautées (SKIP LOCKED),
+        chaque agent obtient donc une demande différente sans attente. SQLite (3.35+ pour
+        RETURNING): FOR UPDATE est ignoré, l'UPDATE s'exécute sous le verrou d'écriture de la base.
+        """
+        now = datetime.utcnow()
+        oldest = select(Application.id).where(
+            Application.unite_consulaire_id == agent.unite_consulaire_id,
+            Application.status == 'soumise'
+        ).order_by(Application.created_at, Application.id).limit(1)
+
+        candidate = oldest.with_for_update(skip_locked=True).scalar_subquery()
+        application_id = db.session.execute(
+            self._claim_statement(agent, now).where(Application.id == candidate).returning(Application.id)
+        ).scalar()
+        if application_id is None:
+            db.session.rollback()
+            return None
+        return self._record_claim(application_id, agent, now, None)
+
+    def _record_claim(self, application_id, agent, now, comment):
+        """Historique et notification dans la transaction de la prise en charge"""
+        application = db.session.get(Application, application_id, populate_existing=True)
+        db.session.add(StatusHistory(
+            application_id=application_id,
+            old_status='soumise',
+            new_status='en_traitement',
+            changed_by=agent.id,
+            comment=comment or f'Demande prise en charge par {agent.get_full_name()}'
+        ))
+        # La notification « nouvelle demande » de l'agent n'a plus lieu d'être
+        read = db.session.execute(update(Notification).where(
+            Notification.user_id == agent.id,
+            Notification.type == 'nouvelle_demande',
+            Notification.reference_id == application_id,
+            Notification.is_read == False
+        ).values(is_read=True).execution_options(synchronize_session=False)).rowcount
+        notification_counter_service.adjust(agent.id, -read)
+        event_service.emit(NOTIFICATIONS, agent.id)
+        db.session.commit()
+        app.logger.info(f'Demande {application.reference_number} prise en charge par l\'agent {agent.id}')
+        return application
+
+# Instance globale du service de prise en charge
+claim_service = ClaimService()
@@ -1,8 +1,8 @@
 import os
 import sys
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Content
+import time
 from app import app
+from backend.utils.metrics import email_send_duration, email_failures
 
 class EmailService:
     def __init__(self):
@@ -11,15 +11,26 @@ class EmailService:
             app.logger.warning('SENDGRID_API_KEY non configurée')
             self.enabled = False
         else:
-            self.sg = SendGridAPIClient(self.sendgrid_key)
             self.enabled = True
+        self._sg = None
         self.from_email = 'noreply@econsulaire-rdc.com'
         self.from_name = 'e-Consulaire RDC'
+
+    @property
+    def sg(self):
+        # Client SendGrid créé (et le paquet importé) au premier envoi
+        if self._sg is None:
+            from sendgrid import SendGridAPIClient
+            self._sg = SendGridAPIClient(self.sendgrid_key)
+        return self._sg
     
     def send_email(self, to_email, subject, html_content, text_content=None):
         if not self.enabled:
             app.logger.warning(f'Email non envoyé (SendGrid désactivé): {to_email} - {subject}')
+            email_failures.inc(reason='disabled')
             return False
+        from sendgrid.helpers.mail import Mail, Email, To, Content
+        start = time.perf_counter()
         try:
             message = Mail(
                 from_email=Email(self.from_email, self.from_name),
@@ -31,9 +42,12 @@ class EmailService:
             elif text_content:
                 message.content = Content("text/plain", text_content)
             response = self.sg.send(message)
+            email_send_duration.observe(time.perf_counter() - start, outcome='success')
             app.logger.info(f'Email envoyé avec succès à {to_email}: {subject}')
             return True
         except Exception as e:
+            email_send_duration.observe(time.perf_counter() - start, outcome='error')
+            email_failures.inc(reason='error')
             app.logger.error(f'Erreur SendGrid: {e}')
             return False
     
@@ -0,0 +1,389 @@
+# Service d'événements en temps réel (Server-Sent Events) pour les agents
+# Les compteurs « notifications non lues » et « demandes en attente » sont poussés aux
+# navigateurs abonnés au lieu d'être interrogés. Les changements sont relevés au flush et
+# publiés après le commit vers tous les workers (LISTEN/NOTIFY sous PostgreSQL, sockets
+# Unix datagramme dans le répertoire d'instance sinon); chaque worker recalcule alors les
+# compteurs des seuls abonnés qu'il sert, une fois par rafale de changements.
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import select
+import atexit
+import threading
+from itertools import count
+from typing import Dict, Iterable, Optional, Set, Tuple
+from flask import Response, stream_with_context
+from sqlalchemy import event, func, inspect, select as sql_select, text
+from sqlalchemy.orm import Session
+from app import app, db
+from backend.models import Application, Notification, StatusHistory
+from .notification_counter_service import notification_counter_service
+
+# Canal PostgreSQL et taille maximale d'une charge utile NOTIFY (8000 octets)
+PG_CHANNEL = 'econsular_events'
+PG_PAYLOAD_LIMIT = 7500
+# Types d'événements: clé de canal -> nom de l'événement SSE
+NOTIFICATIONS = 'notifications'
+QUEUE = 'queue'
+
+class Subscription:
+    """File des messages SSE d'une connexion; en cas de retard, seul le dernier état compte"""
+
+    def __init__(self, channels, maxsize=50):
+        self.channels = tuple(channels)
+        self.messages = queue.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def put(self, message):
+        while True:
+            try:
+                self.messages.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self.messages.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+def worker_threads() -> Optional[int]:
+    """Threads par worker: SSE_WORKER_THREADS, sinon --threads de la commande gunicorn
+    (1 par défaut sous gunicorn); None hors gunicorn (serveur de dev: un thread par connexion)"""
+    if os.environ.get('SSE_WORKER_THREADS'):
+        return int(os.environ['SSE_WORKER_THREADS'])
+    args = sys.argv[1:] + os.environ.get('GUNICORN_CMD_ARGS', '').split()
+    for index, arg in enumerate(args):
+        if arg == '--threads' and index + 1 < len(args):
+            return int(args[index + 1])
+        if arg.startswith('--threads='):
+            return int(arg.split('=', 1)[1])
+    return 1 if 'gunicorn' in sys.argv[0] else None
+
+class EventService:
+    def __init__(self):
+        # auto: flux seulement sous un serveur multi-thread (gthread, serveur de dev);
+        # always / never pour forcer
+        self.streaming = os.environ.get('SSE_STREAMING', 'auto').lower()
+        self.heartbeat_seconds = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 25))
+        self.max_stream_seconds = float(os.environ.get('SSE_MAX_STREAM_SECONDS', 600))
+        self.retry_ms = int(os.environ.get('SSE_RETRY_MS', 5000))
+        # Chaque flux garde un thread jusqu'à SSE_MAX_STREAM_SECONDS: plafond par worker sous
+        # le nombre de threads, SSE_RESERVED_THREADS restant aux autres requêtes; au-delà,
+        # 503 et le navigateur interroge les API de comptage
+        self.reserved_threads = int(os.environ.get('SSE_RESERVED_THREADS', 2))
+        threads = worker_threads()
+        limit = max(threads - self.reserved_threads, 0) if threads is not None else None
+        if os.environ.get('SSE_MAX_STREAMS'):
+            configured = int(os.environ['SSE_MAX_STREAMS'])
+            limit = configured if limit is None else min(configured, limit)
+        self.max_streams = limit if limit is not None else 50
+        # Fenêtre de regroupement des changements avant recalcul des compteurs
+        self.coalesce_seconds = float(os.environ.get('SSE_COALESCE_MS', 200)) / 1000
+        self.transport = os.environ.get('EVENTS_TRANSPORT', 'auto').lower()
+        self.socket_dir = os.environ.get('EVENTS_SOCKET_DIR', os.path.join(app.instance_path, 'events'))
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Abonnés, file de réception et threads propres au processus (workers forkés)
+        self._pid = os.getpid()
+        self._subscribers: Dict[Tuple[str, int], Set[Subscription]] = {}
+        self._streams = 0
+        self._inbox = queue.Queue()
+        self._ids = count(1)
+        self._listener = None
+        self._dispatcher = None
+        self._sender = None
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _transport(self):
+        if self.transport != 'auto':
+            return self.transport
+        return 'postgres' if db.engine.dialect.name == 'postgresql' else 'socket'
+
+    # ---- Publication ----
+
+    def emit(self, kind: str, key: Optional[int], session=None):
+        """Signaler un changement de compteur, publié au commit de la transaction en cours"""
+        if key is None:
+            return
+        session = session or db.session
+        session.info.setdefault('live_events', set()).add((kind, key))
+
+    def collect_changes(self, session):
+        """Relever dans le flush les notifications et changements de statut concernés"""
+        for obj in session.new:
+            if isinstance(obj, Notification):
+                self.emit(NOTIFICATIONS, obj.user_id, session)
+            elif isinstance(obj, Application):
+                self.emit(QUEUE, obj.unite_consulaire_id, session)
+            elif isinstance(obj, StatusHistory):
+                application = session.get(Application, obj.application_id)
+                if application is not None:
+                    self.emit(QUEUE, application.unite_consulaire_id, session)
+        for obj in session.dirty:
+            if isinstance(obj, Notification):
+                if inspect(obj).attrs.is_read.history.has_changes():
+                    self.emit(NOTIFICATIONS, obj.user_id, session)
+            elif isinstance(obj, Application):
+                state = inspect(obj).attrs
+                if state.status.history.has_changes() or state.unite_consulaire_id.history.has_changes():
+                    for unit_id in set(state.unite_consulaire_id.history.sum()) | {obj.unite_consulaire_id}:
+                        self.emit(QUEUE, unit_id, session)
+        for obj in session.deleted:
+            if isinstance(obj, Application):
+                self.emit(QUEUE, obj.unite_consulaire_id, session)
+            elif isinstance(obj, Notification):
+                self.emit(NOTIFICATIONS, obj.user_id, session)
+
+    def discard(self, session):
+        session.info.pop('live_events', None)
+
+    def publish_committed(self, session):
+        events = session.info.pop('live_events', None)
+        if events:
+            self.publish(events)
+
+    def publish(self, events: Iterable[Tuple[str, int]]):
+        """Diffuser des changements à tous les workers; ne fait jamais échouer la requête"""
+        events = [list(item) for item in events]
+        try:
+            if self._transport() == 'postgres':
+                self._publish_postgres(events)
+            else:
+                self._publish_socket(events)
+        except Exception as e:
+            app.logger.warning(f'Publication des événements temps réel impossible: {e}')
+
+    def _publish_postgres(self, events):
+        payloads, chunk = [], []
+        for item in events:
+            chunk.append(item)
+            if len(json.dumps(chunk)) > PG_PAYLOAD_LIMIT:
+                payloads.append(chunk[:-1])
+                chunk = [item]
+        payloads.append(chunk)
+        with db.engine.connect() as connection:
+            for payload in payloads:
+                connection.execute(text('SELECT pg_notify(:channel, :payload)'),
+                                   {'channel': PG_CHANNEL, 'payload': json.dumps(payload)})
+            connection.commit()
+
+    def _publish_socket(self, events):
+        self._check_pid()
+        if not os.path.isdir(self.socket_dir):
+            return
+        if self._sender is None:
+            sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sender.setblocking(False)
+            self._sender = sender
+        payload = json.dumps(events).encode()
+        for name in os.listdir(self.socket_dir):
+            if not name.endswith('.sock'):
+                continue
+            path = os.path.join(self.socket_dir, name)
+            try:
+                self._sender.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker arrêté sans nettoyage
+                self._remove_socket(path)
+            except BlockingIOError:
+                # Tampon du destinataire plein: l'événement suivant rétablira l'état
+                app.logger.debug(f'Événements temps réel perdus pour {name}')
+
+    # ---- Abonnements ----
+
+    def streaming_available(self, environ) -> bool:
+        if self.streaming == 'never':
+            return False
+        if self.streaming == 'always':
+            return True
+        # Un worker synchrone resterait bloqué par la connexion pendant toute sa durée
+        return bool(environ.get('wsgi.multithread'))
+
+    def subscribe(self, channels) -> Optional[Subscription]:
+        with self._lock:
+            self._check_pid()
+            if self._streams >= self.max_streams:
+                return None
+            subscription = Subscription(channels)
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+            self._streams += 1
+        self.ensure_running()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+            self._streams -= 1
+
+    def format_event(self, kind: str, data) -> str:
+        return f'id: {next(self._ids)}\nevent: {kind}\ndata: {json.dumps(data)}\n\n'
+
+    def stream(self, channels, initial) -> Response:
+        """Réponse SSE: état initial, puis changements et battements de cœur jusqu'à
+        SSE_MAX_STREAM_SECONDS; le navigateur se reconnecte et reçoit de nouveau l'état
+        complet, il n'y a donc rien à rejouer d'après Last-Event-ID"""
+        # La connexion à la base n'est pas gardée pendant la durée du flux
+        db.session.close()
+        subscription = self.subscribe(channels)
+        if subscription is None:
+            return Response('Trop de connexions temps réel\n', status=503,
+                            headers={'Retry-After': str(self.retry_ms // 1000)})
+
+        def generate():
+            yield f'retry: {self.retry_ms}\n\n'
+            for kind, data in initial:
+                yield self.format_event(kind, data)
+            deadline = time.monotonic() + self.max_stream_seconds
+            while (remaining := deadline - time.monotonic()) > 0:
+                message = subscription.get(min(self.heartbeat_seconds, remaining))
+                yield message if message is not None else ': heartbeat\n\n'
+
+        response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            # Pas de mise en tampon par nginx
+            'X-Accel-Buffering': 'no',
+        })
+        # Fin du flux ou déconnexion du navigateur, y compris avant le premier message
+        response.call_on_close(lambda: self.unsubscribe(subscription))
+        return response
+
+    # ---- Réception et diffusion locale ----
+
+    def ensure_running(self):
+        self._check_pid()
+        with self._lock:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(target=self._run_dispatcher, name='sse-dispatcher', daemon=True)
+                self._dispatcher.start()
+            if self._listener is None or not self._listener.is_alive():
+                target = self._listen_postgres if self._transport() == 'postgres' else self._listen_socket
+                self._listener = threading.Thread(target=target, name='sse-listener', daemon=True)
+                self._listener.start()
+
+    def _listen_socket(self):
+        pid = os.getpid()
+        os.makedirs(self.socket_dir, exist_ok=True)
+        path = os.path.join(self.socket_dir, f'{pid}.sock')
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        if os.path.exists(path):
+            os.unlink(path)
+        receiver.bind(path)
+        atexit.register(self._remove_socket, path)
+        try:
+            while self._pid == pid:
+                payload = receiver.recv(65536)
+                try:
+                    self._inbox.put(json.loads(payload))
+                except ValueError:
+                    continue
+        finally:
+            receiver.close()
+
+    @staticmethod
+    def _remove_socket(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def _listen_postgres(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            try:
+                # Connexion dédiée, retirée du pool: elle reste en écoute
+                with app.app_context():
+                    connection = db.engine.raw_connection()
+                connection.detach()
+                driver = connection.driver_connection
+                driver.autocommit = True
+                try:
+                    driver.cursor().execute(f'LISTEN {PG_CHANNEL}')
+                    while self._pid == pid:
+                        if select.select([driver], [], [], self.heartbeat_seconds) == ([], [], []):
+                            continue
+                        driver.poll()
+                        while driver.notifies:
+                            notify = driver.notifies.pop(0)
+                            self._inbox.put(json.loads(notify.payload))
+                finally:
+                    connection.close()
+            except Exception as e:
+                app.logger.warning(f'Écoute des événements PostgreSQL interrompue: {e}')
+                time.sleep(5)
+
+    def _run_dispatcher(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            events = set(map(tuple, self._inbox.get()))
+            # Une rafale (tour d'attribution, lot d'escalades) donne un seul recalcul
+            deadline = time.monotonic() + self.coalesce_seconds
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    events.update(map(tuple, self._inbox.get(timeout=remaining)))
+                except queue.Empty:
+                    break
+            try:
+                self._dispatch(events)
+            except Exception as e:
+                app.logger.error(f'Erreur diffusion des événements temps réel: {e}')
+
+    def _dispatch(self, events):
+        with self._lock:
+            wanted = {(kind, key) for kind, key in events if (kind, key) in self._subscribers}
+        if not wanted:
+            return
+        user_ids = [key for kind, key in wanted if kind == NOTIFICATIONS]
+        unit_ids = [key for kind, key in wanted if kind == QUEUE]
+        counts = {}
+        with app.app_context():
+            if user_ids:
+                counts.update(((NOTIFICATIONS, user_id), total) for user_id, total
+                              in notification_counter_service.unread_many(user_ids).items())
+            if unit_ids:
+                counts.update(((QUEUE, unit_id), total) for unit_id, total in db.session.execute(
+                    sql_select(Application.unite_consulaire_id, func.count())
+                    .where(Application.unite_consulaire_id.in_(unit_ids), Application.status == 'soumise')
+                    .group_by(Application.unite_consulaire_id)))
+        for channel in wanted:
+            message = self.format_event(channel[0], {'count': counts.get(channel, 0)})
+            with self._lock:
+                subscribers = list(self._subscribers.get(channel, ()))
+            for subscription in subscribers:
+                subscription.put(message)
+
+# Instance globale du service d'événements
+event_service = EventService()
+
+@event.listens_for(Session, 'after_flush')
+def collect_live_events(session, flush_context):
+    event_service.collect_changes(session)
+
+@event.listens_for(Session, 'after_commit')
+def publish_live_events(session):
+    event_service.publish_committed(session)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_live_events(session):
+    event_service.discard(session)
@@ -0,0 +1,258 @@
+# Service d'export des demandes et des utilisateurs (CSV, XLSX)
+# Les lignes sont lues par curseur serveur (stream_results/yield_per) dans l'ordre des
+# id et écrites au fil de l'eau: la mémoire ne dépend pas du nombre de lignes. Un export
+# interrompu reprend avec after_id = dernier id reçu (ni BOM ni en-tête: le fichier CSV
+# se complète par simple concaténation).
+import os
+import io
+import re
+import csv
+import zipfile
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Tuple
+from xml.sax.saxutils import escape
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from app import db
+from backend.db_routing import REPLICA_BIND, replica_monitor
+from backend.models import Application, User, UniteConsulaire
+
+FORMATS = ('csv', 'xlsx')
+# Limite d'une feuille Excel, en-tête compris: au-delà, reprendre avec after_id
+XLSX_MAX_ROWS = 1048576
+# Caractères interdits en XML 1.0
+XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+# Préfixes interprétés comme formule par les tableurs
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+class _ChunkSink:
+    """Fichier en écriture seule, non positionnable: zipfile y écrit, le générateur vide"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class ExportService:
+    def __init__(self):
+        # Lignes lues par aller-retour du curseur serveur, et écrites par morceau envoyé
+        self.batch_rows = int(os.environ.get('EXPORT_BATCH_ROWS', 2000))
+        self.csv_delimiter = os.environ.get('EXPORT_CSV_DELIMITER', ',')
+
+    # ---- Requêtes ----
+
+    def _applications(self, filters):
+        applicant = aliased(User)
+        statement = (
+            select(Application.id, Application.reference_number, Application.service_type,
+                   Application.status, Application.unite_consulaire_id, UniteConsulaire.nom,
+                   Application.user_id, applicant.first_name, applicant.last_name, applicant.email,
+                   Application.processed_by, Application.payment_amount, Application.payment_status,
+                   Application.created_at, Application.updated_at, Application.due_at,
+                   Application.sla_met)
+            .outerjoin(UniteConsulaire, UniteConsulaire.id == Application.unite_consulaire_id)
+            .outerjoin(applicant, applicant.id == Application.user_id)
+        )
+        columns = ['id', 'reference', 'service', 'statut', 'unite_id', 'unite', 'demandeur_id',
+                   'prenom', 'nom', 'email', 'traite_par', 'montant', 'paiement', 'creee_le',
+                   'modifiee_le', 'echeance', 'delai_respecte']
+        if filters.get('unit_id') is not None:
+            statement = statement.where(Application.unite_consulaire_id == filters['unit_id'])
+        if filters.get('service_type'):
+            statement = statement.where(Application.service_type == filters['service_type'])
+        if filters.get('status'):
+            statement = statement.where(Application.status == filters['status'])
+        return statement, Application, columns
+
+    def _users(self, filters):
+        statement = (
+            select(User.id, User.username, User.email, User.first_name, User.last_name, User.role,
+                   User.unite_consulaire_id, UniteConsulaire.nom, User.active, User.language,
+                   User.profile_complete, User.created_at, User.last_login)
+            .outerjoin(UniteConsulaire, UniteConsulaire.id == User.unite_consulaire_id)
+        )
+        columns = ['id', 'identifiant', 'email', 'prenom', 'nom', 'role', 'unite_id', 'unite',
+                   'actif', 'langue', 'profil_complet', 'cree_le', 'derniere_connexion']
+        if filters.get('unit_id') is not None:
+            statement = statement.where(User.unite_consulaire_id == filters['unit_id'])
+        if filters.get('role'):
+            statement = statement.where(User.role == filters['role'])
+        if filters.get('active') is not None:
+            statement = statement.where(User.active == filters['active'])
+        return statement, User, columns
+
+    KINDS = {'applications': _applications, 'users': _users}
+
+    def build_query(self, kind: str, filters: Dict[str, any]) -> Tuple[any, List[str]]:
+        """Requête filtrée, triée par id (reprise par clé), et noms de colonnes"""
+        if kind not in self.KINDS:
+            raise ValueError(f'Export inconnu: {kind}')
+        statement, model, columns = self.KINDS[kind](self, filters)
+        # Période de création [start, end), bornes en dates
+        if filters.get('start') is not None:
+            statement = statement.where(model.created_at >= datetime.combine(filters['start'], datetime.min.time()))
+        if filters.get('end') is not None:
+            statement = statement.where(model.created_at < datetime.combine(filters['end'], datetime.min.time()))
+        if filters.get('after_id') is not None:
+            statement = statement.where(model.id > filters['after_id'])
+        return statement.order_by(model.id), columns
+
+    def _engine(self):
+        """Réplica s'il est configuré et à jour: un long export ne charge pas le primaire"""
+        engine = db.engines.get(REPLICA_BIND)
+        if engine is not None and replica_monitor.available(engine):
+            return engine
+        return db.engine
+
+    def iter_rows(self, statement) -> Iterator[Tuple]:
+        """Lignes par curseur serveur sur une connexion dédiée (hors session de la requête)"""
+        with self._engine().connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=self.batch_rows).execute(statement)
+            for partition in result.partitions():
+                yield from partition
+
+    # ---- Formats ----
+
+    def _text(self, value) -> str:
+        if isinstance(value, datetime):
+            return value.isoformat(sep=' ', timespec='seconds')
+        if isinstance(value, date):
+            return value.isoformat()
+        text = str(value)
+        # Une cellule ne doit pas s'exécuter comme formule à l'ouverture
+        if text.startswith(FORMULA_PREFIXES):
+            return "'" + text
+        return text
+
+    def write_csv(self, statement, columns, header: bool = True) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=self.csv_delimiter, lineterminator='\r\n')
+        if header:
+            # BOM: accents corrects à l'ouverture dans Excel
+            buffer.write('\ufeff')
+            writer.writerow(columns)
+        pending = 0
+        for row in self.iter_rows(statement):
+            writer.writerow(['' if value is None else
+                             value if isinstance(value, (int, float)) else
+                             self._text(value) for value in row])
+            pending += 1
+            if pending >= self.batch_rows:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def _xlsx_row(self, values) -> str:
+        cells = []
+        for value in values:
+            if value is None:
+                cells.append('<c/>')
+            elif isinstance(value, bool):
+                cells.append(f'<c t="b"><v>{int(value)}</v></c>')
+            elif isinstance(value, (int, float)):
+                cells.append(f'<c><v>{value!r}</v></c>')
+            else:
+                # Chaînes en ligne: pas de table partagée à garder en mémoire
+                text = XML_INVALID.sub('', self._text(value))
+                cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>')
+        return f'<row>{"".join(cells)}</row>'
+
+    def write_xlsx(self, statement, columns, header: bool = True) -> Iterator[bytes]:
+        """Classeur d'une feuille écrit en continu (zip sans positionnement, chaînes en ligne)"""
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, content in XLSX_PARTS.items():
+                archive.writestr(name, content)
+            with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+                sheet.write(XLSX_SHEET_START.encode('utf-8'))
+                written = 0
+                if header:
+                    sheet.write(self._xlsx_row(columns).encode('utf-8'))
+                    written = 1
+                for row in self.iter_rows(statement):
+                    if written >= XLSX_MAX_ROWS:
+                        break
+                    sheet.write(self._xlsx_row(row).encode('utf-8'))
+                    written += 1
+                    if written % self.batch_rows == 0:
+                        chunk = sink.drain()
+                        if chunk:
+                            yield chunk
+                sheet.write(XLSX_SHEET_END.encode('utf-8'))
+        yield sink.drain()
+
+    def export(self, kind: str, fmt: str, filters: Dict[str, any]) -> Iterator[bytes]:
+        """Morceaux du fichier; sans en-tête lors d'une reprise (after_id)"""
+        if fmt not in FORMATS:
+            raise ValueError(f'Format inconnu: {fmt}')
+        statement, columns = self.build_query(kind, filters)
+        header = filters.get('after_id') is None or fmt == 'xlsx'
+        writer = self.write_csv if fmt == 'csv' else self.write_xlsx
+        return writer(statement, columns, header=header)
+
+    def filename(self, kind: str, fmt: str, filters: Dict[str, any]) -> str:
+        name = {'applications': 'demandes', 'users': 'utilisateurs'}[kind]
+        suffix = f"_apres_{filters['after_id']}" if filters.get('after_id') is not None else ''
+        return f'{name}_{datetime.utcnow():%Y%m%d_%H%M}{suffix}.{fmt}'
+
+    MIMETYPES = {
+        'csv': 'text/csv',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    }
+
+XLSX_SHEET_START = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                    '<sheetData>')
+XLSX_SHEET_END = '</sheetData></worksheet>'
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Instance globale du service d'export
+export_service = ExportService()
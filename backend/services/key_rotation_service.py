@@ -0,0 +1,190 @@
+# Service de rotation des clés de chiffrement des champs sensibles
+# Rechiffre les lignes par lots paginés sur la clé primaire (keyset), dans un pool
+# de processus, avec une transaction courte par lot et une reprise depuis le dernier id.
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from sqlalchemy import select, update, func, inspect, type_coerce, String
+from app import app, db
+from backend.models import User, KeyRotationJob
+from backend.models.encryption import EncryptedString, EncryptedDate, get_keyring, rotate_rows
+
+class KeyRotationService:
+    def __init__(self):
+        self.batch_size = int(os.environ.get('KEY_ROTATION_BATCH_SIZE', 500))
+        self.workers = int(os.environ.get('KEY_ROTATION_WORKERS', min(4, os.cpu_count() or 1)))
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def encrypted_columns(self) -> Dict[str, any]:
+        """Colonnes chiffrées de la table utilisateur: nom -> type"""
+        return {column.name: column.type for column in User.__table__.columns
+                if isinstance(column.type, (EncryptedString, EncryptedDate))}
+
+    def prepare_schema(self):
+        """Élargir les colonnes existantes pour accueillir les chiffrés (PostgreSQL)
+
+        L'élargissement d'un VARCHAR ne réécrit pas la table; seules les colonnes
+        DATE d'origine sont converties une fois en texte.
+        """
+        if db.engine.dialect.name != 'postgresql':
+            return
+        current = {c['name']: c['type'] for c in inspect(db.engine).get_columns('user')}
+        with db.engine.begin() as connection:
+            for name, column_type in self.encrypted_columns().items():
+                length = getattr(current.get(name), 'length', None)
+                if length is not None and length >= column_type.impl.length:
+                    continue
+                connection.exec_driver_sql(
+                    f'ALTER TABLE "user" ALTER COLUMN {name} TYPE VARCHAR({column_type.impl.length}) '
+                    f'USING {name}::text'
+                )
+                app.logger.info(f'Colonne user.{name} élargie à {column_type.impl.length} caractères')
+
+    def start(self, user_id: Optional[int] = None, background: bool = True) -> KeyRotationJob:
+        """Créer une tâche de rotation vers la clé active (ou retourner celle en cours)"""
+        keyring = get_keyring()
+        if not keyring.enabled:
+            raise ValueError('Aucune clé de chiffrement des champs configurée (FIELD_ENCRYPTION_KEYS)')
+
+        job = KeyRotationJob.query.filter(KeyRotationJob.status.in_(['pending', 'running']))\
+            .order_by(KeyRotationJob.id.desc()).first()
+        if job is None:
+            job = KeyRotationJob(
+                target_kid=keyring.active_kid,
+                status='pending',
+                last_id=0,
+                rows_total=db.session.query(func.count(User.id)).scalar(),
+                started_by=user_id
+            )
+            db.session.add(job)
+            db.session.commit()
+
+        if background:
+            self.run_in_background(job.id)
+        return job
+
+    def resume(self, job_id: Optional[int] = None, background: bool = False,
+               progress: Optional[Callable[[KeyRotationJob], None]] = None) -> Optional[KeyRotationJob]:
+        """Reprendre une tâche interrompue depuis son dernier id traité"""
+        query = KeyRotationJob.query.filter(KeyRotationJob.status != 'completed')
+        job = query.filter_by(id=job_id).first() if job_id else query.order_by(KeyRotationJob.id.desc()).first()
+        if job is None:
+            return None
+        if background:
+            self.run_in_background(job.id)
+            return job
+        return self.run(job.id, progress=progress)
+
+    def run_in_background(self, job_id: int) -> bool:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self._run_in_context, args=(job_id,),
+                                            name='key-rotation', daemon=True)
+            self._thread.start()
+        return True
+
+    def _run_in_context(self, job_id):
+        # Depuis un thread d'un worker web multi-thread: pas de fork (verrous du pool
+        # SQLAlchemy ou du logging possiblement tenus par d'autres threads), un seul processus
+        with app.app_context():
+            self.run(job_id, workers=1)
+
+    def run(self, job_id: int, progress: Optional[Callable[[KeyRotationJob], None]] = None,
+            workers: Optional[int] = None) -> KeyRotationJob:
+        """Exécuter (ou reprendre) une tâche de rotation jusqu'à son terme
+
+        Pool de KEY_ROTATION_WORKERS processus par défaut (commande rotate_keys.py);
+        workers=1 rechiffre dans le processus courant.
+        """
+        job = db.session.get(KeyRotationJob, job_id)
+        keyring = get_keyring()
+        if keyring.active_kid != job.target_kid:
+            job.status = 'failed'
+            job.error = f'Clé active {keyring.active_kid} différente de la cible {job.target_kid}'
+            db.session.commit()
+            return job
+
+        self.prepare_schema()
+        job.status = 'running'
+        job.error = None
+        db.session.commit()
+
+        columns = self.encrypted_columns()
+        contexts = {name: column_type.context for name, column_type in columns.items()}
+        table = User.__table__
+        # Lecture et écriture des valeurs brutes (sans passer par le TypeDecorator)
+        raw_columns = [type_coerce(table.c[name], String()).label(name) for name in columns]
+
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = workers or self.workers
+        pool = None
+        if workers > 1:
+            context = multiprocessing.get_context('fork') if hasattr(os, 'fork') else None
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        try:
+            while True:
+                batches = []
+                cursor = job.last_id or 0
+                for _ in range(workers):
+                    rows = db.session.execute(
+                        select(table.c.id, *raw_columns).where(table.c.id > cursor)
+                        .order_by(table.c.id).limit(self.batch_size)
+                    ).all()
+                    db.session.commit()  # ne pas garder la transaction de lecture ouverte
+                    if not rows:
+                        break
+                    batches.append([(row.id, {name: row._mapping[name] for name in columns}) for row in rows])
+                    cursor = rows[-1].id
+                if not batches:
+                    break
+
+                if pool:
+                    results = [future.result() for future in
+                               [pool.submit(rotate_rows, batch, contexts) for batch in batches]]
+                else:
+                    results = (rotate_rows(batch, contexts) for batch in batches)
+                for batch, changes in zip(batches, results):
+                    rotated = self._apply_changes(table, changes)
+                    job.last_id = batch[-1][0]
+                    job.rows_scanned = (job.rows_scanned or 0) + len(batch)
+                    job.rows_rotated = (job.rows_rotated or 0) + rotated
+                    db.session.commit()  # modifications et curseur validés ensemble
+                    if progress:
+                        progress(job)
+
+            job.status = 'completed'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            app.logger.info(f'Rotation des clés terminée: {job.rows_rotated} lignes rechiffrées vers {job.target_kid}')
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(KeyRotationJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            db.session.commit()
+            app.logger.error(f'Erreur rotation des clés (tâche {job_id}, dernier id {job.last_id}): {e}')
+        finally:
+            if pool:
+                pool.shutdown()
+        return job
+
+    def _apply_changes(self, table, changes) -> int:
+        """Écrire un lot; une ligne modifiée entre-temps est ignorée (elle a été rechiffrée à l'écriture)"""
+        rotated = 0
+        for row_id, new_values, old_values in changes:
+            conditions = [type_coerce(table.c[name], String()).is_not_distinct_from(type_coerce(value, String()))
+                          for name, value in old_values.items()]
+            result = db.session.execute(
+                update(table).where(table.c.id == row_id, *conditions)
+                .values({table.c[name]: type_coerce(value, String()) for name, value in new_values.items()})
+            )
+            rotated += result.rowcount
+        return rotated
+
+# Instance globale du service de rotation des clés
+key_rotation_service = KeyRotationService()
@@ -0,0 +1,118 @@
+# Compteurs de notifications non lues par utilisateur (table notification_counter)
+# Chaque flush qui crée, lit ou supprime des notifications ajuste le compteur dans la même
+# transaction (ancienne valeur de is_read chargée par active_history); les mises à jour en
+# masse appellent adjust() avec le nombre de lignes touchées. reconcile() corrige les
+# écarts (imports en masse, scripts).
+from typing import Dict, Iterable, Optional
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import db
+from backend.models import Notification, NotificationCounter, User
+
+class NotificationCounterService:
+
+    def unread(self, user_id: int) -> int:
+        """Badge: lecture par clé primaire"""
+        return db.session.scalar(
+            select(NotificationCounter.unread).where(NotificationCounter.user_id == user_id)
+        ) or 0
+
+    def unread_many(self, user_ids: Iterable[int]) -> Dict[int, int]:
+        rows = db.session.execute(
+            select(NotificationCounter.user_id, NotificationCounter.unread)
+            .where(NotificationCounter.user_id.in_(list(user_ids)))
+        ).all()
+        return dict(rows)
+
+    def _upsert(self, connection, user_id, add=None, value=None):
+        """Incrémenter (add) ou fixer (value) le compteur d'un utilisateur en une instruction"""
+        table = NotificationCounter.__table__
+        insert = postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert
+        statement = insert(table).values(user_id=user_id, unread=add if value is None else value)
+        change = table.c.unread + statement.excluded.unread if value is None else statement.excluded.unread
+        connection.execute(statement.on_conflict_do_update(index_elements=[table.c.user_id], set_={'unread': change}))
+
+    def adjust(self, user_id: int, delta: int, session=None):
+        """Après une mise à jour en masse (UPDATE ... is_read), dans la même transaction"""
+        if user_id is None or not delta:
+            return
+        session = session or db.session
+        self._upsert(session.connection(), user_id, add=delta)
+
+    def track_changes(self, session):
+        """Variation des non-lues par utilisateur, relevée avant le flush (les lignes
+        supprimées sont encore lisibles), appliquée après dans la même transaction"""
+        deltas = {}
+        for obj in session.new:
+            if isinstance(obj, Notification) and not obj.is_read:
+                deltas[obj.user_id] = deltas.get(obj.user_id, 0) + 1
+        for obj in session.dirty:
+            if not isinstance(obj, Notification) or obj in session.deleted:
+                continue
+            history = inspect(obj).attrs.is_read.history
+            if history.has_changes() and bool(history.deleted and history.deleted[0]) != bool(obj.is_read):
+                deltas[obj.user_id] = deltas.get(obj.user_id, 0) + (-1 if obj.is_read else 1)
+        for obj in session.deleted:
+            if isinstance(obj, Notification):
+                history = inspect(obj).attrs.is_read.history
+                was_read = history.deleted[0] if history.has_changes() and history.deleted else obj.is_read
+                if not was_read:
+                    deltas[obj.user_id] = deltas.get(obj.user_id, 0) - 1
+        session.info['unread_deltas'] = {user_id: delta for user_id, delta in deltas.items() if delta}
+
+    def record_changes(self, session):
+        deltas = session.info.pop('unread_deltas', None)
+        if not deltas:
+            return
+        connection = session.connection()
+        for user_id, delta in deltas.items():
+            self._upsert(connection, user_id, add=delta)
+
+    def reconcile(self, user_ids: Optional[Iterable[int]] = None, batch_size: int = 1000) -> Dict[str, int]:
+        """Recompter les non-lues et corriger les compteurs divergents, par lots d'utilisateurs"""
+        checked = corrected = 0
+        last_id = 0
+        wanted = sorted(set(user_ids)) if user_ids is not None else None
+        while True:
+            if wanted is not None:
+                batch = wanted[checked:checked + batch_size]
+            else:
+                batch = db.session.scalars(
+                    select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+                ).all()
+            if not batch:
+                break
+            # Compteurs verrouillés avant le recomptage (PostgreSQL): un flush concurrent
+            # attend la fin du lot, son incrément s'applique donc au compteur corrigé
+            stored = dict(db.session.execute(
+                select(NotificationCounter.user_id, NotificationCounter.unread)
+                .where(NotificationCounter.user_id.in_(batch))
+                .with_for_update()
+            ).all())
+            actual = dict(db.session.execute(
+                select(Notification.user_id, func.count())
+                .where(Notification.user_id.in_(batch), Notification.is_read == False)
+                .group_by(Notification.user_id)
+            ).all())
+            connection = db.session.connection()
+            for user_id in batch:
+                count = actual.get(user_id, 0)
+                if stored.get(user_id) != count and (count or user_id in stored):
+                    self._upsert(connection, user_id, value=count)
+                    corrected += 1
+            db.session.commit()
+            checked += len(batch)
+            last_id = batch[-1]
+        return {'checked': checked, 'corrected': corrected}
+
+# Instance globale des compteurs de notifications
+notification_counter_service = NotificationCounterService()
+
+@event.listens_for(Session, 'before_flush')
+def track_unread_notifications(session, flush_context, instances):
+    notification_counter_service.track_changes(session)
+
+@event.listens_for(Session, 'after_flush')
+def count_unread_notifications(session, flush_context):
+    notification_counter_service.record_changes(session)
@@ -0,0 +1,234 @@
+# Service de rétention des notifications
+# Les notifications lues au-delà de NOTIFICATION_READ_RETENTION_DAYS sont supprimées (ou
+# archivées en JSONL compressé puis supprimées); les non lues au-delà de
+# NOTIFICATION_DIGEST_AFTER_DAYS sont regroupées en un récapitulatif par utilisateur.
+# Parcours par clé (id croissant) en lots courts, chacun dans sa propre transaction, pour
+# pouvoir tourner en journée sans bloquer les insertions.
+import os
+import json
+import gzip
+import time
+import threading
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou inter-processus
+    fcntl = None
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import delete, func, insert, select
+from app import app, db
+from backend.models import Notification
+from .audit_service import audit_service
+from .event_service import event_service, NOTIFICATIONS
+from .notification_counter_service import notification_counter_service
+
+DIGEST_TYPE = 'recapitulatif'
+# Titres repris dans le message d'un récapitulatif
+DIGEST_TITLES = 5
+
+class NotificationRetentionService:
+    def __init__(self):
+        self.read_retention_days = int(os.environ.get('NOTIFICATION_READ_RETENTION_DAYS', 90))
+        self.digest_after_days = int(os.environ.get('NOTIFICATION_DIGEST_AFTER_DAYS', 30))
+        self.batch_size = int(os.environ.get('NOTIFICATION_RETENTION_BATCH', 1000))
+        # Pause entre deux lots (millisecondes): laisse passer les transactions applicatives
+        self.pause_seconds = float(os.environ.get('NOTIFICATION_RETENTION_PAUSE_MS', 50)) / 1000
+        # delete ou archive (JSONL compressé dans NOTIFICATION_ARCHIVE_DIR avant suppression)
+        self.mode = os.environ.get('NOTIFICATION_RETENTION_MODE', 'delete').lower()
+        self.archive_dir = os.environ.get('NOTIFICATION_ARCHIVE_DIR', os.path.join('archives', 'notifications'))
+        self.report_file = os.environ.get('NOTIFICATION_RETENTION_REPORT',
+                                          os.path.join(app.instance_path, 'notification_retention.json'))
+        self.lock_file = os.environ.get('NOTIFICATION_RETENTION_LOCK',
+                                        os.path.join(app.instance_path, 'notification_retention.lock'))
+        self._worker = None
+
+    # ---- Lots ----
+
+    def _batches(self, condition, columns):
+        """Lots de lignes par id croissant, bornés par le plus grand id concerné au départ"""
+        upper = db.session.scalar(select(func.max(Notification.id)).where(condition))
+        db.session.commit()
+        last_id = 0
+        while upper is not None and last_id < upper:
+            rows = db.session.execute(
+                select(*columns)
+                .where(condition, Notification.id > last_id, Notification.id <= upper)
+                .order_by(Notification.id)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            yield rows
+            if self.pause_seconds:
+                time.sleep(self.pause_seconds)
+
+    def _archive(self, ids, now):
+        if self.mode != 'archive':
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f'notifications_{now:%Y%m%d}.jsonl.gz')
+        rows = db.session.execute(select(Notification.__table__).where(Notification.id.in_(ids))).mappings()
+        # Un membre gzip par lot: le fichier reste lisible si l'exécution s'arrête en cours
+        with gzip.open(path, 'at', encoding='utf-8') as archive:
+            for row in rows:
+                record = dict(row)
+                if record['created_at']:
+                    record['created_at'] = record['created_at'].isoformat()
+                archive.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def purge_read(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Supprimer les notifications lues plus anciennes que la rétention"""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.read_retention_days)
+        condition = db.and_(Notification.is_read == True, Notification.created_at < cutoff)
+        deleted = batches = 0
+        for rows in self._batches(condition, [Notification.id]):
+            ids = [row.id for row in rows]
+            self._archive(ids, now)
+            # Condition répétée: une ligne repassée non lue entre-temps est conservée
+            deleted += db.session.execute(
+                delete(Notification).where(Notification.id.in_(ids), condition)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            batches += 1
+        return {'deleted': deleted, 'batches': batches}
+
+    def digest_unread(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Regrouper les anciennes non lues en un récapitulatif par utilisateur"""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.digest_after_days)
+        # type != DIGEST_TYPE seul écarterait aussi les lignes de type NULL
+        condition = db.and_(Notification.is_read == False, Notification.created_at < cutoff,
+                            db.or_(Notification.type.is_(None), Notification.type != DIGEST_TYPE))
+        # Récapitulatif de cette exécution par utilisateur: id, nombre, titres
+        digests = {}
+        digested = batches = 0
+        for rows in self._batches(condition, [Notification.id, Notification.user_id, Notification.title]):
+            ids = [row.id for row in rows]
+            self._archive(ids, now)
+            removed = db.session.execute(
+                delete(Notification).where(Notification.id.in_(ids), condition)
+                .returning(Notification.user_id, Notification.title)
+                .execution_options(synchronize_session=False)
+            ).all()
+            by_user = {}
+            for user_id, title in removed:
+                by_user.setdefault(user_id, []).append(title)
+            for user_id, titles in by_user.items():
+                digest = digests.setdefault(user_id, {'id': None, 'count': 0, 'titles': []})
+                digest['count'] += len(titles)
+                digest['titles'] = (digest['titles'] + titles)[:DIGEST_TITLES]
+                values = self._digest_values(digest['count'], digest['titles'])
+                if digest['id'] is None:
+                    digest['id'] = db.session.execute(insert(Notification).values(
+                        user_id=user_id, type=DIGEST_TYPE, is_read=False, created_at=now, **values
+                    ).returning(Notification.id)).scalar_one()
+                    notification_counter_service.adjust(user_id, 1 - len(titles))
+                else:
+                    db.session.execute(Notification.__table__.update()
+                                       .where(Notification.id == digest['id']).values(**values))
+                    notification_counter_service.adjust(user_id, -len(titles))
+                event_service.emit(NOTIFICATIONS, user_id)
+            db.session.commit()
+            digested += len(removed)
+            batches += 1
+        return {'digested': digested, 'digests': len(digests), 'batches': batches}
+
+    def _digest_values(self, count, titles):
+        listed = ', '.join(titles)
+        if count > len(titles):
+            listed += ', …'
+        return {
+            'title': f'{count} notification(s) non lue(s) regroupée(s)',
+            'message': f'Notifications de plus de {self.digest_after_days} jours: {listed}'[:2000],
+        }
+
+    # ---- Exécution ----
+
+    def run(self, now: Optional[datetime] = None, user_id: Optional[int] = None) -> Dict[str, any]:
+        """Purge puis regroupement; une seule exécution à la fois (verrou fichier)"""
+        os.makedirs(os.path.dirname(self.lock_file) or '.', exist_ok=True)
+        with open(self.lock_file, 'a') as handle:
+            try:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return {'success': False, 'error': 'Rétention des notifications déjà en cours'}
+            try:
+                return self._run(now, user_id)
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _run(self, now, user_id):
+        started = time.perf_counter()
+        report = {'success': False, 'started_at': datetime.utcnow().isoformat(), 'mode': self.mode}
+        try:
+            purged = self.purge_read(now)
+            digested = self.digest_unread(now)
+            report.update(success=True, deleted=purged['deleted'], digested=digested['digested'],
+                          digests=digested['digests'], batches=purged['batches'] + digested['batches'])
+        except Exception as e:
+            db.session.rollback()
+            report['error'] = str(e)
+            app.logger.error(f'Erreur rétention des notifications: {e}')
+        report['duration_s'] = round(time.perf_counter() - started, 2)
+        self._save_report(report)
+
+        details = (f"Lues supprimées: {report.get('deleted', 0)}, non lues regroupées: "
+                   f"{report.get('digested', 0)} en {report.get('digests', 0)} récapitulatif(s), "
+                   f"{report['duration_s']} s") if report['success'] else f"Échec: {report['error']}"
+        audit_service.record(
+            user_id=user_id,
+            action='system_notification_retention',
+            resource='system',
+            resource_id=None,
+            details=details,
+            sync=True
+        )
+        return report
+
+    def run_async(self, user_id: Optional[int] = None) -> bool:
+        """Lancer une exécution en arrière-plan depuis une requête"""
+        if self._worker is not None and self._worker.is_alive():
+            return False
+        self._worker = threading.Thread(target=self._run_in_context, args=(user_id,),
+                                        name='notification-retention', daemon=True)
+        self._worker.start()
+        return True
+
+    def is_running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def _run_in_context(self, user_id=None):
+        with app.app_context():
+            self.run(user_id=user_id)
+
+    # ---- Rapports ----
+
+    def last_runs(self, limit: int = 10) -> List[Dict[str, any]]:
+        try:
+            with open(self.report_file, 'r') as f:
+                return json.load(f)[:limit]
+        except (OSError, ValueError):
+            return []
+
+    def _save_report(self, report):
+        runs = [report] + self.last_runs(19)
+        os.makedirs(os.path.dirname(self.report_file) or '.', exist_ok=True)
+        tmp_path = f'{self.report_file}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(runs, f)
+        os.replace(tmp_path, self.report_file)
+
+    def schedule_maintenance(self):
+        """Programmer la rétention quotidienne des notifications"""
+        import schedule
+
+        schedule.every().day.at("03:45").do(self._run_in_context)
+        app.logger.info('Rétention des notifications programmée')
+
+# Instance globale du service de rétention des notifications
+notification_retention_service = NotificationRetentionService()
@@ -11,7 +11,8 @@ class NotificationService:
             user_id=user_id,
             type=type_notification,
             title=title,
-            message=message
+            message=message,
+            reference_id=reference_id
         )
         db.session.add(notification)
         return notification
@@ -62,3 +63,26 @@ class NotificationService:
         )
         
         db.session.commit()
+    
+    @staticmethod
+    def notify_sla_escalation(unit_id, applications):
+        """Dossiers en retard d'une unité: une notification par administrateur (superviseurs à défaut)"""
+        recipients = User.query.filter_by(
+            unite_consulaire_id=unit_id,
+            role='admin',
+            active=True
+        ).all() or User.query.filter_by(role='superviseur', active=True).all()
+        
+        references = ', '.join(a.reference_number for a in applications[:10])
+        if len(applications) > 10:
+            references += f' (+{len(applications) - 10})'
+        
+        for recipient in recipients:
+            NotificationService.create_notification(
+                user_id=recipient.id,
+                type_notification='sla_depasse',
+                title=f'{len(applications)} dossier(s) en retard',
+                message=f'Délai de traitement dépassé: {references}',
+                reference_id=applications[0].id if len(applications) == 1 else None
+            )
+        return len(recipients)
@@ -0,0 +1,149 @@
+# Service de hachage des mots de passe
+# Paramètres calibrés sur la latence cible, rehachage transparent à la connexion
+# et vérification dans un pool de threads borné.
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from app import app
+from backend.utils.metrics import rate_limit_rejections
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+def expanded_method(method: str) -> str:
+    """Forme complète que Werkzeug inscrit dans le hachage (« scrypt » -> « scrypt:32768:8:1 »)"""
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    if name == 'pbkdf2' and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+class PasswordVerificationBusy(Exception):
+    """Trop de vérifications en attente: la connexion doit être retentée"""
+
+class PasswordService:
+    def __init__(self):
+        self.config_file = os.environ.get('PASSWORD_HASH_CONFIG', os.path.join(app.instance_path, 'password_hash.json'))
+        self.target_ms = int(os.environ.get('PASSWORD_HASH_TARGET_MS', 250))
+        self.max_workers = int(os.environ.get('PASSWORD_VERIFY_WORKERS', 2))
+        self.max_pending = int(os.environ.get('PASSWORD_VERIFY_QUEUE', 16))
+        self.wait_timeout = float(os.environ.get('PASSWORD_VERIFY_TIMEOUT', 10))
+        # Comparé tel quel au préfixe des hachages (needs_rehash): forme complète
+        self.method = expanded_method(os.environ.get('PASSWORD_HASH_METHOD') or self._load_calibrated_method()
+                                      or DEFAULT_METHOD)
+        self._executor = None
+        self._executor_pid = None
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+
+    def _load_calibrated_method(self) -> Optional[str]:
+        try:
+            with open(self.config_file, 'r') as f:
+                return json.load(f).get('method')
+        except (OSError, ValueError):
+            return None
+
+    def hash_password(self, password: str) -> str:
+        return generate_password_hash(password, method=self.method)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Le hachage a-t-il été produit avec d'autres paramètres que les actuels?"""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def check_password(self, password_hash: str, password: str) -> bool:
+        """Vérification directe (bloquante) d'un hachage Werkzeug ou bcrypt"""
+        if not password_hash or password is None:
+            return False
+        if password_hash.startswith(('$2a$', '$2b$', '$2y$')):
+            import bcrypt
+            try:
+                return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+            except ValueError:
+                return False
+        try:
+            return check_password_hash(password_hash, password)
+        except ValueError:
+            return False
+
+    def verify_password(self, password_hash: str, password: str) -> bool:
+        """Vérifier dans le pool borné (les fonctions de hachage libèrent le GIL)
+
+        Lève PasswordVerificationBusy si trop de vérifications sont déjà en attente.
+        """
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            rate_limit_rejections.inc(scope='password_verification')
+            raise PasswordVerificationBusy()
+        try:
+            future = self._get_executor().submit(self.check_password, password_hash, password)
+            return future.result()
+        finally:
+            self._slots.release()
+
+    def verify_and_update(self, user, password: str) -> bool:
+        """Vérifier le mot de passe d'un utilisateur et rehacher si les paramètres ont changé
+
+        Le nouveau hachage est placé sur l'objet; l'appelant valide la session.
+        """
+        if not user or not self.verify_password(user.password_hash, password):
+            return False
+        if self.needs_rehash(user.password_hash):
+            user.password_hash = self.hash_password(password)
+            app.logger.info(f'Mot de passe rehaché ({self.method}) pour l\'utilisateur {user.id}')
+        return True
+
+    def _get_executor(self):
+        # Un pool par processus (les workers gunicorn sont forkés)
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-verify')
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def calibrate(self, target_ms: Optional[int] = None, algorithm: str = 'scrypt') -> Dict[str, any]:
+        """Choisir le coût le plus élevé dont la durée de hachage reste sous la latence cible
+
+        Les coûts sont croissants: la mesure s'arrête au premier qui dépasse la cible. Si même
+        le plus faible la dépasse, c'est lui qui est retenu.
+        """
+        target_ms = target_ms or self.target_ms
+        if algorithm == 'scrypt':
+            candidates = (f'scrypt:{2 ** exp}:8:1' for exp in range(12, 21))
+        elif algorithm == 'pbkdf2':
+            candidates = (f'pbkdf2:sha256:{iterations}' for iterations in
+                          (100000, 200000, 400000, 600000, 800000, 1200000, 1600000, 2400000, 3200000))
+        else:
+            raise ValueError(f'Algorithme non supporté: {algorithm}')
+
+        measurements = []
+        chosen = None
+        for method in candidates:
+            elapsed_ms = self._time_method(method)
+            measurements.append({'method': method, 'ms': round(elapsed_ms, 1)})
+            if elapsed_ms > target_ms:
+                chosen = chosen or method
+                break
+            chosen = method
+
+        return {'method': chosen, 'target_ms': target_ms, 'measurements': measurements}
+
+    def _time_method(self, method: str, rounds: int = 3) -> float:
+        generate_password_hash('calibration', method=method)
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            generate_password_hash('calibration', method=method)
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def save_calibration(self, method: str, target_ms: int):
+        os.makedirs(os.path.dirname(self.config_file) or '.', exist_ok=True)
+        with open(self.config_file, 'w') as f:
+            json.dump({'method': method, 'target_ms': target_ms,
+                       'calibrated_at': time.strftime('%Y-%m-%dT%H:%M:%S')}, f)
+        self.method = expanded_method(method)
+
+# Instance globale du service de mots de passe
+password_service = PasswordService()
@@ -0,0 +1,250 @@
+# Service de rapports: faits journaliers par unité, service et statut
+# Chaque changement de statut (ligne status_history) incrémente, dans sa transaction, la
+# ligne du jour de application_daily_stats (entrées dans le statut, montants) et, pour
+# les décisions, l'histogramme des durées de traitement (application_daily_duration).
+# Les tendances mensuelles et annuelles se lisent dans ces tables sans toucher aux
+# demandes; backfill() les reconstruit depuis l'historique sur tous les cœurs.
+import os
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import app, db
+from backend.models import Application, StatusHistory, ApplicationDailyStats, ApplicationDailyDuration
+from .sla_service import DECISION_STATUSES
+
+# Bornes supérieures (heures) des classes de durée de traitement; une classe au-delà.
+# La médiane est interpolée dans sa classe: précision de l'ordre de la largeur de classe.
+DURATION_BUCKETS_HOURS = (1, 4, 8, 24, 48, 72, 120, 168, 240, 336, 504, 720, 1440)
+GRANULARITIES = ('month', 'year')
+
+def duration_bucket(seconds: float) -> int:
+    return bisect_left(DURATION_BUCKETS_HOURS, seconds / 3600)
+
+def median_hours(histogram: Dict[int, int]) -> Optional[float]:
+    """Médiane estimée d'un histogramme {classe: effectif}"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    half, seen = total / 2, 0
+    for bucket in sorted(histogram):
+        count = histogram[bucket]
+        if seen + count >= half:
+            lower = DURATION_BUCKETS_HOURS[bucket - 1] if bucket else 0
+            if bucket >= len(DURATION_BUCKETS_HOURS):
+                return float(lower)
+            upper = DURATION_BUCKETS_HOURS[bucket]
+            return round(lower + (upper - lower) * (half - seen) / count, 1)
+        seen += count
+    return None
+
+def aggregate_history(start: date, end: date) -> Tuple[Dict, Dict]:
+    """Faits des changements de statut de [start, end) (exécuté dans un processus du pool)"""
+    stats, durations = {}, {}
+    moment = func.coalesce(StatusHistory.timestamp, StatusHistory.created_at)
+    with app.app_context():
+        rows = db.session.execute(
+            select(moment, StatusHistory.new_status, Application.unite_consulaire_id,
+                   Application.service_type, Application.payment_amount, Application.created_at)
+            .join(Application, Application.id == StatusHistory.application_id)
+            .where(moment >= datetime.combine(start, datetime.min.time()),
+                   moment < datetime.combine(end, datetime.min.time()))
+            .execution_options(yield_per=5000)
+        )
+        for changed_at, status, unit_id, service_type, amount, created_at in rows:
+            key = (changed_at.date(), unit_id, service_type, status)
+            fact = stats.setdefault(key, [0, 0.0, 0, 0.0])
+            fact[0] += 1
+            fact[1] += amount or 0.0
+            if status in DECISION_STATUSES and created_at is not None:
+                seconds = max((changed_at - created_at).total_seconds(), 0)
+                fact[2] += 1
+                fact[3] += seconds
+                bucket_key = key + (duration_bucket(seconds),)
+                durations[bucket_key] = durations.get(bucket_key, 0) + 1
+        db.session.rollback()
+    return stats, durations
+
+def _init_backfill_worker():
+    # Connexions héritées du processus parent: ne pas les réutiliser après le fork
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+class ReportingService:
+    def __init__(self):
+        self.workers = int(os.environ.get('ROLLUP_BACKFILL_WORKERS', os.cpu_count() or 1))
+        # Nombre de jours d'historique par tâche du pool
+        self.chunk_days = int(os.environ.get('ROLLUP_BACKFILL_CHUNK_DAYS', 31))
+
+    # ---- Mise à jour incrémentale ----
+
+    def _upsert(self, connection, model, key, add):
+        """Incrémenter les compteurs d'une ligne de faits en une instruction"""
+        table = model.__table__
+        insert_ = postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert
+        statement = insert_(table).values(**key, **add)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c[name] for name in key],
+            set_={name: table.c[name] + statement.excluded[name] for name in add}
+        ))
+
+    def record_transitions(self, session):
+        """Faits des changements de statut de ce flush, dans la même transaction"""
+        changes = [obj for obj in session.new if isinstance(obj, StatusHistory)]
+        if not changes:
+            return
+        connection = session.connection()
+        for change in changes:
+            application = session.get(Application, change.application_id)
+            if application is None:
+                continue
+            changed_at = change.timestamp or change.created_at or datetime.utcnow()
+            key = {'day': changed_at.date(), 'unite_consulaire_id': application.unite_consulaire_id,
+                   'service_type': application.service_type, 'status': change.new_status}
+            add = {'transitions': 1, 'revenue': application.payment_amount or 0.0,
+                   'processing_count': 0, 'processing_seconds': 0.0}
+            seconds = None
+            if change.new_status in DECISION_STATUSES and application.created_at is not None:
+                seconds = max((changed_at - application.created_at).total_seconds(), 0)
+                add.update(processing_count=1, processing_seconds=seconds)
+            self._upsert(connection, ApplicationDailyStats, key, add)
+            if seconds is not None:
+                self._upsert(connection, ApplicationDailyDuration,
+                             dict(key, bucket=duration_bucket(seconds)), {'count': 1})
+
+    # ---- Reconstruction ----
+
+    def backfill(self, start: Optional[date] = None, end: Optional[date] = None,
+                 workers: Optional[int] = None, progress=None) -> Dict[str, any]:
+        """Reconstruire les faits de [start, end) depuis status_history, par tranches de jours
+        agrégées en parallèle; chaque tranche est remplacée dans sa propre transaction"""
+        started = time.perf_counter()
+        moment = func.coalesce(StatusHistory.timestamp, StatusHistory.created_at)
+        first, last = db.session.execute(select(func.min(moment), func.max(moment))).one()
+        db.session.commit()
+        if first is None:
+            return {'days': 0, 'changes': 0, 'rows': 0, 'duration_s': 0.0}
+        start = start or first.date()
+        end = end or last.date() + timedelta(days=1)
+        chunks = []
+        cursor = start
+        while cursor < end:
+            chunks.append((cursor, min(cursor + timedelta(days=self.chunk_days), end)))
+            cursor = chunks[-1][1]
+
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = max(1, min(workers or self.workers, len(chunks)))
+        pool = None
+        if workers > 1:
+            context = multiprocessing.get_context('fork') if hasattr(os, 'fork') else None
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                       initializer=_init_backfill_worker)
+        changes = written = 0
+        try:
+            starts, ends = zip(*chunks)
+            results = pool.map(aggregate_history, starts, ends) if pool else map(aggregate_history, starts, ends)
+            for (chunk_start, chunk_end), (stats, durations) in zip(chunks, results):
+                written += self._replace(chunk_start, chunk_end, stats, durations)
+                changes += sum(fact[0] for fact in stats.values())
+                if progress:
+                    progress(chunk_start, chunk_end, changes)
+        finally:
+            if pool:
+                pool.shutdown()
+        return {'days': (end - start).days, 'changes': changes, 'rows': written,
+                'workers': workers, 'duration_s': round(time.perf_counter() - started, 2)}
+
+    def _replace(self, start, end, stats, durations) -> int:
+        for model in (ApplicationDailyStats, ApplicationDailyDuration):
+            db.session.execute(delete(model).where(model.day >= start, model.day < end))
+        if stats:
+            db.session.execute(insert(ApplicationDailyStats), [{
+                'day': day, 'unite_consulaire_id': unit_id, 'service_type': service_type, 'status': status,
+                'transitions': fact[0], 'revenue': fact[1], 'processing_count': fact[2],
+                'processing_seconds': fact[3]
+            } for (day, unit_id, service_type, status), fact in stats.items()])
+        if durations:
+            db.session.execute(insert(ApplicationDailyDuration), [{
+                'day': day, 'unite_consulaire_id': unit_id, 'service_type': service_type, 'status': status,
+                'bucket': bucket, 'count': count
+            } for (day, unit_id, service_type, status, bucket), count in durations.items()])
+        db.session.commit()
+        return len(stats) + len(durations)
+
+    # ---- Tendances ----
+
+    def _period(self, column, granularity):
+        if db.engine.dialect.name == 'postgresql':
+            return func.to_char(column, 'YYYY-MM' if granularity == 'month' else 'YYYY')
+        return func.strftime('%Y-%m' if granularity == 'month' else '%Y', column)
+
+    def trends(self, granularity: str = 'month', start: Optional[date] = None, end: Optional[date] = None,
+               unit_id: Optional[int] = None, service_type: Optional[str] = None,
+               status: Optional[str] = None) -> List[Dict[str, any]]:
+        """Séries par mois ou par année: entrées par statut et montant des demandes concernées
+        (par statut: une demande compte dans chaque statut traversé), durée de traitement"""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f'Granularité inconnue: {granularity}')
+
+        def filtered(model, *columns):
+            period = self._period(model.day, granularity).label('period')
+            statement = select(period, *columns)
+            if start is not None:
+                statement = statement.where(model.day >= start)
+            if end is not None:
+                statement = statement.where(model.day < end)
+            if unit_id is not None:
+                statement = statement.where(model.unite_consulaire_id == unit_id)
+            if service_type:
+                statement = statement.where(model.service_type == service_type)
+            if status:
+                statement = statement.where(model.status == status)
+            return statement
+
+        stats = ApplicationDailyStats
+        rows = db.session.execute(
+            filtered(stats, stats.status, func.sum(stats.transitions), func.sum(stats.revenue),
+                     func.sum(stats.processing_count), func.sum(stats.processing_seconds))
+            .group_by('period', stats.status)
+        ).all()
+        durations = ApplicationDailyDuration
+        buckets = db.session.execute(
+            filtered(durations, durations.bucket, func.sum(durations.count)).group_by('period', durations.bucket)
+        ).all()
+
+        periods = {}
+        for period, row_status, transitions, revenue, processed, seconds in rows:
+            entry = periods.setdefault(period, {'period': period, 'statuses': {}, 'decisions': 0,
+                                                'processing_seconds': 0.0, 'histogram': {}})
+            entry['statuses'][row_status] = {'count': int(transitions), 'revenue': round(revenue or 0.0, 2)}
+            entry['decisions'] += int(processed or 0)
+            entry['processing_seconds'] += seconds or 0.0
+        for period, bucket, count in buckets:
+            if period in periods:
+                periods[period]['histogram'][bucket] = int(count)
+
+        series = []
+        for period in sorted(periods):
+            entry = periods[period]
+            decisions = entry.pop('decisions')
+            seconds = entry.pop('processing_seconds')
+            histogram = entry.pop('histogram')
+            entry['processing'] = {
+                'decisions': decisions,
+                'avg_hours': round(seconds / decisions / 3600, 1) if decisions else None,
+                'median_hours': median_hours(histogram),
+            }
+            series.append(entry)
+        return series
+
+# Instance globale du service de rapports
+reporting_service = ReportingService()
+
+@event.listens_for(Session, 'after_flush')
+def record_status_transitions(session, flush_context):
+    reporting_service.record_transitions(session)
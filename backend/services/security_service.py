@@ -3,12 +3,20 @@ import base64
 import hashlib
 import hmac
 import secrets
+import threading
 from typing import Optional
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from app import app
-import re
+from .audit_service import audit_service
+from .password_service import password_service
+from backend.utils.sanitizer import sanitize_value
+
+# Clés Fernet dérivées, partagées par toutes les instances du processus
+# (héritées par les workers si le maître les a calculées avant le fork)
+derived_keys = {}
+derivation_lock = threading.Lock()
 
 class SecurityService:
     def __init__(self):
@@ -16,7 +24,21 @@ class SecurityService:
         if not self.encryption_key:
             app.logger.error('ENCRYPTION_KEY non configurée - Génération automatique')
             self.encryption_key = Fernet.generate_key().decode()
-        self.fernet = self._setup_encryption()
+    
+    @property
+    def fernet(self):
+        """Fernet dérivé au premier usage, une seule fois par processus"""
+        fernet = derived_keys.get(self.encryption_key)
+        if fernet is None and self.encryption_key not in derived_keys:
+            with derivation_lock:
+                if self.encryption_key not in derived_keys:
+                    derived_keys[self.encryption_key] = self._setup_encryption()
+                fernet = derived_keys[self.encryption_key]
+        return fernet
+    
+    def warm_up(self):
+        """Dériver la clé immédiatement (ex. dans le maître gunicorn avec --preload)"""
+        return self.fernet is not None
         
     def _setup_encryption(self):
         try:
@@ -37,8 +59,8 @@ class SecurityService:
         if not self.fernet or not data:
             return data
         try:
-            encrypted = self.fernet.encrypt(data.encode('utf-8'))
-            return base64.urlsafe_b64encode(encrypted).decode('utf-8')
+            # Le jeton Fernet est déjà en base64 url-safe: pas de second encodage
+            return self.fernet.encrypt(data.encode('utf-8')).decode('utf-8')
         except Exception as e:
             app.logger.error(f'Erreur chiffrement: {e}')
             return data
@@ -47,24 +69,20 @@ class SecurityService:
         if not self.fernet or not encrypted_data:
             return encrypted_data
         try:
-            decoded = base64.urlsafe_b64decode(encrypted_data.encode('utf-8'))
-            decrypted = self.fernet.decrypt(decoded)
-            return decrypted.decode('utf-8')
+            token = encrypted_data.encode('utf-8')
+            if not token.startswith(b'gAAAAA'):
+                # Ancien format (jeton Fernet encodé une seconde fois en base64)
+                token = base64.urlsafe_b64decode(token)
+            return self.fernet.decrypt(token).decode('utf-8')
         except Exception as e:
             app.logger.error(f'Erreur déchiffrement: {e}')
             return encrypted_data
     
     def hash_password_secure(self, password: str) -> str:
-        import bcrypt
-        salt = bcrypt.gensalt(rounds=12)
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        return password_service.hash_password(password)
     
     def verify_password_secure(self, password: str, hashed: str) -> bool:
-        import bcrypt
-        try:
-            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
-        except:
-            return False
+        return password_service.check_password(hashed, password)
     
     def generate_csrf_token(self) -> str:
         return secrets.token_urlsafe(32)
@@ -73,16 +91,13 @@ class SecurityService:
         return hmac.compare_digest(token, session_token)
     
     def sanitize_input(self, input_data: str) -> str:
-        if not input_data:
-            return ""
-        dangerous_tags = ['<script', '<iframe', '<object', '<embed', '<link', '<meta']
-        cleaned = input_data
-        for tag in dangerous_tags:
-            cleaned = re.sub(tag, '&lt;' + tag[1:], cleaned, flags=re.IGNORECASE)
-        cleaned = cleaned.replace('<', '&lt;')
-        cleaned = cleaned.replace('>', '&gt;')
-        cleaned = cleaned.replace('"', '&quot;')
-        cleaned = cleaned.replace("'", '&#x27;')
-        return cleaned
+        return sanitize_value(input_data)
+    
+    def log_security_event(self, event_type: str, user_id: Optional[int], details: str, sync: bool = False):
+        audit_service.record(user_id, f'security_{event_type}', 'security', None, details, sync=sync)
 
 security_service = SecurityService()
+
+# ENCRYPTION_WARMUP=1 avec gunicorn --preload: dérivation unique dans le maître, partagée par fork
+if os.environ.get('ENCRYPTION_WARMUP') == '1':
+    security_service.warm_up()
@@ -0,0 +1,311 @@
+# Service de suivi des échéances de traitement (SLA)
+# L'échéance est fixée à la soumission (délai de l'unité, sinon celui du service) et
+# suspendue pendant documents_requis. Un balayage périodique escalade les dossiers en
+# retard et tient à jour sla_unit_stats, lu tel quel par le tableau de bord superviseur.
+import os
+import time
+import threading
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou inter-processus
+    fcntl = None
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import and_, bindparam, case, event, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import app, db
+from backend.models import (Application, Service, UniteConsulaire_Service, StatusHistory, SlaUnitStats)
+
+# Délai de traitement (jours) d'un type de demande sans service configuré
+DEFAULT_DELAI_DAYS = 7
+OPEN_STATUSES = ('soumise', 'en_traitement')
+DECISION_STATUSES = ('validee', 'rejetee')
+PAUSED_STATUS = 'documents_requis'
+
+# Cache local au processus: unité -> (expiration, {type de service: délai en jours})
+delay_cache = {}
+
+class SlaService:
+    def __init__(self):
+        # Intervalle du balayage (secondes); 0 le désactive dans les workers
+        self.sweep_interval = float(os.environ.get('SLA_SWEEP_INTERVAL', 300))
+        self.batch_size = int(os.environ.get('SLA_ESCALATION_BATCH', 200))
+        self.max_batches = int(os.environ.get('SLA_ESCALATION_MAX_BATCHES', 20))
+        self.at_risk_hours = float(os.environ.get('SLA_AT_RISK_HOURS', 24))
+        self.delay_cache_ttl = int(os.environ.get('SLA_DELAY_CACHE_TTL', 300))
+        self.lock_file = os.environ.get('SLA_SWEEP_LOCK', os.path.join(app.instance_path, 'sla_sweep.lock'))
+        self._reset()
+
+    def _reset(self):
+        # Un thread de balayage par processus (les workers gunicorn sont forkés)
+        self._pid = os.getpid()
+        self._worker = None
+
+    # ---- Échéances ----
+
+    def unit_delays(self, unit_id: int, session=None) -> Dict[str, int]:
+        """Délai de traitement par type de demande: délai de l'unité, sinon celui du service"""
+        now = time.monotonic()
+        cached = delay_cache.get(unit_id)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        session = session or db.session
+        rows = session.execute(
+            select(Service.code, UniteConsulaire_Service.delai_personnalise, Service.delai_traitement)
+            .outerjoin(UniteConsulaire_Service, and_(
+                UniteConsulaire_Service.service_id == Service.id,
+                UniteConsulaire_Service.unite_consulaire_id == unit_id
+            ))
+        ).all()
+        delays = {code: custom or default or DEFAULT_DELAI_DAYS for code, custom, default in rows}
+        delay_cache[unit_id] = (now + self.delay_cache_ttl, delays)
+        return delays
+
+    def invalidate_delays(self, unit_id: Optional[int] = None):
+        if unit_id is None:
+            delay_cache.clear()
+        else:
+            delay_cache.pop(unit_id, None)
+
+    def compute_due_at(self, application, session=None) -> datetime:
+        delays = self.unit_delays(application.unite_consulaire_id, session)
+        submitted_at = application.created_at or datetime.utcnow()
+        return submitted_at + timedelta(days=delays.get(application.service_type, DEFAULT_DELAI_DAYS))
+
+    def track_changes(self, session):
+        """Échéance des nouvelles demandes, suspension et décision (avant le flush)"""
+        now = datetime.utcnow()
+        decisions = {}
+        with session.no_autoflush:
+            for obj in list(session.new) + list(session.dirty):
+                if not isinstance(obj, Application) or not obj.unite_consulaire_id:
+                    continue
+                if obj in session.new:
+                    # Même instant pour la soumission et le point de départ du délai
+                    if obj.created_at is None:
+                        obj.created_at = now
+                    if obj.due_at is None:
+                        obj.due_at = self.compute_due_at(obj, session)
+                    continue
+                history = db.inspect(obj).attrs.status.history
+                if history.has_changes():
+                    old_status = history.deleted[0] if history.deleted else None
+                    self._transition(obj, old_status, now, session, decisions)
+        session.info['sla_decisions'] = decisions
+
+    def _transition(self, application, old_status, now, session, decisions):
+        if old_status == PAUSED_STATUS and application.sla_paused_at is not None:
+            # Reprise: l'échéance est repoussée du temps passé en attente de documents
+            if application.due_at is not None:
+                application.due_at += now - application.sla_paused_at
+            application.sla_paused_at = None
+
+        if application.status == PAUSED_STATUS:
+            application.sla_paused_at = now
+        elif application.status in DECISION_STATUSES and application.sla_met is None:
+            if application.due_at is None:
+                application.due_at = self.compute_due_at(application, session)
+            application.sla_met = now <= application.due_at
+            counts = decisions.setdefault(application.unite_consulaire_id, {'completed': 0, 'completed_on_time': 0})
+            counts['completed'] += 1
+            counts['completed_on_time'] += int(application.sla_met)
+
+    # ---- Compteurs par unité ----
+
+    def _upsert_stats(self, connection, unit_id, add=None, values=None):
+        """Incrémenter (add) ou fixer (values) les compteurs d'une unité en une instruction"""
+        table = SlaUnitStats.__table__
+        add, values = add or {}, values or {}
+        # INSERT ... ON CONFLICT: SQLite et PostgreSQL, les deux moteurs pris en charge
+        insert = postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert
+        statement = insert(table).values(unite_consulaire_id=unit_id, **add, **values)
+        changes = {name: table.c[name] + statement.excluded[name] for name in add}
+        changes.update({name: statement.excluded[name] for name in values})
+        connection.execute(statement.on_conflict_do_update(index_elements=[table.c.unite_consulaire_id], set_=changes))
+
+    def record_decisions(self, session):
+        decisions = session.info.pop('sla_decisions', None)
+        if not decisions:
+            return
+        connection = session.connection()
+        for unit_id, counts in decisions.items():
+            self._upsert_stats(connection, unit_id, add=counts)
+
+    # ---- Balayage périodique ----
+
+    def sweep(self) -> Dict[str, any]:
+        """Escalader les dossiers en retard par lots, puis recompter retards et risques par unité"""
+        from .notification_service import NotificationService
+
+        now = datetime.utcnow()
+        escalated = 0
+        for _ in range(self.max_batches):
+            rows = db.session.execute(
+                select(Application.id, Application.unite_consulaire_id, Application.reference_number)
+                .where(Application.status.in_(OPEN_STATUSES),
+                       Application.due_at < now,
+                       Application.escalated_at.is_(None))
+                .order_by(Application.due_at)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                break
+
+            by_unit = {}
+            for row in rows:
+                by_unit.setdefault(row.unite_consulaire_id, []).append(row)
+            for unit_id, overdue in by_unit.items():
+                NotificationService.notify_sla_escalation(unit_id, overdue)
+                self._upsert_stats(db.session.connection(), unit_id, add={'escalated': len(overdue)})
+            db.session.execute(
+                update(Application).where(Application.id.in_([row.id for row in rows]))
+                .values(escalated_at=now, updated_at=Application.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            escalated += len(rows)
+            if len(rows) < self.batch_size:
+                break
+
+        units = self.refresh_open_counts(now)
+        if escalated:
+            app.logger.info(f'SLA: {escalated} dossiers en retard escaladés')
+        return {'escalated': escalated, 'units': units, 'swept_at': now.isoformat()}
+
+    def refresh_open_counts(self, now: Optional[datetime] = None) -> int:
+        """Dossiers ouverts en retard et à risque par unité (parcours de l'index statut/échéance)"""
+        now = now or datetime.utcnow()
+        horizon = now + timedelta(hours=self.at_risk_hours)
+        rows = db.session.execute(
+            select(Application.unite_consulaire_id,
+                   func.sum(case((Application.due_at < now, 1), else_=0)),
+                   func.sum(case((Application.due_at >= now, 1), else_=0)))
+            .where(Application.status.in_(OPEN_STATUSES), Application.due_at < horizon)
+            .group_by(Application.unite_consulaire_id)
+        ).all()
+
+        connection = db.session.connection()
+        connection.execute(update(SlaUnitStats.__table__).values(open_overdue=0, open_at_risk=0, swept_at=now))
+        for unit_id, overdue, at_risk in rows:
+            self._upsert_stats(connection, unit_id, values={
+                'open_overdue': int(overdue or 0), 'open_at_risk': int(at_risk or 0), 'swept_at': now
+            })
+        db.session.commit()
+        return len(rows)
+
+    def sweep_if_due(self) -> Optional[Dict[str, any]]:
+        """Balayage si aucun worker ne l'a fait depuis sweep_interval (un seul à la fois)"""
+        os.makedirs(os.path.dirname(self.lock_file), exist_ok=True)
+        with open(self.lock_file, 'a') as handle:
+            try:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            try:
+                last = db.session.scalar(select(func.max(SlaUnitStats.swept_at)))
+                db.session.commit()
+                if last and (datetime.utcnow() - last).total_seconds() < self.sweep_interval * 0.9:
+                    return None
+                return self.sweep()
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def ensure_running(self):
+        if self.sweep_interval <= 0:
+            return
+        if self._pid != os.getpid():
+            self._reset()
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._run_sweeper, name='sla-sweeper', daemon=True)
+        self._worker.start()
+
+    def _run_sweeper(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.sweep_interval)
+            try:
+                with app.app_context():
+                    self.sweep_if_due()
+            except Exception as e:
+                app.logger.error(f'Erreur balayage SLA: {e}')
+
+    # ---- Migration ----
+
+    def backfill(self, batch_size: int = 500) -> int:
+        """Échéance et respect du délai des demandes antérieures au suivi SLA, puis compteurs"""
+        table = Application.__table__
+        fill = update(table).where(table.c.id == bindparam('b_id')).values(
+            due_at=bindparam('b_due_at'), sla_met=bindparam('b_sla_met'),
+            sla_paused_at=bindparam('b_paused_at'), updated_at=table.c.updated_at)
+        now = datetime.utcnow()
+        last_id = 0
+        filled = 0
+        while True:
+            applications = db.session.execute(
+                select(Application.id, Application.unite_consulaire_id, Application.service_type,
+                       Application.status, Application.created_at)
+                .where(Application.id > last_id, Application.due_at.is_(None))
+                .order_by(Application.id).limit(batch_size)
+            ).all()
+            if not applications:
+                break
+            decided_at = dict(db.session.execute(
+                select(StatusHistory.application_id, func.min(StatusHistory.timestamp))
+                .where(StatusHistory.application_id.in_([a.id for a in applications]),
+                       StatusHistory.new_status.in_(DECISION_STATUSES))
+                .group_by(StatusHistory.application_id)
+            ).all())
+            params = []
+            for a in applications:
+                due_at = self.compute_due_at(a)
+                decision = decided_at.get(a.id)
+                params.append({
+                    'b_id': a.id, 'b_due_at': due_at,
+                    'b_sla_met': decision <= due_at if decision else None,
+                    'b_paused_at': now if a.status == PAUSED_STATUS else None
+                })
+            db.session.execute(fill, params)
+            db.session.commit()
+            filled += len(applications)
+            last_id = applications[-1].id
+
+        self.rebuild_stats()
+        app.logger.info(f'SLA: échéances calculées pour {filled} demandes existantes')
+        return filled
+
+    def rebuild_stats(self):
+        """Recompter décisions et escalades de chaque unité (parcours complet, migration uniquement)"""
+        rows = db.session.execute(
+            select(Application.unite_consulaire_id,
+                   func.count(Application.sla_met),
+                   func.sum(case((Application.sla_met == True, 1), else_=0)),
+                   func.count(Application.escalated_at))
+            .group_by(Application.unite_consulaire_id)
+        ).all()
+        connection = db.session.connection()
+        for unit_id, completed, on_time, escalated in rows:
+            self._upsert_stats(connection, unit_id, values={
+                'completed': completed, 'completed_on_time': int(on_time or 0), 'escalated': escalated
+            })
+        db.session.commit()
+        self.refresh_open_counts()
+
+# Instance globale du service SLA
+sla_service = SlaService()
+
+@event.listens_for(Session, 'before_flush')
+def track_sla(session, flush_context, instances):
+    sla_service.track_changes(session)
+
+@event.listens_for(Session, 'after_flush')
+def record_sla_decisions(session, flush_context):
+    sla_service.record_decisions(session)
+
+@app.before_request
+def start_sla_sweeper():
+    sla_service.ensure_running()
@@ -0,0 +1,163 @@
+# Service de collecte du statut système (mises à jour Git, sauvegardes, chiffrement)
+# Le statut est rafraîchi en arrière-plan et conservé dans un enregistrement partagé
+# par les workers; les pages et l'API le lisent sans attendre Git ni le disque.
+import os
+import copy
+import json
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+from app import app
+
+# Cache local au processus: (mtime du fichier de statut, statut)
+status_cache = {}
+
+class SystemStatusService:
+    def __init__(self):
+        self.refresh_interval = int(os.environ.get('STATUS_REFRESH_INTERVAL', 900))
+        self.status_file = os.environ.get('STATUS_FILE', os.path.join(app.instance_path, 'system_status.json'))
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def get_status(self) -> Dict[str, any]:
+        """Retourner le dernier statut collecté (sans appel réseau)
+
+        Si aucun statut n'existe ou s'il est périmé, un rafraîchissement
+        est lancé en arrière-plan et le statut courant est retourné tel quel.
+        """
+        status = self._load()
+        refreshed_at = status.get('refreshed_at')
+        if refreshed_at is None or \
+                (datetime.utcnow() - datetime.fromisoformat(refreshed_at)).total_seconds() > self.refresh_interval:
+            self.refresh_async()
+        status['refreshing'] = self.is_refreshing()
+        return status
+
+    def refresh_async(self) -> bool:
+        """Lancer un rafraîchissement en arrière-plan (un seul à la fois par processus)"""
+        with self._lock:
+            if self.is_refreshing():
+                return False
+            self._worker = threading.Thread(target=self._run_refresh, name='status-collector', daemon=True)
+            self._worker.start()
+        return True
+
+    def is_refreshing(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def refresh(self) -> Dict[str, any]:
+        """Collecter le statut complet et l'enregistrer (bloquant)"""
+        from .update_service import update_service
+        from .security_service import security_service
+
+        previous = self._load()
+        status = {'errors': {}}
+
+        try:
+            status['security'] = {
+                'encryption_active': security_service.fernet is not None,
+                'encryption_status': 'Actif' if security_service.fernet else 'Inactif'
+            }
+        except Exception as e:
+            status['errors']['security'] = str(e)
+            status['security'] = previous.get('security', self._empty_status()['security'])
+
+        try:
+            status['backups'] = self._collect_backups()
+        except Exception as e:
+            status['errors']['backups'] = str(e)
+            status['backups'] = previous.get('backups', self._empty_status()['backups'])
+
+        updates = update_service.check_for_updates()
+        if updates.get('error'):
+            status['errors']['updates'] = updates['error']
+            # Garder la dernière information connue si le dépôt distant est injoignable
+            if previous.get('updates', {}).get('current_commit'):
+                updates = dict(previous['updates'], error=updates['error'])
+        status['updates'] = updates
+
+        status['refreshed_at'] = datetime.utcnow().isoformat()
+        self._save(status)
+        return status
+
+    def refresh_backups(self):
+        """Mettre à jour uniquement la partie sauvegardes (après création ou restauration)"""
+        try:
+            status = self._load()
+            status['backups'] = self._collect_backups()
+            self._save(status)
+        except Exception as e:
+            app.logger.error(f'Erreur actualisation statut des sauvegardes: {e}')
+
+    def _collect_backups(self) -> Dict[str, any]:
+        from .backup_service import backup_service
+
+        backups = backup_service.list_backups()
+        return {
+            'count': len(backups),
+            'total_size_mb': round(sum(b['size_mb'] for b in backups), 2),
+            'latest': [{
+                'filename': b['filename'],
+                'date': b['date'].isoformat(),
+                'size_mb': b['size_mb']
+            } for b in backups[:5]]
+        }
+
+    def _run_refresh(self):
+        try:
+            with app.app_context():
+                self.refresh()
+        except Exception as e:
+            app.logger.error(f'Erreur collecte du statut système: {e}')
+
+    def _load(self) -> Dict[str, any]:
+        try:
+            mtime = os.stat(self.status_file).st_mtime_ns
+        except OSError:
+            return self._empty_status()
+
+        cached = status_cache.get(self.status_file)
+        if cached and cached[0] == mtime:
+            return copy.deepcopy(cached[1])
+
+        try:
+            with open(self.status_file, 'r') as f:
+                status = json.load(f)
+        except (OSError, ValueError) as e:
+            app.logger.warning(f'Statut système illisible: {e}')
+            return self._empty_status()
+
+        status_cache[self.status_file] = (mtime, status)
+        return copy.deepcopy(status)
+
+    def _save(self, status: Dict[str, any]):
+        os.makedirs(os.path.dirname(self.status_file) or '.', exist_ok=True)
+        tmp_path = f'{self.status_file}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f)
+        os.replace(tmp_path, self.status_file)
+        status_cache.pop(self.status_file, None)
+
+    def _empty_status(self) -> Dict[str, any]:
+        return {
+            'security': {'encryption_active': None, 'encryption_status': 'Inconnu'},
+            'backups': {'count': 0, 'total_size_mb': 0, 'latest': []},
+            'updates': {
+                'updates_available': False,
+                'current_commit': None,
+                'latest_commit': None,
+                'commits_behind': 0,
+                'changes': []
+            },
+            'errors': {},
+            'refreshed_at': None
+        }
+
+    def schedule_status_refresh(self, interval_seconds: Optional[int] = None):
+        """Programmer la collecte périodique du statut"""
+        import schedule
+        schedule.every(interval_seconds or self.refresh_interval).seconds.do(self.refresh_async)
+        app.logger.info('Collecte périodique du statut système programmée')
+
+# Instance globale du collecteur de statut
+status_service = SystemStatusService()
@@ -0,0 +1,202 @@
+# Service de suivi public des demandes (/track)
+# Maintient une vue dénormalisée par numéro de référence, servie depuis un cache court
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import app, db
+from backend.models import Application, StatusHistory, TrackingSnapshot, User
+
+# Cache local au processus: référence -> (expiration, instantané). Les références
+# inconnues ne sont pas mises en cache: des numéros arbitraires ne peuvent pas le remplir
+tracking_cache = {}
+
+class TrackingService:
+    def __init__(self):
+        self.cache_ttl = int(os.environ.get('TRACKING_CACHE_TTL', 30))
+        self.cache_max_entries = int(os.environ.get('TRACKING_CACHE_MAX_ENTRIES', 10000))
+
+    def get_snapshot(self, reference_number):
+        """Retourner l'instantané de suivi d'une référence (dict) ou None
+
+        Un succès de cache ne coûte aucune requête; sinon une seule lecture
+        par clé primaire sur tracking_snapshot (aucune écriture: /track lit le réplica).
+        """
+        now = time.monotonic()
+        cached = tracking_cache.get(reference_number)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        snapshot = db.session.get(TrackingSnapshot, reference_number)
+        if snapshot is None:
+            return None
+
+        data = self._to_dict(snapshot)
+        self._cache_put(reference_number, data, now)
+        return data
+
+    def refresh_snapshot(self, application, pending_history=(), session=None):
+        """Reconstruire l'instantané d'une demande dans la session courante (sans commit)"""
+        session = session or db.session
+        with session.no_autoflush:
+            history = session.query(StatusHistory).filter_by(application_id=application.id).all()
+            entries = history + [h for h in pending_history if h not in history]
+            now = datetime.utcnow()
+            entries.sort(key=lambda h: h.timestamp or now, reverse=True)
+
+            authors = {}
+            for entry in entries:
+                if entry.changed_by and entry.changed_by not in authors:
+                    author = session.get(User, entry.changed_by)
+                    authors[entry.changed_by] = author.get_full_name() if author else None
+
+            unit = application.unite_consulaire
+            timeline = [{
+                'new_status': entry.new_status,
+                'comment': entry.comment,
+                'timestamp': (entry.timestamp or now).isoformat(),
+                'changed_by_name': authors.get(entry.changed_by)
+            } for entry in entries]
+
+            payload = {
+                'reference_number': application.reference_number,
+                'status': application.status,
+                'status_display': application.get_status_display(),
+                'service_display': application.get_service_display(),
+                'unite_nom': unit.nom if unit else None,
+                'unite_email': unit.email_principal if unit else None,
+                'unite_telephone': unit.telephone_principal if unit else None,
+                'history': timeline,
+                'submitted_at': application.created_at.isoformat() if application.created_at else None,
+                'updated_at': (application.updated_at or now).isoformat()
+            }
+            etag = hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+            snapshot = session.get(TrackingSnapshot, application.reference_number)
+            if snapshot is None:
+                snapshot = TrackingSnapshot(reference_number=application.reference_number,
+                                            application_id=application.id)
+                session.add(snapshot)
+
+        snapshot.status = payload['status']
+        snapshot.status_display = payload['status_display']
+        snapshot.service_display = payload['service_display']
+        snapshot.unite_nom = payload['unite_nom']
+        snapshot.unite_email = payload['unite_email']
+        snapshot.unite_telephone = payload['unite_telephone']
+        snapshot.history = json.dumps(timeline)
+        snapshot.submitted_at = application.created_at
+        snapshot.updated_at = application.updated_at or now
+        snapshot.etag = etag
+
+        tracking_cache.pop(application.reference_number, None)
+        return snapshot
+
+    def rebuild_all(self, batch_size=500):
+        """Reconstruire tous les instantanés (après import massif ou migration)"""
+        last_id = 0
+        rebuilt = 0
+        while True:
+            applications = Application.query.filter(Application.id > last_id)\
+                .order_by(Application.id).limit(batch_size).all()
+            if not applications:
+                break
+            for application in applications:
+                self.refresh_snapshot(application)
+            db.session.commit()
+            rebuilt += len(applications)
+            last_id = applications[-1].id
+        tracking_cache.clear()
+        app.logger.info(f'Instantanés de suivi reconstruits: {rebuilt}')
+        return rebuilt
+
+    def backfill(self, batch_size=500):
+        """Créer les instantanés manquants (demandes antérieures au modèle de suivi)"""
+        last_id = 0
+        created = 0
+        while True:
+            applications = Application.query\
+                .outerjoin(TrackingSnapshot, TrackingSnapshot.reference_number == Application.reference_number)\
+                .filter(TrackingSnapshot.reference_number.is_(None),
+                        Application.reference_number.isnot(None),
+                        Application.id > last_id)\
+                .order_by(Application.id).limit(batch_size).all()
+            if not applications:
+                break
+            for application in applications:
+                self.refresh_snapshot(application)
+            db.session.commit()
+            created += len(applications)
+            last_id = applications[-1].id
+        app.logger.info(f'Instantanés de suivi créés: {created}')
+        return created
+
+    def _cache_put(self, reference_number, data, now):
+        if len(tracking_cache) >= self.cache_max_entries:
+            for key, (expires, _) in list(tracking_cache.items()):
+                if expires <= now:
+                    tracking_cache.pop(key, None)
+            if len(tracking_cache) >= self.cache_max_entries:
+                tracking_cache.clear()
+        tracking_cache[reference_number] = (now + self.cache_ttl, data)
+
+    def _to_dict(self, snapshot):
+        history = []
+        for entry in json.loads(snapshot.history or '[]'):
+            entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
+            history.append(entry)
+        return {
+            'reference_number': snapshot.reference_number,
+            'status': snapshot.status,
+            'status_display': snapshot.status_display,
+            'service_display': snapshot.service_display,
+            'unite_nom': snapshot.unite_nom,
+            'unite_email': snapshot.unite_email,
+            'unite_telephone': snapshot.unite_telephone,
+            'history': history,
+            'submitted_at': snapshot.submitted_at,
+            'updated_at': snapshot.updated_at,
+            'etag': snapshot.etag
+        }
+
+# Instance globale du service de suivi
+tracking_service = TrackingService()
+
+@event.listens_for(Session, 'before_flush')
+def refresh_tracking_snapshots(session, flush_context, instances):
+    """Maintenir les instantanés à chaque changement de statut, dans la même transaction"""
+    pending_history = {}
+    for obj in session.new:
+        if isinstance(obj, StatusHistory) and obj.application_id:
+            pending_history.setdefault(obj.application_id, []).append(obj)
+
+    changed = {}
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Application) and obj.id and obj.reference_number:
+            if obj in session.new or db.inspect(obj).attrs.status.history.has_changes():
+                changed[obj.id] = obj
+
+    with session.no_autoflush:
+        for application_id in pending_history:
+            if application_id not in changed:
+                application = session.get(Application, application_id)
+                if application is not None:
+                    changed[application_id] = application
+
+    for application_id, application in changed.items():
+        tracking_service.refresh_snapshot(application, pending_history.get(application_id, ()), session=session)
+
+@event.listens_for(Session, 'after_flush')
+def create_tracking_snapshots(session, flush_context):
+    """Instantané des nouvelles demandes, une fois leur id attribué
+
+    Ajouté à la session, il part au flush suivant de la même transaction (commit compris).
+    """
+    with session.no_autoflush:
+        for obj in list(session.new):
+            if isinstance(obj, Application) and obj.id and obj.reference_number:
+                if session.get(TrackingSnapshot, obj.reference_number) is None:
+                    tracking_service.refresh_snapshot(obj, session=session)
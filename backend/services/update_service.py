@@ -6,15 +6,15 @@ import shutil
 import importlib.util
 from datetime import datetime
 from typing import Dict, List, Optional
-from git import Repo, InvalidGitRepositoryError
 from app import app, db
-from models import AuditLog
+from .audit_service import audit_service
 
 class UpdateService:
     def __init__(self):
         self.repo_path = '.'
         self.backup_before_update = True
         self.migration_scripts_dir = 'migrations'
+        self.fetch_timeout = int(os.environ.get('GIT_FETCH_TIMEOUT', 20))
         self.ensure_migration_directory()
         
     def ensure_migration_directory(self):
@@ -22,6 +22,11 @@ class UpdateService:
         if not os.path.exists(self.migration_scripts_dir):
             os.makedirs(self.migration_scripts_dir)
     
+    def _open_repo(self):
+        # GitPython n'est chargé qu'à la première opération Git
+        from git import Repo
+        return Repo(self.repo_path)
+
     def check_for_updates(self) -> Dict[str, any]:
         """Vérifier s'il y a des mises à jour disponibles"""
         result = {
@@ -35,14 +40,14 @@ class UpdateService:
         try:
             # Initialiser ou ouvrir le repository Git
             if os.path.exists('.git'):
-                repo = Repo(self.repo_path)
+                repo = self._open_repo()
             else:
                 app.logger.warning('Repository Git non initialisé')
                 return result
             
             # Récupérer les dernières informations du remote
             origin = repo.remotes.origin
-            origin.fetch()
+            origin.fetch(kill_after_timeout=self.fetch_timeout)
             
             # Comparer les commits
             current_commit = repo.head.commit
@@ -87,7 +92,7 @@ class UpdateService:
         try:
             # Étape 1: Créer une sauvegarde avant la mise à jour
             if create_backup:
-                from backup_service import backup_service
+                from .backup_service import backup_service
                 backup_result = backup_service.create_full_backup(include_files=True)
                 result['backup_created'] = backup_result['success']
                 result['rollback_available'] = backup_result['success']
@@ -98,7 +103,7 @@ class UpdateService:
                     return result
             
             # Étape 2: Récupérer les modifications depuis Git
-            repo = Repo(self.repo_path)
+            repo = self._open_repo()
             
             # Sauvegarder les fichiers de configuration critiques
             config_backup = self._backup_critical_configs()
@@ -125,12 +130,13 @@ class UpdateService:
             result['success'] = True
             
             # Logger l'événement
-            AuditLog.log_action(
+            audit_service.record(
                 user_id=None,
                 action='system_update_completed',
-                table_name='system',
-                record_id=None,
-                details=f'Mise à jour système effectuée avec succès'
+                resource='system',
+                resource_id=None,
+                details=f'Mise à jour système effectuée avec succès',
+                sync=True
             )
             
             app.logger.info('Mise à jour système réussie')
@@ -328,7 +334,7 @@ def down(db):
     
     def rollback_to_backup(self, backup_filename: str) -> Dict[str, any]:
         """Effectuer un rollback vers une sauvegarde"""
-        from backup_service import backup_service
+        from .backup_service import backup_service
         
         app.logger.warning(f'Début du rollback vers: {backup_filename}')
         
@@ -339,12 +345,13 @@ def down(db):
             self._restart_services()
             
             # Logger l'événement
-            AuditLog.log_action(
+            audit_service.record(
                 user_id=None,
                 action='system_rollback_completed',
-                table_name='system',
-                record_id=None,
-                details=f'Rollback effectué vers: {backup_filename}'
+                resource='system',
+                resource_id=None,
+                details=f'Rollback effectué vers: {backup_filename}',
+                sync=True
             )
         
         return result
@@ -363,16 +370,15 @@ def down(db):
         
         if updates['updates_available']:
             # Notifier les superviseurs qu'une mise à jour est disponible
-            from models import User, Notification
+            from backend.models import User, Notification
             superviseurs = User.query.filter_by(role='superviseur', active=True).all()
             
             for superviseur in superviseurs:
                 notification = Notification(
                     user_id=superviseur.id,
-                    type_notification='system_update',
+                    type='system_update',
                     title='Mise à jour système disponible',
-                    message=f'{updates["commits_behind"]} nouveaux commits disponibles',
-                    reference_id=None
+                    message=f'{updates["commits_behind"]} nouveaux commits disponibles'
                 )
                 db.session.add(notification)
             
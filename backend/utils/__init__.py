@@ -2,5 +2,7 @@ from .helpers import (
     generate_pdf_document, send_notification_email, log_audit, 
     allowed_file, get_file_size_mb, get_user_consular_unit
 )
+from .sanitizer import sanitize_value, sanitize_exempt
 
-__all__ = ['generate_pdf_document', 'send_notification_email', 'log_audit', 'allowed_file', 'get_file_size_mb', 'get_user_consular_unit']
+__all__ = ['generate_pdf_document', 'send_notification_email', 'log_audit', 'allowed_file', 'get_file_size_mb', 'get_user_consular_unit',
+           'sanitize_value', 'sanitize_exempt']
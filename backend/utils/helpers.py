@@ -1,17 +1,21 @@
 import os
-import qrcode
+import time
 from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
 from flask_mail import Message
-from app import mail, app, db
-from backend.models import AuditLog
-from flask import request
+from app import mail, app
+from backend.services.audit_service import audit_service
+from backend.utils.metrics import pdf_render_duration
 
 def generate_pdf_document(application):
+    # reportlab et qrcode (avec PIL) ne sont chargés qu'à la première génération
+    import qrcode
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+
+    start = time.perf_counter()
     try:
         filename = f"document_{application.reference_number}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
@@ -109,9 +113,11 @@ def generate_pdf_document(application):
         if os.path.exists(qr_path):
             os.remove(qr_path)
         
+        pdf_render_duration.observe(time.perf_counter() - start, outcome='success')
         return pdf_path
         
     except Exception as e:
+        pdf_render_duration.observe(time.perf_counter() - start, outcome='error')
         app.logger.error(f"Error generating PDF: {e}")
         return None
 
@@ -129,21 +135,9 @@ def send_notification_email(recipient, subject, body):
         app.logger.error(f"Error sending email: {e}")
         return False
 
-def log_audit(user_id, action, resource, resource_id, details=None):
-    try:
-        audit_log = AuditLog(
-            user_id=user_id,
-            action=action,
-            resource=resource,
-            resource_id=resource_id,
-            details=details,
-            ip_address=request.remote_addr if request else None,
-            user_agent=request.headers.get('User-Agent') if request else None
-        )
-        db.session.add(audit_log)
-        db.session.commit()
-    except Exception as e:
-        app.logger.error(f"Error logging audit: {e}")
+def log_audit(user_id, action, resource, resource_id, details=None, sync=False):
+    """Journaliser une action (bufferisé; sync=True pour les événements critiques)"""
+    audit_service.record(user_id, action, resource, resource_id, details, sync=sync)
 
 def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx'}
@@ -0,0 +1,338 @@
+# Registre de métriques en mémoire, exposé au format texte Prometheus sur /metrics
+# Chaque worker publie périodiquement ses valeurs dans un répertoire partagé
+# (METRICS_DIR); le worker qui répond à /metrics fusionne les fichiers de tous les workers.
+import os
+import json
+import time
+import atexit
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from app import app
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=(), multiprocess='sum'):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Agrégation entre workers des jauges: 'sum' (tous) ou 'livesum' (workers vivants)
+        self.multiprocess = multiprocess
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name}: étiquettes attendues {self.labelnames}, reçues {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        return [[list(key), value] for key, value in self._values.items()]
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            # [compteurs par intervalle (dernier: +Inf)..., somme, nombre]
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        return [[list(key), list(series)] for key, series in self._values.items()]
+
+class MetricsRegistry:
+    def __init__(self):
+        self.directory = os.environ.get('METRICS_DIR', os.path.join(app.instance_path, 'metrics'))
+        self.flush_interval = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+        self.token = os.environ.get('METRICS_TOKEN')
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self._started = time.time_ns()
+        self._last_flush = 0.0
+        self._atexit = False
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'Métrique déjà enregistrée: {metric.name}')
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), multiprocess='livesum'):
+        return self._register(Gauge(self, name, documentation, labelnames, multiprocess))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    # ---- Publication multi-workers ----
+
+    @property
+    def worker_file(self):
+        # pid + instant de démarrage: un pid recyclé n'écrase pas les totaux d'un ancien worker
+        return os.path.join(self.directory, f'{os.getpid()}-{self._started}.json')
+
+    def snapshot(self):
+        with self.lock:
+            return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def flush(self):
+        """Écrire les valeurs de ce worker (écriture atomique)"""
+        self._last_flush = time.monotonic()
+        if not self._atexit:
+            atexit.register(self.flush)
+            self._atexit = True
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f'{self.worker_file}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'pid': os.getpid(), 'metrics': self.snapshot()}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.worker_file)
+        except OSError as e:
+            app.logger.warning(f'Métriques non publiées: {e}')
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    @contextmanager
+    def _directory_lock(self):
+        with open(os.path.join(self.directory, '.lock'), 'a') as handle:
+            try:
+                import fcntl
+            except ImportError:  # Windows: pas de verrou inter-processus
+                fcntl = None
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _merge_into(self, merged, snapshot, alive):
+        for name, series in snapshot.items():
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue
+            if metric.kind == 'gauge' and metric.multiprocess == 'livesum' and not alive:
+                continue
+            values = merged.setdefault(name, {})
+            for labels, value in series:
+                key = tuple(labels)
+                if metric.kind == 'histogram':
+                    current = values.get(key)
+                    values[key] = [a + b for a, b in zip(current, value)] if current else list(value)
+                else:
+                    values[key] = values.get(key, 0.0) + value
+
+    def collect(self):
+        """Valeurs fusionnées de tous les workers; les fichiers des workers arrêtés
+        sont repliés dans archive.json (compteurs et histogrammes uniquement)"""
+        self.flush()
+        merged = {}
+        with self._directory_lock():
+            archive_path = os.path.join(self.directory, 'archive.json')
+            try:
+                with open(archive_path, 'r') as f:
+                    archive = json.load(f)
+            except (OSError, ValueError):
+                archive = {}
+            archived = {}
+            self._merge_into(archived, archive, alive=False)
+
+            dead_files = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json') or name == 'archive.json':
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    with open(path, 'r') as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if path == self.worker_file or _pid_alive(data.get('pid', 0)):
+                    self._merge_into(merged, data['metrics'], alive=True)
+                else:
+                    self._merge_into(archived, data['metrics'], alive=False)
+                    dead_files.append(path)
+
+            if dead_files:
+                tmp_path = f'{archive_path}.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump({name: [[list(key), value] for key, value in values.items()]
+                               for name, values in archived.items()}, f, separators=(',', ':'))
+                os.replace(tmp_path, archive_path)
+                for path in dead_files:
+                    os.remove(path)
+
+        for name, values in archived.items():
+            target = merged.setdefault(name, {})
+            for key, value in values.items():
+                current = target.get(key)
+                if current is None:
+                    target[key] = value
+                elif isinstance(value, list):
+                    target[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target[key] = current + value
+        return merged
+
+    def exposition(self):
+        """Texte au format d'exposition Prometheus (version 0.0.4)"""
+        merged = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(merged.get(name, {}).items()):
+                if metric.kind != 'histogram':
+                    lines.append(f'{name}{_format_labels(metric.labelnames, key)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value[:-2]):
+                    cumulative += count
+                    labels = _format_labels(metric.labelnames, key, ('le', _format_value(bound)))
+                    lines.append(f'{name}_bucket{labels} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(metric.labelnames, key)} {_format_value(value[-2])}')
+                lines.append(f'{name}_count{_format_labels(metric.labelnames, key)} {_format_value(value[-1])}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics.values():
+                metric._values = {}
+
+# Instance globale du registre
+metrics = MetricsRegistry()
+
+# ---- Métriques de l'application ----
+
+http_request_duration = metrics.histogram(
+    'econsular_http_request_duration_seconds', 'Durée des requêtes HTTP',
+    ('endpoint', 'method', 'status'))
+http_requests_in_flight = metrics.gauge(
+    'econsular_http_requests_in_flight', 'Requêtes HTTP en cours de traitement')
+db_pool_checked_out = metrics.gauge(
+    'econsular_db_pool_checked_out', 'Connexions SQLAlchemy empruntées au pool')
+db_pool_overflow = metrics.gauge(
+    'econsular_db_pool_overflow', 'Connexions SQLAlchemy ouvertes au-delà de pool_size')
+rate_limit_rejections = metrics.counter(
+    'econsular_rate_limit_rejections_total', 'Requêtes rejetées par la limitation de débit', ('scope',))
+email_send_duration = metrics.histogram(
+    'econsular_email_send_duration_seconds', "Durée d'envoi des emails (SendGrid)", ('outcome',))
+email_failures = metrics.counter(
+    'econsular_email_failures_total', "Emails non envoyés", ('reason',))
+pdf_render_duration = metrics.histogram(
+    'econsular_pdf_render_duration_seconds', 'Durée de génération des documents PDF', ('outcome',),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+upload_bytes = metrics.counter(
+    'econsular_upload_bytes_total', 'Octets reçus dans les formulaires multipart', ('endpoint',))
+
+def init_app(flask_app, engine):
+    """Mesurer chaque requête HTTP et l'état du pool de connexions"""
+    from flask import g, request
+
+    def start_request():
+        g.metrics_started = time.perf_counter()
+        g.metrics_in_flight = True
+        http_requests_in_flight.inc()
+
+    def observe_response(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'inconnu'
+            http_request_duration.observe(time.perf_counter() - started, endpoint=endpoint,
+                                          method=request.method, status=response.status_code)
+            if request.mimetype == 'multipart/form-data' and request.content_length:
+                upload_bytes.inc(request.content_length, endpoint=endpoint)
+        return response
+
+    def finish_request(exc):
+        # Exception non gérée: after_request n'a pas été appelé
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            http_request_duration.observe(time.perf_counter() - started, endpoint=request.endpoint or 'inconnu',
+                                          method=request.method, status=500)
+        if g.pop('metrics_in_flight', False):
+            http_requests_in_flight.dec()
+        pool = engine.pool
+        if hasattr(pool, 'checkedout'):
+            db_pool_checked_out.set(pool.checkedout())
+        if hasattr(pool, 'overflow'):
+            db_pool_overflow.set(max(pool.overflow(), 0))
+        metrics.maybe_flush()
+
+    flask_app.before_request(start_request)
+    flask_app.after_request(observe_response)
+    flask_app.teardown_request(finish_request)
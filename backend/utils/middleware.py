@@ -1,8 +1,12 @@
 # Middleware de sécurité pour Flask e-consulaire
-from flask import request, session, abort, g
+from flask import request, session, abort, g, current_app, Request
 from functools import wraps
+import os
 import time
 from backend.services.security_service import security_service
+from backend.utils.sanitizer import sanitize_json, sanitize_multidict
+from backend.utils.threat_detector import suspicious_request_detector
+from backend.utils.metrics import rate_limit_rejections
 from app import app
 
 # Cache pour le rate limiting
@@ -21,6 +25,7 @@ def security_middleware():
     client_ip = request.remote_addr
     if not rate_limit_check(client_ip):
         app.logger.warning(f'Rate limit dépassé pour {client_ip}')
+        rate_limit_rejections.inc(scope='ip')
         security_service.log_security_event('rate_limit_exceeded', None, f'IP: {client_ip}')
         abort(429)  # Too Many Requests
     
@@ -92,28 +97,37 @@ def add_security_headers():
 
 def sanitize_request_data():
     """Nettoyer automatiquement les données d'entrée"""
-    if request.is_json:
-        # Nettoyer les données JSON
-        if hasattr(request, 'json') and request.json:
-            sanitized_data = {}
-            for key, value in request.json.items():
-                if isinstance(value, str):
-                    sanitized_data[key] = security_service.sanitize_input(value)
-                else:
-                    sanitized_data[key] = value
-            # Remplacer les données dans la requête
-            request.json = sanitized_data
+    exempt_all, exempt = sanitize_exemptions(request.endpoint)
+    if exempt_all:
+        return
     
-    elif request.form:
-        # Nettoyer les données de formulaire
-        sanitized_form = {}
-        for key, value in request.form.items():
-            if isinstance(value, str):
-                sanitized_form[key] = security_service.sanitize_input(value)
-            else:
-                sanitized_form[key] = value
-        # Remplacer les données dans la requête
-        request.form = sanitized_form
+    # JSON: nettoyé par SanitizedRequest.get_json
+    if not request.is_json and request.form:
+        # Nettoyer les données de formulaire (les champs multi-valeurs sont conservés)
+        request.form = sanitize_multidict(request.form, exempt)
+
+def sanitize_exemptions(endpoint):
+    """(route exclue, champs exclus) déclarés par @sanitize_exempt sur la vue"""
+    view = current_app.view_functions.get(endpoint)
+    return (getattr(view, 'sanitize_exempt_all', False),
+            getattr(view, 'sanitize_exempt_fields', None) or frozenset())
+
+class SanitizedRequest(Request):
+    """Requête dont get_json() renvoie les chaînes de premier niveau nettoyées"""
+
+    def get_json(self, force=False, silent=False, cache=True):
+        data = super().get_json(force=force, silent=silent, cache=cache)
+        if not data:
+            return data
+        # Même objet à chaque appel, comme le cache de Werkzeug
+        cached = self.__dict__.get('sanitized_json')
+        if cached is not None and cached[0] is data:
+            return cached[1]
+        exempt_all, exempt = sanitize_exemptions(self.endpoint)
+        sanitized = data if exempt_all else sanitize_json(data, exempt)
+        if cache:
+            self.__dict__['sanitized_json'] = (data, sanitized)
+        return sanitized
 
 def require_2fa(f):
     """Décorateur pour exiger l'authentification à deux facteurs"""
@@ -133,41 +147,33 @@ def require_2fa(f):
     return decorated_function
 
 def log_suspicious_activity():
-    """Logger automatiquement les activités suspectes"""
+    """Logger automatiquement les activités suspectes (un événement agrégé par requête)"""
     @app.before_request
     def check_suspicious_patterns():
-        suspicious_patterns = [
-            'union select',  # Injection SQL
-            '<script',       # XSS
-            'javascript:',   # XSS
-            '../',          # Directory traversal
-            'eval(',        # Code injection
-            'system(',      # Command injection
-        ]
-        
-        # Vérifier l'URL
-        for pattern in suspicious_patterns:
-            if pattern.lower() in request.url.lower():
-                security_service.log_security_event(
-                    'suspicious_url',
-                    None,
-                    f'Pattern suspect dans URL: {pattern} - IP: {request.remote_addr}'
-                )
-        
-        # Vérifier les paramètres
-        if request.args:
-            for key, value in request.args.items():
-                for pattern in suspicious_patterns:
-                    if pattern.lower() in str(value).lower():
-                        security_service.log_security_event(
-                            'suspicious_parameter',
-                            None,
-                            f'Pattern suspect dans paramètre {key}: {pattern} - IP: {request.remote_addr}'
-                        )
+        suspicious_request_detector.inspect_request()
+
+def init_input_security(app):
+    """Middleware d'entrée installé par app.py
+
+    Détection des requêtes suspectes (journalisation seule, jamais de rejet). Le
+    nettoyage des formulaires et du JSON ne s'applique qu'avec SANITIZE_REQUESTS=true:
+    les gabarits Jinja échappent déjà à l'affichage, une valeur nettoyée à l'entrée
+    (« d'Ivoire » -> « d&#x27;Ivoire ») serait donc stockée et affichée doublement échappée.
+    """
+    if os.environ.get('SANITIZE_REQUESTS', '').lower() in ['true', '1', 'yes']:
+        app.request_class = SanitizedRequest
+        app.before_request(sanitize_request_data)
+    log_suspicious_activity()
 
 # Initialiser le middleware
 def init_security_middleware(app):
-    """Initialiser tous les middleware de sécurité"""
+    """Initialiser tous les middleware de sécurité
+
+    Non installé par app.py: la vérification CSRF exige un csrf_token que les
+    formulaires n'envoient pas, et la limite de 100 requêtes par heure et par IP
+    bloquerait la navigation ordinaire.
+    """
+    app.request_class = SanitizedRequest
     app.before_request(security_middleware)
     add_security_headers()
     log_suspicious_activity()
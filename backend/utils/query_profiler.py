@@ -0,0 +1,241 @@
+# Instrumentation SQL par requête HTTP (nombre de requêtes, temps base, requêtes lentes)
+# Les événements du moteur SQLAlchemy alimentent un compteur par requête (flask.g);
+# chaque worker agrège ensuite par endpoint et publie ses totaux dans instance/query_stats/.
+import os
+import re
+import json
+import time
+import logging
+import threading
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from app import app
+
+# Valeurs littérales retirées des requêtes pour regrouper les instructions identiques
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r'\s+')
+
+def normalize_statement(statement, max_length=500):
+    """Instruction SQL sur une ligne, littéraux remplacés par '?'"""
+    statement = _SPACES.sub(' ', _LITERALS.sub('?', statement)).strip()
+    return statement if len(statement) <= max_length else statement[:max_length] + '…'
+
+def _value_shape(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (str, bytes)):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+def parameter_shape(parameters, executemany=False):
+    """Forme des paramètres liés (types et longueurs, jamais les valeurs)"""
+    if executemany:
+        rows = list(parameters or ())
+        return f'{len(rows)} x {parameter_shape(rows[0]) if rows else "()"}'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {_value_shape(value)}' for key, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(_value_shape(value) for value in parameters) + ')'
+    return _value_shape(parameters)
+
+class QueryProfiler:
+    def __init__(self):
+        self.slow_ms = float(os.environ.get('SLOW_QUERY_MS', 200))
+        self.top_statements = int(os.environ.get('QUERY_PROFILE_TOP', 5))
+        self.flush_interval = float(os.environ.get('QUERY_STATS_FLUSH_SECONDS', 10))
+        self.timing_header = os.environ.get('SERVER_TIMING_HEADER', '').lower() in ['true', '1', 'yes']
+        self.stats_dir = os.environ.get('QUERY_STATS_DIR', os.path.join(app.instance_path, 'query_stats'))
+        self.slow_log_file = os.environ.get('SLOW_QUERY_LOG', os.path.join(app.instance_path, 'slow_queries.log'))
+        self._lock = threading.Lock()
+        # endpoint -> totaux agrégés pour ce worker
+        self._endpoints = {}
+        self._last_flush = time.monotonic()
+        self._slow_logger = None
+
+    def init_app(self, flask_app, engine):
+        """Brancher les événements du moteur et les hooks de requête"""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        flask_app.before_request(self._start_request)
+        flask_app.after_request(self._finish_request)
+
+    @property
+    def slow_logger(self):
+        """Journal des requêtes lentes (fichier dédié, ouvert au premier usage)"""
+        if self._slow_logger is None:
+            logger = logging.getLogger('econsular.slow_queries')
+            if not logger.handlers:
+                os.makedirs(os.path.dirname(self.slow_log_file) or '.', exist_ok=True)
+                handler = logging.FileHandler(self.slow_log_file, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+            self._slow_logger = logger
+        return self._slow_logger
+
+    # ---- Événements SQLAlchemy ----
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_profiler_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_profiler_start')
+        if not starts:
+            return
+        duration_ms = (time.perf_counter() - starts.pop()) * 1000
+        if not has_request_context():
+            return
+
+        profile = g.get('sql_profile')
+        if profile is None:
+            profile = g.sql_profile = {'count': 0, 'db_ms': 0.0, 'slowest': []}
+        profile['count'] += 1
+        profile['db_ms'] += duration_ms
+
+        # Seules les instructions parmi les plus lentes sont mises en forme
+        slowest = profile['slowest']
+        if len(slowest) < self.top_statements or duration_ms > slowest[-1]['ms'] or duration_ms >= self.slow_ms:
+            entry = {
+                'ms': round(duration_ms, 2),
+                'statement': normalize_statement(statement),
+                'parameters': parameter_shape(parameters, executemany)
+            }
+            if duration_ms >= self.slow_ms:
+                self.slow_logger.info(f'{duration_ms:.1f} ms {request.method} {request.path} '
+                                      f'[{request.endpoint}] {entry["statement"]} -- {entry["parameters"]}')
+            slowest.append(entry)
+            slowest.sort(key=lambda item: -item['ms'])
+            del slowest[self.top_statements:]
+
+    # ---- Hooks de requête ----
+
+    def _start_request(self):
+        g.request_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        profile = g.get('sql_profile') or {'count': 0, 'db_ms': 0.0, 'slowest': []}
+        started = g.get('request_started')
+        total_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+
+        if app.debug or self.timing_header:
+            response.headers['Server-Timing'] = (
+                f'db;dur={profile["db_ms"]:.1f};desc="{profile["count"]} queries", '
+                f'app;dur={total_ms:.1f}'
+            )
+
+        self.record(request.endpoint or 'inconnu', profile, total_ms)
+        return response
+
+    # ---- Agrégation par endpoint ----
+
+    def record(self, endpoint, profile, total_ms):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    'requests': 0, 'queries': 0, 'db_ms': 0.0, 'total_ms': 0.0,
+                    'max_db_ms': 0.0, 'max_queries': 0, 'slowest': []
+                }
+            stats['requests'] += 1
+            stats['queries'] += profile['count']
+            stats['db_ms'] += profile['db_ms']
+            stats['total_ms'] += total_ms
+            stats['max_db_ms'] = max(stats['max_db_ms'], profile['db_ms'])
+            stats['max_queries'] = max(stats['max_queries'], profile['count'])
+            if profile['slowest']:
+                stats['slowest'] = self._merge_slowest(stats['slowest'], profile['slowest'])
+
+            flush = time.monotonic() - self._last_flush >= self.flush_interval
+            if flush:
+                self._last_flush = time.monotonic()
+                snapshot = json.loads(json.dumps(self._endpoints))
+        if flush:
+            self._write_snapshot(snapshot)
+
+    def _merge_slowest(self, current, new):
+        """Instructions les plus lentes, une entrée par instruction normalisée"""
+        by_statement = {}
+        for entry in current + new:
+            known = by_statement.get(entry['statement'])
+            if known is None or entry['ms'] > known['ms']:
+                by_statement[entry['statement']] = entry
+        return sorted(by_statement.values(), key=lambda item: -item['ms'])[:self.top_statements]
+
+    def _snapshot_path(self, pid=None):
+        return os.path.join(self.stats_dir, f'{pid or os.getpid()}.json')
+
+    def _write_snapshot(self, snapshot):
+        """Publier les totaux de ce worker (écriture atomique)"""
+        try:
+            os.makedirs(self.stats_dir, exist_ok=True)
+            path = self._snapshot_path()
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'pid': os.getpid(), 'updated_at': time.time(), 'endpoints': snapshot}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            app.logger.warning(f'Statistiques SQL non publiées: {e}')
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            snapshot = json.loads(json.dumps(self._endpoints))
+        self._write_snapshot(snapshot)
+
+    def report(self, limit=20, sort='db_ms'):
+        """Endpoints les plus coûteux en base, tous workers confondus"""
+        self.flush()
+        merged = {}
+        try:
+            names = [name for name in os.listdir(self.stats_dir) if name.endswith('.json')]
+        except OSError:
+            names = []
+
+        for name in names:
+            try:
+                with open(os.path.join(self.stats_dir, name), 'r') as f:
+                    endpoints = json.load(f).get('endpoints', {})
+            except (OSError, ValueError):
+                continue
+            for endpoint, stats in endpoints.items():
+                total = merged.get(endpoint)
+                if total is None:
+                    merged[endpoint] = dict(stats, slowest=list(stats['slowest']))
+                    continue
+                for key in ('requests', 'queries', 'db_ms', 'total_ms'):
+                    total[key] += stats[key]
+                for key in ('max_db_ms', 'max_queries'):
+                    total[key] = max(total[key], stats[key])
+                total['slowest'] = self._merge_slowest(total['slowest'], stats['slowest'])
+
+        rows = []
+        for endpoint, stats in merged.items():
+            requests = stats['requests'] or 1
+            rows.append({
+                'endpoint': endpoint,
+                'requests': stats['requests'],
+                'db_ms': round(stats['db_ms'], 1),
+                'avg_db_ms': round(stats['db_ms'] / requests, 2),
+                'max_db_ms': round(stats['max_db_ms'], 2),
+                'avg_queries': round(stats['queries'] / requests, 1),
+                'max_queries': stats['max_queries'],
+                'db_share': round(stats['db_ms'] / stats['total_ms'], 3) if stats['total_ms'] else 0.0,
+                'slowest': stats['slowest']
+            })
+        rows.sort(key=lambda row: -row.get(sort, row['db_ms']))
+        return rows[:limit]
+
+    def reset(self):
+        """Remettre les compteurs à zéro (ce worker et fichiers publiés)"""
+        with self._lock:
+            self._endpoints = {}
+        try:
+            for name in os.listdir(self.stats_dir):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.stats_dir, name))
+        except OSError:
+            pass
+
+# Instance globale du profileur SQL
+query_profiler = QueryProfiler()
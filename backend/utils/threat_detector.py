@@ -0,0 +1,163 @@
+# Détection des requêtes suspectes (motifs littéraux, recherche de sous-chaînes en C)
+# L'ensemble des motifs est chargé une fois; URL, paramètres, en-têtes et corps
+# sont examinés en une seule passe et un seul événement est journalisé par requête.
+import os
+import json
+import time
+import random
+import threading
+from urllib.parse import unquote_plus
+from flask import request
+from app import app
+
+DEFAULT_PATTERNS = [
+    'union select',  # Injection SQL
+    "' or '1'='1",   # Injection SQL
+    '<script',       # XSS
+    'javascript:',   # XSS
+    'onerror=',      # XSS
+    '../',           # Directory traversal
+    '..%2f',         # Directory traversal encodé
+    '/etc/passwd',   # Directory traversal
+    'eval(',         # Code injection
+    'system(',       # Command injection
+    '${jndi:',       # Injection JNDI
+]
+
+# En-têtes inspectés (les autres sont ignorés: cookies, jetons...)
+SCANNED_HEADERS = ('User-Agent', 'Referer', 'X-Forwarded-For')
+
+class PatternMatcher:
+    """Recherche de plusieurs motifs littéraux
+
+    Un test d'inclusion par motif (recherche de sous-chaîne en C): plus rapide ici
+    qu'une alternative compilée par re, dont les premiers caractères des motifs
+    (e, s, o, u...) multiplient les positions candidates sur du texte courant.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = sorted({p.lower() for p in patterns if p})
+
+    def search(self, text):
+        """Retourner l'ensemble des motifs présents dans text (déjà en minuscules)"""
+        return {pattern for pattern in self.patterns if pattern in text}
+
+class SuspiciousRequestDetector:
+    def __init__(self):
+        self.patterns_file = os.environ.get('SUSPICIOUS_PATTERNS_FILE',
+                                            os.path.join(app.instance_path, 'suspicious_patterns.json'))
+        self.max_body_bytes = int(os.environ.get('SUSPICIOUS_MAX_BODY_BYTES', 65536))
+        self.log_limit = int(os.environ.get('SUSPICIOUS_LOG_LIMIT', 10))
+        self.log_window = int(os.environ.get('SUSPICIOUS_LOG_WINDOW', 60))
+        self.sample_rate = float(os.environ.get('SUSPICIOUS_SAMPLE_RATE', 0.01))
+        self._lock = threading.Lock()
+        self._patterns_mtime = None
+        self._matcher = PatternMatcher(self._env_patterns() or DEFAULT_PATTERNS)
+        # IP -> [début de fenêtre, événements journalisés, événements ignorés]
+        self._log_budget = {}
+
+    def _env_patterns(self):
+        return [p.strip() for p in os.environ.get('SUSPICIOUS_PATTERNS', '').split(',') if p.strip()]
+
+    @property
+    def patterns(self):
+        self._reload_if_changed()
+        return list(self._matcher.patterns)
+
+    def set_patterns(self, patterns):
+        """Remplacer l'ensemble des motifs (partagé par tous les workers via le fichier)"""
+        matcher = PatternMatcher(patterns)
+        os.makedirs(os.path.dirname(self.patterns_file) or '.', exist_ok=True)
+        tmp_path = f'{self.patterns_file}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(matcher.patterns, f, ensure_ascii=False)
+        os.replace(tmp_path, self.patterns_file)
+        with self._lock:
+            self._matcher = matcher
+            self._patterns_mtime = os.stat(self.patterns_file).st_mtime_ns
+        return matcher.patterns
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.patterns_file).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._patterns_mtime:
+            return
+        try:
+            with open(self.patterns_file, 'r') as f:
+                patterns = json.load(f)
+            with self._lock:
+                self._matcher = PatternMatcher(patterns)
+                self._patterns_mtime = mtime
+        except (OSError, ValueError) as e:
+            app.logger.warning(f'Motifs suspects illisibles: {e}')
+            self._patterns_mtime = mtime
+
+    def scan_request(self):
+        """Parcourir la requête courante; retourne {motif: [emplacements]}"""
+        self._reload_if_changed()
+        matcher = self._matcher
+        matches = {}
+
+        for location, text in self._request_segments():
+            for pattern in matcher.search(text.lower()):
+                matches.setdefault(pattern, []).append(location)
+        return matches
+
+    def _request_segments(self):
+        # Chemin et chaîne de requête décodés: noms de paramètres compris
+        yield 'url', unquote_plus(request.full_path)
+        for key, value in request.args.items(multi=True):
+            yield f'param:{key}', value
+        for header in SCANNED_HEADERS:
+            value = request.headers.get(header)
+            if value:
+                yield f'header:{header}', value
+        if request.content_length and request.mimetype in ('application/x-www-form-urlencoded', 'application/json'):
+            body = request.get_data(cache=True)[:self.max_body_bytes].decode('utf-8', 'replace')
+            if request.mimetype == 'application/x-www-form-urlencoded':
+                body = unquote_plus(body)
+            yield 'body', body
+
+    def should_log(self, client_ip):
+        """Limiter les écritures par IP: quota par fenêtre puis échantillonnage
+
+        Retourne (journaliser, nombre d'événements ignorés depuis le dernier journalisé).
+        """
+        now = time.monotonic()
+        with self._lock:
+            budget = self._log_budget.get(client_ip)
+            if budget is None or now - budget[0] >= self.log_window:
+                if len(self._log_budget) > 10000:
+                    self._log_budget = {ip: b for ip, b in self._log_budget.items()
+                                        if now - b[0] < self.log_window}
+                budget = self._log_budget[client_ip] = [now, 0, budget[2] if budget else 0]
+            if budget[1] < self.log_limit or random.random() < self.sample_rate:
+                budget[1] += 1
+                suppressed, budget[2] = budget[2], 0
+                return True, suppressed
+            budget[2] += 1
+            return False, 0
+
+    def inspect_request(self):
+        """Analyser la requête et journaliser un événement agrégé si nécessaire"""
+        from backend.services.security_service import security_service
+
+        matches = self.scan_request()
+        if not matches:
+            return matches
+
+        client_ip = request.remote_addr
+        log, suppressed = self.should_log(client_ip)
+        if log:
+            summary = '; '.join(f'{pattern} ({", ".join(sorted(set(locations)))})'
+                                for pattern, locations in sorted(matches.items()))
+            details = f'{request.method} {request.path} - IP: {client_ip} - Motifs: {summary}'
+            if suppressed:
+                details += f' - {suppressed} événement(s) non journalisé(s) pour cette IP'
+            security_service.log_security_event('suspicious_request', None, details)
+        return matches
+
+# Instance globale du détecteur
+suspicious_request_detector = SuspiciousRequestDetector()
@@ -0,0 +1,58 @@
+// Compteurs en temps réel des agents (e-Consulaire RDC)
+// Valeurs poussées par le serveur en Server-Sent Events; repli sur les API de comptage
+// si le flux est indisponible (navigateur sans EventSource, serveur qui répond 503)
+
+const LIVE_COUNT_SOURCES = {
+    notifications: '/api/agent/notifications/count',
+    queue: '/api/agent/pending-applications/count'
+};
+const LIVE_COUNT_POLL_INTERVAL = 60000; // 60 s en mode de repli
+
+/**
+ * Mettre à jour chaque élément marqué data-live-count="<nom d'événement>"
+ */
+function updateLiveCount(name, count) {
+    document.querySelectorAll(`[data-live-count="${name}"]`).forEach(element => {
+        element.textContent = count;
+    });
+}
+
+/**
+ * Repli: interroger périodiquement les API de comptage des compteurs de la page
+ */
+function pollLiveCounts(names) {
+    const poll = () => names.forEach(name => {
+        fetch(LIVE_COUNT_SOURCES[name], { credentials: 'same-origin' })
+            .then(response => response.ok ? response.json() : null)
+            .then(data => { if (data) updateLiveCount(name, data.count); })
+            .catch(() => {});
+    });
+    setInterval(poll, LIVE_COUNT_POLL_INTERVAL);
+}
+
+function initLiveCounts() {
+    const names = [...new Set([...document.querySelectorAll('[data-live-count]')]
+        .map(element => element.dataset.liveCount))]
+        .filter(name => name in LIVE_COUNT_SOURCES);
+    if (!names.length) return;
+
+    if (!window.EventSource) {
+        pollLiveCounts(names);
+        return;
+    }
+
+    // Le navigateur se reconnecte seul après une fermeture du flux ou une erreur réseau;
+    // le serveur renvoie l'état complet à chaque connexion
+    const source = new EventSource('/api/agent/events');
+    names.forEach(name => {
+        source.addEventListener(name, event => updateLiveCount(name, JSON.parse(event.data).count));
+    });
+    source.onerror = () => {
+        // CLOSED: refusé par le serveur (503, workers synchrones), pas de nouvelle tentative
+        if (source.readyState === EventSource.CLOSED) {
+            pollLiveCounts(names);
+        }
+    };
+}
+
+document.addEventListener('DOMContentLoaded', initLiveCounts);